@@ -1,13 +1,61 @@
 # app.py
-from fastapi import FastAPI, HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
+from typing import List, Optional, Tuple
+from src.config import Config
+from src.index.download import download_blob, resolve_artifact
+from src.index.location import IndexLocation
+from src.index.manifest import IndexManifestError
+from src.index.tenants import UnknownTenant, tenant_dir, validate_tenant
+from src.llm.resilience import deadline
+from src.observability.metrics import REGISTRY, REQUESTS
+from src.observability.tracing import span
+from src.serving.admission import Rejected, from_config
+from src.serving.sessions import validate_session_id
+import asyncio
+import logging
 import pathlib
 import os
+import shutil
+import sys
+import tempfile
 import json
-import threading
+import time
 
-app = FastAPI(title="RAG Portfolio Bot — Minimal Agent")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: kick off warmup (or finish it first with WARMUP_MODE=blocking, so uvicorn only
+    accepts traffic once the index, clients and imports are ready) and the index poller.
+    Shutdown: stop background tasks and flush persistent caches.
+    """
+    global _warmup_task
+    if WARMUP_MODE == "blocking":
+        await _warmup()
+    elif WARMUP_MODE == "background":
+        _warmup_task = asyncio.create_task(_warmup())
+    poller = asyncio.create_task(_poll_index_updates()) if INDEX_POLL_INTERVAL > 0 else None
+    try:
+        yield
+    finally:
+        for task in (poller, _warmup_task):
+            if task is not None and not task.done():
+                task.cancel()
+        rag = sys.modules.get("rag")
+        if rag is not None:
+            await rag.drain_session_tasks()
+            rag.save_caches()
+            await rag.aclose_clients()
+
+
+app = FastAPI(title="RAG Portfolio Bot — Minimal Agent", lifespan=lifespan)
+logger = logging.getLogger("app")
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,14 +67,38 @@ app.add_middleware(
 # =========================
 # Config & lazy download
 # =========================
-INDEX_DIR = os.getenv("INDEX_DIR", "/app/data/index")
-INDEX_PATH = os.path.join(INDEX_DIR, "faiss.index")
-META_PATH = os.path.join(INDEX_DIR, "meta.json")
+INDEX_DIR = Config.INDEX_DIR  # shared with rag.py and every worker on the host (src/index/location.py)
 INDEX_GCS_URI = os.getenv("INDEX_GCS_URI")  # e.g., gs://my-bucket/path/to/index
+GCS_DOWNLOAD_WORKERS = int(os.getenv("GCS_DOWNLOAD_WORKERS", "8"))  # parallel byte ranges per object
+GCS_PART_SIZE = int(os.getenv("GCS_PART_SIZE_MB", "8")) * (1 << 20)
 
-_download_lock = threading.Lock()
 _last_download_err = None  # stored to report in _debug_status
 
+# Hot reload: poll the GCS generation of meta.json every INDEX_POLL_INTERVAL seconds (0 = off)
+INDEX_POLL_INTERVAL = float(os.getenv("INDEX_POLL_INTERVAL", "0"))
+_reload_lock = asyncio.Lock()
+_reload_state = {
+    "generation": None,       # GCS generation of the active meta.json
+    "reloads": 0,
+    "last_check_at": None,
+    "last_reload_at": None,
+    "last_reload_s": None,    # download + load + validate, seconds
+    "last_reload_error": None,
+    "last_reload_mode": None, # "delta" (delta.npz applied), "full", or "shared" (a sibling worker fetched it)
+}
+
+# Cold start: background | blocking | off (see lifespan). /health is liveness, /ready readiness.
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background").lower()
+_warmup_task = None
+_warmup_state = {
+    "state": "idle",          # idle -> warming -> ready | failed
+    "started_at": None,
+    "ready_at": None,
+    "warmup_s": None,
+    "stages": {},             # seconds per warmup step
+    "error": None,
+}
+
 
 def _parse_gcs_uri(uri: str):
     """
@@ -41,15 +113,9 @@ def _parse_gcs_uri(uri: str):
     return bucket, prefix.rstrip("/")
 
 
-def _download_from_gcs_if_needed():
-    """
-    Download faiss.index and meta.json from GCS if missing.
-    Keeps the image tiny and sources only in GCS, not baked into the container.
-    """
+def _gcs_bucket():
+    """(bucket, prefix) for INDEX_GCS_URI; records a readable error when GCS can't be used."""
     global _last_download_err
-    if os.path.exists(INDEX_PATH) and os.path.exists(META_PATH):
-        return  # already present
-
     if not INDEX_GCS_URI:
         _last_download_err = "INDEX_GCS_URI is not set. Configure env var with a gs://bucket[/prefix]."
         raise RuntimeError(_last_download_err)
@@ -62,37 +128,371 @@ def _download_from_gcs_if_needed():
 
     bucket_name, prefix = _parse_gcs_uri(INDEX_GCS_URI)
     client = storage.Client()
-    bucket = client.bucket(bucket_name)
+    return client.bucket(bucket_name), prefix
 
-    os.makedirs(INDEX_DIR, exist_ok=True)
 
-    idx_name = f"{prefix}/faiss.index" if prefix else "faiss.index"
-    meta_name = f"{prefix}/meta.json" if prefix else "meta.json"
+def _object_name(prefix: str, filename: str) -> str:
+    return f"{prefix}/{filename}" if prefix else filename
 
-    idx_blob = bucket.blob(idx_name)
-    meta_blob = bucket.blob(meta_name)
 
-    if not idx_blob.exists():
-        _last_download_err = f"Object not found in GCS: gs://{bucket_name}/{idx_name}"
-        raise FileNotFoundError(_last_download_err)
-    if not meta_blob.exists():
-        _last_download_err = f"Object not found in GCS: gs://{bucket_name}/{meta_name}"
+def _fetch_artifact(bucket, prefix: str, filename: str, dest_dir: str, required: bool = False):
+    """Verified, ranged download of `filename` (or its .zst) into dest_dir; None when optional and missing."""
+    global _last_download_err
+    blob = resolve_artifact(bucket, _object_name(prefix, filename))
+    if blob is None:
+        if required:
+            _last_download_err = f"Object not found in GCS: gs://{bucket.name}/{_object_name(prefix, filename)}"
+            raise FileNotFoundError(_last_download_err)
+        return None
+    download_blob(blob, os.path.join(dest_dir, filename), part_size=GCS_PART_SIZE, workers=GCS_DOWNLOAD_WORKERS)
+    return blob
+
+
+def _download_index_to(dest_dir: str, subdir: str = "", extra: tuple = ()) -> int:
+    """
+    Download faiss.index, chunks.bin + lexical.bin (when published) and meta.json into dest_dir.
+    The artifacts download concurrently, each as parallel byte ranges, checksum-verified and
+    renamed into place atomically; meta.json goes last, so its presence marks a complete download.
+    `subdir` is below the INDEX_GCS_URI prefix (a tenant's index), `extra` optional files to fetch too.
+    Returns the GCS generation of meta.json, which identifies the published index version.
+    """
+    global _last_download_err
+    bucket, prefix = _gcs_bucket()
+    prefix = _object_name(prefix, subdir) if subdir else prefix
+    os.makedirs(dest_dir, exist_ok=True)
+
+    meta_name = _object_name(prefix, "meta.json")
+    # get_blob fetches metadata (generation, size, checksums) and returns None when missing
+    meta_blob = bucket.get_blob(meta_name)
+    if meta_blob is None:
+        _last_download_err = f"Object not found in GCS: gs://{bucket.name}/{meta_name}"
         raise FileNotFoundError(_last_download_err)
 
-    idx_blob.download_to_filename(INDEX_PATH)
-    meta_blob.download_to_filename(META_PATH)
+    artifacts = {"faiss.index": True, "chunks.bin": False, "lexical.bin": False}  # name -> required
+    artifacts.update({name: False for name in extra})
+    with ThreadPoolExecutor(max_workers=len(artifacts)) as pool:
+        futures = [pool.submit(_fetch_artifact, bucket, prefix, name, dest_dir, required)
+                   for name, required in artifacts.items()]
+        for f in futures:
+            f.result()
+    download_blob(meta_blob, os.path.join(dest_dir, "meta.json"))
     _last_download_err = None  # success
+    return meta_blob.generation
+
+
+def _download_delta_to(dest_dir: str):
+    """
+    Fetch meta.json and, when it carries a "delta" built on the active index version,
+    only delta.npz (+ the small lexical.bin); then rebuild faiss.index + chunks.bin
+    locally from active + delta.
+    Returns the meta.json generation, or None when a full download is needed.
+    """
+    import rag
+    from src.index.manifest import file_sha1, load_manifest
+
+    bucket, prefix = _gcs_bucket()
+    os.makedirs(dest_dir, exist_ok=True)
+    meta_blob = bucket.get_blob(_object_name(prefix, "meta.json"))
+    if meta_blob is None:
+        return None
+    meta_path = os.path.join(dest_dir, "meta.json")
+    download_blob(meta_blob, meta_path)
+    delta = load_manifest(meta_path).get("delta")
+    if not delta or delta["base_version"][:12] != rag.active_index_version():
+        return None
+    if _fetch_artifact(bucket, prefix, delta["file"], dest_dir) is None:
+        return None
+    delta_path = os.path.join(dest_dir, delta["file"])
+    if file_sha1(delta_path) != delta["sha1"]:
+        return None
+    if not rag.materialize_delta(pathlib.Path(delta_path), pathlib.Path(dest_dir)):
+        return None
+    os.remove(delta_path)
+    lexical = load_manifest(meta_path).get("lexical")
+    if lexical and _fetch_artifact(bucket, prefix, lexical["file"], dest_dir) is None:
+        return None
+    return meta_blob.generation
+
+
+def _index_location() -> IndexLocation:
+    return IndexLocation(INDEX_DIR)
 
 
 def ensure_index_local():
     """
-    Thread-safe: ensures index files exist locally by downloading from GCS when needed.
+    Ensures index files exist in INDEX_DIR, downloading them from GCS when missing.
+    Keeps the image tiny and sources only in GCS, not baked into the container.
+    Safe across threads and worker processes: one downloads under the directory's file lock,
+    the others wait for it and load the same files.
     """
-    if os.path.exists(INDEX_PATH) and os.path.exists(META_PATH):
+    location = _index_location()
+    location.ensure(_download_index_to)
+    if _reload_state["generation"] is None:
+        _reload_state["generation"] = location.generation()
+
+
+def _tenant_subdir(tenant: str) -> str:
+    return f"{Config.TENANT_GCS_PREFIX}/{tenant}" if Config.TENANT_GCS_PREFIX else tenant
+
+
+def ensure_tenant_local(tenant: str):
+    """
+    A tenant's index in INDEX_DIR/tenants/<tenant>, downloaded on first use from
+    <INDEX_GCS_URI>/<TENANT_GCS_PREFIX>/<tenant>/ (with its optional persona.json).
+    Raises UnknownTenant when it is neither on disk nor in GCS.
+    """
+    location = IndexLocation(tenant_dir(INDEX_DIR, tenant))
+    if location.is_complete():
         return
-    with _download_lock:
-        if not (os.path.exists(INDEX_PATH) and os.path.exists(META_PATH)):
-            _download_from_gcs_if_needed()
+    if not INDEX_GCS_URI:
+        raise UnknownTenant(f"no index for tenant {tenant!r}")
+    subdir = _tenant_subdir(tenant)
+    try:
+        location.ensure(lambda d: _download_index_to(d, subdir=subdir, extra=("persona.json",)))
+    except FileNotFoundError:
+        shutil.rmtree(location.root, ignore_errors=True)  # no empty directories for unknown ids
+        raise UnknownTenant(f"no index for tenant {tenant!r}") from None
+
+
+async def _prepare_index(tenant: Optional[str], endpoint: str):
+    """Make the default or the tenant's index files local (off the event loop); HTTP errors otherwise."""
+    try:
+        with span("ensure_index_local", tenant=tenant or ""):
+            if tenant is None:
+                await asyncio.to_thread(ensure_index_local)
+            else:
+                await asyncio.to_thread(ensure_tenant_local, tenant)
+    except UnknownTenant as e:
+        REQUESTS.inc(endpoint=endpoint, outcome="unknown_tenant")
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        REQUESTS.inc(endpoint=endpoint, outcome="index_error")
+        raise HTTPException(status_code=500, detail=f"Failed to prepare index from GCS: {e}")
+
+
+# =========================
+# Hot index reload
+# =========================
+def _remote_generation(subdir: str = "") -> int:
+    bucket, prefix = _gcs_bucket()
+    name = _object_name(_object_name(prefix, subdir) if subdir else prefix, "meta.json")
+    blob = bucket.get_blob(name)
+    if blob is None:
+        raise FileNotFoundError(f"Object not found in GCS: gs://{bucket.name}/{name}")
+    return blob.generation
+
+
+def _promote(staging_dir: str, dest_dir: Optional[str] = None):
+    """Move a validated staging download into INDEX_DIR or `dest_dir` (meta.json last); drop the staging dir."""
+    for name in ("faiss.index", "chunks.bin", "lexical.bin", "persona.json", "meta.json"):
+        src = os.path.join(staging_dir, name)
+        if os.path.exists(src):
+            os.replace(src, os.path.join(dest_dir or INDEX_DIR, name))  # open mmaps keep the old inode alive
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def _load_generation(generation: int, force: bool) -> Tuple[dict, int]:
+    """
+    Load GCS `generation` of the index (blocking; runs in a worker thread); returns the
+    loaded state and the generation it actually is.
+
+    Under the directory lock: when a sibling worker already brought that generation into
+    INDEX_DIR, load it from there. Otherwise download the current meta.json into a side
+    directory (only delta.npz when it was published on top of the active version), load +
+    validate it, promote the files into INDEX_DIR and record the generation of the meta.json
+    that was downloaded (newer than `generation` when one was published meanwhile) for the
+    other workers. A failed download/validation leaves INDEX_DIR and the active index untouched.
+    """
+    import rag
+
+    location = _index_location()
+    with location.lock():
+        if not force and location.generation() == generation and location.is_complete():
+            _reload_state["last_reload_mode"] = "shared"
+            return rag.load_index_state(location.index_path, location.meta_path), generation
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=INDEX_DIR)  # the generation is known once downloaded
+        try:
+            downloaded = None if force else _download_delta_to(staging)
+            _reload_state["last_reload_mode"] = "delta" if downloaded is not None else "full"
+            if downloaded is None:
+                downloaded = _download_index_to(staging)
+            state = rag.load_index_state(pathlib.Path(staging, "faiss.index"), pathlib.Path(staging, "meta.json"))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        _promote(staging)  # loaded files stay mapped across the rename
+        location.set_generation(downloaded)
+        return state, downloaded
+
+
+async def reload_index(force: bool = False) -> dict:
+    """
+    Check for a newer index and swap it in without restarting the worker.
+
+    With INDEX_GCS_URI: compare the meta.json generation and, when it changed, bring the new
+    version into INDEX_DIR and load it off the event loop (see _load_generation), then swap
+    it in atomically. Without GCS: reload whatever is in INDEX_DIR.
+    """
+    import rag
+
+    async with _reload_lock:
+        t0 = time.perf_counter()
+        _reload_state["last_check_at"] = time.time()
+        generation = None
+        try:
+            if INDEX_GCS_URI:
+                generation = await asyncio.to_thread(_remote_generation)
+                if generation == _reload_state["generation"] and not force:
+                    return {"reloaded": False, "generation": generation, "index_version": rag.active_index_version()}
+                state, generation = await asyncio.to_thread(_load_generation, generation, force)
+            else:
+                location = _index_location()
+                state = await asyncio.to_thread(rag.load_index_state, location.index_path, location.meta_path)
+        except Exception as e:
+            _reload_state["last_reload_error"] = f"{type(e).__name__}: {e}"
+            raise
+
+        changed = force or state["version"] != rag.active_index_version()
+        if changed:
+            rag.activate_index(state)  # on the loop thread: in-flight requests keep the old index
+        if generation is not None:
+            _reload_state["generation"] = generation
+        _reload_state["last_reload_error"] = None
+        if changed:
+            _reload_state["reloads"] += 1
+            _reload_state["last_reload_at"] = time.time()
+            _reload_state["last_reload_s"] = round(time.perf_counter() - t0, 3)
+        return {"reloaded": changed, "generation": generation, "index_version": rag.active_index_version()}
+
+
+def _refresh_tenant(tenant: str) -> Optional[int]:
+    """
+    Bring a downloaded tenant index up to its published meta.json generation (blocking; under
+    the directory lock, like the default index). Returns the generation now on disk; files
+    that did not come from GCS (no generation recorded) are left alone.
+    """
+    import rag
+
+    location = IndexLocation(tenant_dir(INDEX_DIR, tenant))
+    if location.generation() is None:
+        return None
+    subdir = _tenant_subdir(tenant)
+    generation = _remote_generation(subdir)
+    with location.lock():
+        current = location.generation()
+        if current == generation:
+            return current
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=location.root)
+        try:
+            downloaded = _download_index_to(staging, subdir=subdir, extra=("persona.json",))
+            rag.load_index_state(pathlib.Path(staging, "faiss.index"), pathlib.Path(staging, "meta.json"))  # validate
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        _promote(staging, str(location.root))
+        location.set_generation(downloaded)
+        return downloaded
+
+
+async def refresh_tenant_indexes() -> List[str]:
+    """
+    Re-download every tenant index on this host whose GCS meta.json changed (one generation
+    check per tenant) and drop the loaded copy, so its next request loads the new files.
+    Also catches up with a refresh a sibling worker already did. Returns the tenants dropped.
+    """
+    import rag
+
+    root = pathlib.Path(INDEX_DIR, "tenants")
+    tenants = sorted(p.name for p in root.iterdir() if p.is_dir()) if root.is_dir() else []
+    dropped = []
+    for tenant in tenants:
+        try:
+            generation = await asyncio.to_thread(_refresh_tenant, tenant)
+        except Exception as e:  # keep serving what is on disk
+            logger.warning(f"Tenant {tenant!r} index refresh failed: {e}")
+            continue
+        if rag.drop_stale_tenant(tenant, generation):
+            dropped.append(tenant)
+    if dropped:
+        logger.info(f"Tenant indexes republished, reloading on next use: {', '.join(dropped)}")
+    return dropped
+
+
+async def _poll_index_updates():
+    while True:
+        await asyncio.sleep(INDEX_POLL_INTERVAL)
+        try:
+            await reload_index()
+        except Exception as e:  # keep polling; error is visible in /_debug_status
+            logger.warning(f"Index reload check failed: {e}")
+        if INDEX_GCS_URI:
+            await refresh_tenant_indexes()
+
+
+# =========================
+# Warmup / readiness
+# =========================
+def _warmup_sync() -> dict:
+    """Everything the first /ask used to pay for: imports, GCS download, index load, clients."""
+    stages = {}
+    t = time.perf_counter()
+    import rag  # faiss, numpy, mistralai
+    stages["import_s"] = round(time.perf_counter() - t, 3)
+    t = time.perf_counter()
+    ensure_index_local()
+    stages["download_s"] = round(time.perf_counter() - t, 3)
+    stages.update(rag.warmup())
+    return stages
+
+
+async def _warmup():
+    """Run warmup off the event loop (so /health answers meanwhile) and record the outcome."""
+    _warmup_state.update(state="warming", started_at=time.time(), error=None)
+    t0 = time.perf_counter()
+    try:
+        with span("warmup"):
+            _warmup_state["stages"] = await asyncio.to_thread(_warmup_sync)
+    except Exception as e:  # requests still take the lazy path; /ready reports why
+        logger.warning(f"Warmup failed: {e}")
+        _warmup_state.update(state="failed", error=f"{type(e).__name__}: {e}")
+        return
+    _warmup_state.update(state="ready", ready_at=time.time(), warmup_s=round(time.perf_counter() - t0, 3))
+
+
+async def _await_warmup():
+    """A request arriving mid-warmup waits for it instead of repeating the same cold work."""
+    task = _warmup_task
+    if task is not None and not task.done():
+        await asyncio.shield(task)
+
+
+def is_ready() -> bool:
+    return _warmup_state["state"] == "ready" or (WARMUP_MODE == "off" and _warmup_state["state"] == "idle")
+
+
+# =========================
+# Admission control
+# =========================
+_admission = from_config(Config)  # concurrency slots + per-client rate limits for the answer endpoints
+
+
+def _client_ip(request: Request) -> str:
+    if Config.TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+        if forwarded:
+            return forwarded
+    return request.client.host if request.client else "unknown"
+
+
+async def _admit(request: Request, endpoint: str):
+    """A concurrency slot for this request, or 429 / 503 with Retry-After before any work is done."""
+    try:
+        return await _admission.enter(_client_ip(request), request.headers.get("x-api-key"), endpoint)
+    except Rejected as e:
+        REQUESTS.inc(endpoint=endpoint, outcome=e.reason)
+        detail = "Too many requests" if e.status == 429 else "Server busy"
+        raise HTTPException(status_code=e.status, detail=f"{detail}, retry in {e.retry_after}s",
+                            headers={"Retry-After": str(e.retry_after)})
 
 
 # =========================
@@ -100,11 +500,32 @@ def ensure_index_local():
 # =========================
 class AskReq(BaseModel):
     question: str
+    tenant: Optional[str] = None  # whose portfolio (see src/index/tenants.py); None = the default index
+    session_id: Optional[str] = None  # conversation to continue (see src/serving/sessions.py); None = stateless
+
+
+def _tenant(req: AskReq) -> Optional[str]:
+    if req.tenant is None:
+        return None
+    try:
+        return validate_tenant(req.tenant)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _session_id(req: AskReq) -> Optional[str]:
+    if req.session_id is None:
+        return None
+    try:
+        return validate_session_id(req.session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 class AskRes(BaseModel):
     answer: str
     sources: list
+    session_id: Optional[str] = None
 
 
 # =========================
@@ -112,49 +533,171 @@ class AskRes(BaseModel):
 # =========================
 @app.get("/health")
 def health():
+    """Liveness: the process serves HTTP. Never touches the index or the network."""
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once warmup finished (index loaded, clients built), else 503 with the state."""
+    body = {"ready": is_ready(), **_warmup_state, "mode": WARMUP_MODE}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
 @app.post("/ask", response_model=AskRes)
-async def ask(req: AskReq):
+async def ask(req: AskReq, request: Request):
     """
     Loads the FAISS index from GCS on-demand (first request) and delegates to rag.answer.
     The container image does NOT include the index folder; it relies solely on the GCS bucket.
+    Clients sending `Accept: text/event-stream` get the /ask/stream response instead.
+    """
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return await ask_stream(req, request)
+
+    tenant, session_id = _tenant(req), _session_id(req)
+    slot = await _admit(request, "/ask")
+    # REQUEST_DEADLINE_S counts from here; LLM calls below stop retrying/waiting at it
+    with slot, span("request", endpoint="/ask"), deadline(Config.REQUEST_DEADLINE_S):
+        await _await_warmup()
+        # Make sure local index files exist (download from GCS if missing).
+        # Runs in a worker thread: a cold download must not stall the event loop.
+        await _prepare_index(tenant, "/ask")
+
+        # Lazy import so startup stays fast
+        from rag import answer
+        try:
+            out, cites = await answer(req.question, tenant=tenant, session_id=session_id)
+        except UnknownTenant as e:
+            REQUESTS.inc(endpoint="/ask", outcome="unknown_tenant")
+            raise HTTPException(status_code=404, detail=str(e))
+        except IndexManifestError as e:
+            REQUESTS.inc(endpoint="/ask", outcome="index_error")
+            raise HTTPException(status_code=500, detail=f"Index does not match its manifest/embedder: {e}")
+        except Exception:
+            REQUESTS.inc(endpoint="/ask", outcome="error")
+            raise
+    REQUESTS.inc(endpoint="/ask", outcome="ok")
+    return {"answer": out, "sources": cites, "session_id": session_id}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskReq, request: Request):
     """
-    # Make sure local index files exist (download from GCS if missing)
+    Server-Sent Events variant of /ask: a `sources` event after retrieval, `delta`
+    events with text as it is generated, then `done` with timings (or `error`).
+    The admission slot is held until the stream ends.
+    """
+    tenant, session_id = _tenant(req), _session_id(req)
+    slot = await _admit(request, "/ask/stream")
+    end = time.monotonic() + Config.REQUEST_DEADLINE_S if Config.REQUEST_DEADLINE_S > 0 else None
     try:
-        ensure_index_local()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to prepare index from GCS: {e}")
+        await _await_warmup()
+        await _prepare_index(tenant, "/ask/stream")
+    except BaseException:  # HTTP error, or cancelled while waiting for warmup / the download
+        slot.release()
+        raise
 
-    # Lazy import so startup stays fast
-    from rag import answer
-    out, cites = await answer(req.question)
-    return {"answer": out, "sources": cites}
+    from rag import answer_stream
 
+    async def events():
+        with slot, span("request", endpoint="/ask/stream"), deadline(at=end):
+            try:
+                async for event, data in answer_stream(req.question, tenant=tenant, session_id=session_id):
+                    yield _sse(event, data)
+            except Exception as e:
+                REQUESTS.inc(endpoint="/ask/stream", outcome="error")
+                yield _sse("error", {"detail": str(e)})
+                return
+        REQUESTS.inc(endpoint="/ask/stream", outcome="ok")
 
-@app.post("/admin/warmup")
-def admin_warmup():
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot.release),  # client gone before the stream started
+    )
+
+
+@app.post("/admin/reload-index")
+async def admin_reload_index(force: bool = False):
     """
-    Optional: proactively download index from GCS.
+    Check for a new index version and hot-swap it (see reload_index).
     """
     try:
-        ensure_index_local()
-        return {"status": "ok", "downloaded": True}
+        return await reload_index(force=force)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Index reload failed: {e}")
+
+
+@app.post("/admin/warmup")
+async def admin_warmup():
+    """
+    Run (or re-run, e.g. after a failed boot warmup) the full warmup: download, load, clients.
+    """
+    await _await_warmup()
+    await _warmup()
+    if _warmup_state["state"] != "ready":
+        raise HTTPException(status_code=500, detail=_warmup_state["error"])
+    return {"status": "ok", "downloaded": True, "warmup_s": _warmup_state["warmup_s"], "stages": _warmup_state["stages"]}
+
+
+def _collect_app_metrics():
+    st = _reload_state
+    yield ("rag_index_reloads", "counter", "Index versions swapped in without a restart", [("_total", {}, st["reloads"])])
+    yield ("rag_index_last_reload_seconds", "gauge", "Download + load + validate time of the last reload",
+           [("", {"mode": st["last_reload_mode"] or "none"}, st["last_reload_s"])] if st["last_reload_s"] is not None else [])
+    yield ("rag_index_reload_failing", "gauge", "1 while the last reload attempt failed",
+           [("", {}, 1 if st["last_reload_error"] else 0)])
+    yield ("rag_ready", "gauge", "1 once warmup has finished (see /ready)", [("", {}, 1 if is_ready() else 0)])
+    yield ("rag_warmup_seconds", "gauge", "Duration of the last successful warmup",
+           [("", {}, _warmup_state["warmup_s"])] if _warmup_state["warmup_s"] is not None else [])
+    yield from _admission.collect()
+
+
+REGISTRY.collector("app", _collect_app_metrics)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: stage latencies, caches, index, LLM tokens / errors / mock fallbacks."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/_debug_status")
 def _debug_status():
-    idx = pathlib.Path(INDEX_PATH).exists()
-    meta = pathlib.Path(META_PATH).exists()
+    location = _index_location()
+    idx = location.index_path.exists()
+    meta = location.meta_path.exists()
+    chunks = (location.root / "chunks.bin").exists()  # optional: older indexes inline texts in meta.json
+    lexical = (location.root / "lexical.bin").exists()  # optional: BM25 side of hybrid search
+    rag = sys.modules.get("rag")  # don't import rag (faiss) just to report status
     # Mirror old shape, but include GCS info and any last error for transparency
     return {
         "index_present": idx,
         "meta_present": meta,
+        "chunks_present": chunks,
+        "lexical_present": lexical,
         "source_files": [],  # image does not ship sources; data lives in GCS
         "gcs_uri": INDEX_GCS_URI or "",
         "index_dir": INDEX_DIR,
+        "index_generation": location.generation(),
         "last_download_error": _last_download_err,
+        "query_cache": rag.query_cache_stats() if rag else None,
+        "answer_cache": rag.answer_cache_stats() if rag else None,
+        "index_version": rag.active_index_version() if rag else None,
+        "query_embedder": rag.query_embedder_info() if rag else None,
+        "micro_batching": rag.batching_stats() if rag else None,
+        "rerank": rag.rerank_stats() if rag else None,
+        "llm_circuit": rag.llm_stats() if rag else None,
+        "admission": _admission.stats(),
+        "tenants": rag.tenant_stats() if rag else None,
+        "sessions": rag.session_stats() if rag else None,
+        "speculation": rag.speculation_stats() if rag else None,
+        "index_error": rag.index_error() if rag else None,
+        "index_reload": {**_reload_state, "poll_interval_s": INDEX_POLL_INTERVAL},
+        "warmup": {**_warmup_state, "mode": WARMUP_MODE},
     }
@@ -0,0 +1,99 @@
+# benchmarks/bench_admission.py
+"""
+Overload behaviour of POST /ask with and without admission control.
+
+Fires a burst of N parallel /ask calls at the app (stub embedding/LLM server in a child
+process) for each setup and reports how many were answered / shed, the latency of the
+answered ones and of the rejections, and the Retry-After the rejected clients were given:
+
+    unlimited       MAX_CONCURRENT_REQUESTS=0: every request is accepted and they all queue
+                    inside the app (threads, LLM connections)
+    limit L, q Q    L in flight, Q waiting; the rest get 503 + Retry-After immediately
+
+    python -m benchmarks.bench_admission --n 200 --limit 16 --queue 32 --chat-latency 0.5
+"""
+import argparse
+import asyncio
+import collections
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import build_toy_index, fmt_ms, free_port, serve_app_in_thread, spawn_stub_process
+
+
+async def _burst(base_url: str, n: int):
+    import httpx
+
+    ok, shed, statuses, retry_after = [], [], collections.Counter(), []
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=httpx.Limits(max_connections=n + 8)) as client:
+        async def one(i: int):
+            t0 = time.perf_counter()
+            r = await client.post("/ask", json={"question": f"What projects has Erika built? #{i}"})
+            (ok if r.status_code == 200 else shed).append(time.perf_counter() - t0)
+            statuses[r.status_code] += 1
+            if "retry-after" in r.headers:
+                retry_after.append(int(r.headers["retry-after"]))
+
+        await one(-1)  # warm: index load + client init
+        ok.clear(), statuses.clear()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n)))
+        wall = time.perf_counter() - t0
+    return ok, shed, statuses, retry_after, wall
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=200, help="parallel /ask calls in the burst")
+    ap.add_argument("--limit", type=int, default=16, help="MAX_CONCURRENT_REQUESTS")
+    ap.add_argument("--queue", type=int, default=32, help="ADMISSION_QUEUE_SIZE")
+    ap.add_argument("--queue-timeout", type=float, default=5.0, help="ADMISSION_QUEUE_TIMEOUT_S")
+    ap.add_argument("--embed-latency", type=float, default=0.05, help="stub embedding latency (s)")
+    ap.add_argument("--chat-latency", type=float, default=0.5, help="stub completion latency (s)")
+    args = ap.parse_args()
+
+    stub, stub_url = spawn_stub_process(embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+    tmp = Path(tempfile.mkdtemp(prefix="bench-idx-"))
+    build_toy_index(tmp, n_chunks=200)
+
+    # must be set before src.config / app / rag are imported
+    os.environ["MISTRAL_SERVER_URL"] = stub_url
+    os.environ.setdefault("MISTRAL_API_KEY", "stub-key")
+    os.environ["INDEX_DIR"] = str(tmp)
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ["RATE_LIMIT_RPS"] = "0"
+
+    import app as app_module
+    import rag
+    from src.config import Config
+    from src.serving.admission import from_config
+
+    rag.INDEX_PATH = tmp / "faiss.index"
+    rag.META_PATH = tmp / "meta.json"
+
+    port = free_port()
+    server = serve_app_in_thread(app_module.app, port)
+    setups = {"unlimited": 0, f"limit {args.limit}, q {args.queue}": args.limit}
+    print(f"=== burst of {args.n} /ask (embed={args.embed_latency}s, chat={args.chat_latency}s) ===")
+    try:
+        for name, limit in setups.items():
+            Config.MAX_CONCURRENT_REQUESTS, Config.ADMISSION_QUEUE_SIZE = limit, args.queue
+            Config.ADMISSION_QUEUE_TIMEOUT_S = args.queue_timeout
+            app_module._admission = from_config(Config)
+            ok, shed, statuses, retry_after, wall = asyncio.run(_burst(f"http://127.0.0.1:{port}", args.n))
+            print(f"{name:18s} statuses {dict(sorted(statuses.items()))}  wall {wall:.2f}s")
+            print(f"  answered: {fmt_ms(ok)}")
+            if shed:
+                print(f"  rejected: {fmt_ms(shed)}  Retry-After {min(retry_after)}-{max(retry_after)}s")
+    finally:
+        server.should_exit = True
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_ann.py
+"""
+Recall-vs-latency benchmark for the ANN index types in src/index/ann.py.
+
+For each corpus size, builds flat / HNSW / IVF-Flat / IVF-PQ over synthetic clustered
+unit vectors (mistral-embed sized, d=1024), then reports recall@k against the flat
+index, single-query latency (p50/p99) and serialized index size for a sweep of
+efSearch / nprobe values.
+
+    python -m benchmarks.bench_ann --sizes 2000 20000 --k 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import pct
+from src.index.ann import apply_search_params, build_index
+
+
+def clustered_unit_vectors(n: int, d: int, n_clusters: int, rng) -> np.ndarray:
+    """Topic-like data: points scattered around random centroids (closer to real text than iid noise)."""
+    centers = rng.standard_normal((n_clusters, d)).astype("float32")
+    x = centers[rng.integers(0, n_clusters, n)] + 0.6 * rng.standard_normal((n, d)).astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int):
+    lat, found = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        lat.append(time.perf_counter() - t0)
+        found.append(ids[0])
+    found = np.stack(found)
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return recall, lat
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000])
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--pq-m", type=int, default=64)
+    ap.add_argument("--threads", type=int, default=1, help="faiss OpenMP threads (1 = per-request serving)")
+    args = ap.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    rng = np.random.default_rng(0)
+    sweeps = {
+        "flat": [{}],
+        "hnsw": [{"ef_search": e} for e in (16, 64, 128)],
+        "ivf_flat": [{"nprobe": p} for p in (1, 8, 32)],
+        "ivf_pq": [{"nprobe": p} for p in (8, 32)],
+    }
+
+    for n in args.sizes:
+        data = clustered_unit_vectors(n, args.dim, n_clusters=max(8, n // 200), rng=rng)
+        queries = data[rng.choice(n, args.queries, replace=False)] + 0.05 * rng.standard_normal((args.queries, args.dim)).astype("float32")
+        faiss.normalize_L2(queries)
+
+        flat, _ = build_index(data, "flat")
+        _, truth = flat.search(queries, args.k)
+
+        print(f"\n=== N={n} d={args.dim} k={args.k} queries={args.queries} ===")
+        print(f"{'index':10s} {'build params':26s} {'search':12s} {'recall@k':>8s} {'p50':>9s} {'p99':>9s} {'size':>9s} {'build':>8s}")
+        for kind, settings in sweeps.items():
+            t0 = time.perf_counter()
+            index, params = build_index(data, kind, pq_m=args.pq_m)
+            build_s = time.perf_counter() - t0
+            if params["type"] != kind:
+                print(f"{kind:10s} (corpus too small to train; fell back to {params['type']})")
+                continue
+            size_mb = faiss.serialize_index(index).nbytes / 1e6  # a close proxy for resident memory
+            for s in settings:
+                applied = apply_search_params(index, **s)
+                recall, lat = measure(index, queries, truth, args.k)
+                built = ",".join(f"{k}={v}" for k, v in params.items() if k not in ("type", "train_sample"))
+                search = ",".join(f"{k}={v}" for k, v in applied.items())
+                print(f"{kind:10s} {built:26s} {search:12s} {recall:8.3f} {pct(lat, 50) * 1e3:7.3f}ms "
+                      f"{pct(lat, 99) * 1e3:7.3f}ms {size_mb:7.1f}MB {build_s:7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
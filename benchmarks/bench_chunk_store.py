@@ -0,0 +1,95 @@
+# benchmarks/bench_chunk_store.py
+"""
+Startup / RSS benchmark: legacy meta.json (texts inlined, indent=2) vs chunks.bin (mmap).
+
+Each variant is loaded in a fresh subprocess, which reports the load time, the RSS
+growth caused by the load and the time to materialize k=5 random chunks.
+
+    python -m benchmarks.bench_chunk_store --chunks 20000 --chunk-chars 800
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+_PROBE = r"""
+import json, random, sys, time
+sys.path.insert(0, {root!r})
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+from src.index.chunk_store import ChunkStore, ListChunkStore
+mode, path = sys.argv[1], sys.argv[2]
+before = rss_kb()
+t0 = time.perf_counter()
+if mode == "json":
+    with open(path, encoding="utf-8") as f:
+        meta = json.load(f)
+    store = ListChunkStore(meta["texts"])
+else:
+    store = ChunkStore(path)
+load_s = time.perf_counter() - t0
+after = rss_kb()
+ids = random.Random(0).sample(range(len(store)), 5)
+t1 = time.perf_counter()
+for _ in range(1000):
+    texts = [store.text(i) for i in ids]
+fetch_us = (time.perf_counter() - t1) / 1000 * 1e6
+print(json.dumps({{"load_ms": load_s * 1000, "rss_mb": (after - before) / 1024, "fetch5_us": fetch_us}}))
+"""
+
+
+def _probe(mode: str, path: Path) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(root=str(ROOT)), mode, str(path)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--chunks", type=int, default=20000)
+    ap.add_argument("--chunk-chars", type=int, default=800)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from src.index.chunk_store import write_chunk_store
+
+    words = "Erika data science FAISS Mistral pipeline análise dados projeto model".split()
+    texts = []
+    for i in range(args.chunks):
+        s, j = [], i
+        while sum(len(w) + 1 for w in s) < args.chunk_chars:
+            s.append(words[j % len(words)])
+            j = j * 31 + 7
+        texts.append(" ".join(s))
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench-chunks-"))
+    meta_path, chunks_path = tmp / "meta.json", tmp / "chunks.bin"
+    with open(meta_path, "w", encoding="utf-8") as f:  # same shape/indent as the old ingest_mistral.py
+        json.dump({"model": "mistral-embed", "dim": 1024, "texts": texts}, f, ensure_ascii=False, indent=2)
+    write_chunk_store(chunks_path, texts)
+
+    print(f"=== chunk metadata: {args.chunks} chunks x ~{args.chunk_chars} chars ===")
+    for label, mode, path in (("meta.json (json.load)", "json", meta_path), ("chunks.bin (mmap)", "mmap", chunks_path)):
+        runs = [_probe(mode, path) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["load_ms"])
+        size_mb = path.stat().st_size / 1e6
+        print(f"{label:24s} file={size_mb:7.1f}MB  load={best['load_ms']:8.2f}ms  "
+              f"rss+={best['rss_mb']:7.1f}MB  fetch k=5={best['fetch5_us']:6.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_cold_start.py
+"""
+Time-to-first-answer of a fresh API process, per WARMUP_MODE (off = the old lazy path).
+
+Each run spawns `uvicorn app:app` in a new interpreter (real cold imports) against a toy
+index and the stub Mistral API, polls /health until the socket accepts, then sends the
+first /ask — right away, or after --idle seconds, which stands in for the platform
+routing traffic some time after the container starts. It reports:
+
+    listen     spawn -> /health answers
+    ready      spawn -> /ready is 200 (warmup finished)
+    first ask  latency of the first /ask, and spawn -> first answer
+    warm ask   latency of a second /ask (the steady state)
+
+    python -m benchmarks.bench_cold_start --chunks 20000 --idle 0 1
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import build_toy_index, free_port, spawn_stub_process
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _wait(url: str, deadline: float, ok=lambda r: r.status_code == 200) -> float:
+    while time.time() < deadline:
+        try:
+            if ok(httpx.get(url, timeout=1)):
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def run_once(mode: str, workdir: Path, stub_url: str, idle: float) -> dict:
+    port = free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "INDEX_DIR": str(workdir / "data" / "index"),
+        "MISTRAL_SERVER_URL": stub_url,
+        "MISTRAL_API_KEY": "stub-key",
+        "WARMUP_MODE": mode,
+        "ANSWER_CACHE_ENABLED": "false",
+    }
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 120
+        t_listen = _wait(f"{base}/health", deadline)
+        if idle:
+            time.sleep(idle)
+        t1 = time.perf_counter()
+        r = httpx.post(f"{base}/ask", json={"question": "What projects has Erika built?"}, timeout=120)
+        r.raise_for_status()
+        t_answer = time.perf_counter()
+        t_ready = _wait(f"{base}/ready", deadline)
+        t2 = time.perf_counter()
+        httpx.post(f"{base}/ask", json={"question": "Which tools does Erika use?"}, timeout=120).raise_for_status()
+        warm = time.perf_counter() - t2
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {
+        "listen": t_listen - t0,
+        "ready": t_ready - t0,
+        "first_ask": t_answer - t1,
+        "first_answer": t_answer - t0,
+        "warm_ask": warm,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--chunks", type=int, default=20000, help="toy index size")
+    ap.add_argument("--modes", nargs="+", default=["off", "background", "blocking"])
+    ap.add_argument("--idle", type=float, nargs="+", default=[0.0, 1.0], help="seconds between listen and first /ask")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--embed-latency", type=float, default=0.05)
+    ap.add_argument("--chat-latency", type=float, default=0.1)
+    args = ap.parse_args()
+
+    stub, stub_url = spawn_stub_process(embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+    workdir = Path(tempfile.mkdtemp(prefix="bench-cold-"))
+    build_toy_index(workdir / "data" / "index", n_chunks=args.chunks)
+    print(f"=== time to first answer: {args.chunks} chunks, embed={args.embed_latency}s chat={args.chat_latency}s,"
+          f" median of {args.repeat} ===")
+    print(f"{'mode':11s} {'idle':>5s} {'listen':>8s} {'ready':>8s} {'1st ask':>8s} {'1st answer':>11s} {'warm ask':>9s}")
+    try:
+        for idle in args.idle:
+            for mode in args.modes:
+                runs = [run_once(mode, workdir, stub_url, idle) for _ in range(args.repeat)]
+                med = {k: sorted(r[k] for r in runs)[len(runs) // 2] for k in runs[0]}
+                print(f"{mode:11s} {idle:5.1f} {med['listen']:7.2f}s {med['ready']:7.2f}s {med['first_ask']:7.3f}s"
+                      f" {med['first_answer']:10.2f}s {med['warm_ask']:8.3f}s")
+    finally:
+        stub.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_concurrency.py
+"""
+Concurrency benchmark for POST /ask against a local stub embedding/LLM server.
+
+Fires N parallel /ask calls (for a few rounds) while probing /health, and prints
+p50/p99 latency for both. With a blocking embedder every /health probe queues behind
+the embedding round-trips; with the async pipeline it stays in the low milliseconds.
+
+    python -m benchmarks.bench_concurrency --n 32 --embed-latency 0.2 --chat-latency 0.3
+    python -m benchmarks.bench_concurrency --batch-window-ms 0   # compare micro-batching windows
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import build_toy_index, fmt_ms, free_port, serve_app_in_thread, spawn_stub_process
+
+
+async def _run(base_url: str, n: int, rounds: int):
+    import httpx
+
+    ask_lat, health_lat = [], []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=n + 8)) as client:
+        async def one_ask(i: int):
+            t0 = time.perf_counter()
+            r = await client.post("/ask", json={"question": f"What projects has Erika built? #{i}"})
+            r.raise_for_status()
+            ask_lat.append(time.perf_counter() - t0)
+
+        async def probe_health(stop: asyncio.Event):
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                await client.get("/health")
+                health_lat.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.01)
+
+        await one_ask(-1)  # warm: index load + client init
+        ask_lat.clear()
+        t_start = time.perf_counter()
+        for _ in range(rounds):
+            stop = asyncio.Event()
+            prober = asyncio.create_task(probe_health(stop))
+            await asyncio.gather(*(one_ask(i) for i in range(n)))
+            stop.set()
+            await prober
+        wall = time.perf_counter() - t_start
+    return ask_lat, health_lat, wall
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=32, help="parallel /ask calls per round")
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--embed-latency", type=float, default=0.2, help="stub embedding latency (s)")
+    ap.add_argument("--chat-latency", type=float, default=0.3, help="stub completion latency (s)")
+    ap.add_argument("--chunks", type=int, default=500, help="toy index size")
+    ap.add_argument("--batch-window-ms", type=float, default=None, help="QUERY_BATCH_WINDOW_MS override")
+    args = ap.parse_args()
+
+    stub, stub_url = spawn_stub_process(embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+    tmp = Path(tempfile.mkdtemp(prefix="bench-idx-"))
+    build_toy_index(tmp, n_chunks=args.chunks)
+
+    # must be set before src.config / app / rag are imported
+    os.environ["MISTRAL_SERVER_URL"] = stub_url
+    os.environ.setdefault("MISTRAL_API_KEY", "stub-key")
+    os.environ["INDEX_DIR"] = str(tmp)
+    if args.batch_window_ms is not None:
+        os.environ["QUERY_BATCH_WINDOW_MS"] = str(args.batch_window_ms)
+
+    import rag
+    from app import app
+
+    rag.INDEX_PATH = tmp / "faiss.index"
+    rag.META_PATH = tmp / "meta.json"
+
+    port = free_port()
+    server = serve_app_in_thread(app, port)
+    try:
+        ask_lat, health_lat, wall = asyncio.run(_run(f"http://127.0.0.1:{port}", args.n, args.rounds))
+    finally:
+        server.should_exit = True
+        stub.terminate()
+
+    total = args.n * args.rounds
+    print(f"=== /ask concurrency (n={args.n}, rounds={args.rounds}, embed={args.embed_latency}s, chat={args.chat_latency}s) ===")
+    print(f"/ask    : {fmt_ms(ask_lat)}")
+    print(f"/health : {fmt_ms(health_lat)}")
+    print(f"throughput: {total / wall:.1f} req/s  (wall {wall:.2f}s)")
+    for name, stats in rag.batching_stats().items():
+        if stats:
+            print(f"{name} batches (window {stats['window_ms']:.0f}ms): mean size {stats['mean_size']}  {stats['buckets']}")
+
+
+if __name__ == "__main__":
+    main()
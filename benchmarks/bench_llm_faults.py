@@ -0,0 +1,89 @@
+# benchmarks/bench_llm_faults.py
+"""
+Time to first token and failure share of MistralLLMService when the provider misbehaves.
+
+The local stub fails ERROR_RATE of the chat calls (HTTP 503) and stalls SLOW_RATE of them for
+SLOW_LATENCY s (see chat_faults / error_rate / slow_rate in stub_mistral.py). The same seeded
+fault sequence is replayed for each setup:
+
+    none        one attempt, no hedging (the behaviour before retries existed)
+    retry       LLM_MAX_RETRIES retries with jittered backoff
+    retry+hedge plus a hedged second request after HEDGE_MS
+
+Each streamed call runs under a DEADLINE s request deadline; ttft is measured from the call
+to its first token, failures are calls that raised LLMUnavailable (rag answers those with
+the fallback line), calls counts the chat requests the stub received.
+
+    python -m benchmarks.bench_llm_faults
+    python -m benchmarks.bench_llm_faults --error-rate 0.2 --slow-rate 0.1 --hedge-ms 300
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import pct
+from benchmarks.stub_mistral import StubMistralServer
+from src.llm.mistral_service import MistralLLMService, make_client
+from src.llm.resilience import CircuitBreaker, LLMUnavailable, RetryPolicy, deadline
+
+
+async def run(stub: StubMistralServer, svc: MistralLLMService, n: int, concurrency: int, limit: float):
+    sem = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with sem:
+            t0, ttft = time.perf_counter(), None
+            try:
+                with deadline(limit):
+                    async for _ in svc.generate_response_stream("hi"):
+                        ttft = ttft or time.perf_counter() - t0
+            except LLMUnavailable:
+                failures += 1
+            latencies.append((ttft or time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    await svc.client.sdk_configuration.async_client.aclose()
+    return latencies, failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--chat-latency", type=float, default=0.1, help="s to first token when healthy")
+    ap.add_argument("--error-rate", type=float, default=0.1)
+    ap.add_argument("--slow-rate", type=float, default=0.05)
+    ap.add_argument("--slow-latency", type=float, default=2.0)
+    ap.add_argument("--retries", type=int, default=2)
+    ap.add_argument("--hedge-ms", type=float, default=400, help="hedge delay; set near the healthy p95 TTFT")
+    ap.add_argument("--deadline", type=float, default=5.0)
+    args = ap.parse_args()
+
+    setups = {"none": (0, 0), "retry": (args.retries, 0), "retry+hedge": (args.retries, args.hedge_ms)}
+    print(f"=== {args.requests} requests x{args.concurrency}, errors {args.error_rate:.0%}, "
+          f"slow {args.slow_rate:.0%} (+{args.slow_latency:.1f} s), deadline {args.deadline:.1f} s ===")
+    print(f"{'setup':12s} {'ttft p50':>9s} {'ttft p95':>9s} {'ttft p99':>9s} {'failed':>7s} {'calls':>6s}")
+    for name, (retries, hedge_ms) in setups.items():
+        stub = StubMistralServer(chat_latency=args.chat_latency, error_rate=args.error_rate,
+                                 slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+        url = stub.start()
+        try:
+            svc = MistralLLMService(api_key="stub", client=make_client("stub", url),
+                                    retry=RetryPolicy(max_retries=retries, base=0.05),
+                                    breaker=CircuitBreaker(failures=0), hedge_after_ms=hedge_ms)
+            lat, failed = asyncio.run(run(stub, svc, args.requests, args.concurrency, args.deadline))
+        finally:
+            stub.stop()
+        calls = stub.calls.get("/v1/chat/completions", 0)
+        print(f"{name:12s} {pct(lat, 50):9.0f} {pct(lat, 95):9.0f} {pct(lat, 99):9.0f}"
+              f" {failed / args.requests:7.1%} {calls:6d}")
+
+
+if __name__ == "__main__":
+    main()
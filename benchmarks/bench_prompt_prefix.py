@@ -0,0 +1,111 @@
+# benchmarks/bench_prompt_prefix.py
+"""
+Prompt tokens and time to first token for the full and compact system prompts, with and
+without the cached-prefix message layout (MistralLLMService prefix_cache).
+
+Questions from benchmarks/data/hybrid_eval.jsonl plus a few Portuguese / Dutch ones go through
+rag.answer_stream against the local stub, which charges PREFILL ms per prompt token that is
+not a prefix of a recent prompt (see stub_mistral.py). Per setup:
+
+    prompt      prompt tokens counted locally (rag's PROMPT_TOKENIZER; system + user)
+    system      of which system prompt + per-request instructions
+    cached      share of the stub's prompt tokens that hit its prefix cache
+    ttft p50/95 ms from the LLM call to the first streamed token (retrieval excluded)
+
+    python -m benchmarks.bench_prompt_prefix
+    python -m benchmarks.bench_prompt_prefix --prefill-ms 0.5 --chat-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import rag
+from benchmarks.common import pct
+from benchmarks.eval_hybrid import build_temp_index
+from benchmarks.stub_mistral import StubMistralServer
+from src.config import Config
+
+EXTRA_QUESTIONS = [
+    "Quais projetos a Erika já construiu?",
+    "Qual é a formação da Erika?",
+    "Quais ferramentas a Erika usa no dia a dia?",
+    "Welke projecten heeft Erika gebouwd?",
+    "Welke opleiding heeft Erika gevolgd?",
+    "Hoe lang werkt Erika al als data scientist?",
+]
+
+SETUPS = {  # name -> (PROMPT_STYLE, LLM_PREFIX_CACHE)
+    "full": ("full", False),
+    "full+prefix": ("full", True),
+    "compact": ("compact", False),
+    "compact+prefix": ("compact", True),
+}
+
+
+async def run(questions, stub: StubMistralServer, rounds: int):
+    results = {}
+    for name, (style, prefix) in SETUPS.items():
+        Config.PROMPT_STYLE, Config.LLM_PREFIX_CACHE = style, prefix
+        rag._llm = None
+        stub.prompts.clear()
+        stub._seen.clear()  # every setup starts with a cold provider cache
+        rows = []
+        for _ in range(rounds):
+            for q in questions:
+                events = [e async for e in rag.answer_stream(q)]
+                done = events[-1][1]
+                if "prompt_tokens" in done:
+                    t = done["timing"]
+                    rows.append({**done["prompt_tokens"], "ttft": t["ttft_ms"] - t["retrieval_ms"]})
+        n = sum(p for p, _ in stub.prompts)
+        results[name] = (rows, sum(c for _, c in stub.prompts) / max(n, 1))
+    return results
+
+
+def report(results):
+    print(f"{'setup':15s} {'prompt':>7s} {'system':>7s} {'cached':>7s} {'ttft p50':>9s} {'ttft p95':>9s}")
+    for name, (rows, cached) in results.items():
+        ttft = [r["ttft"] for r in rows]
+        print(f"{name:15s} {np.mean([r['total'] for r in rows]):7.0f} {np.mean([r['system'] for r in rows]):7.0f}"
+              f" {cached:7.0%} {pct(ttft, 50):9.1f} {pct(ttft, 95):9.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--source", type=Path, default=Path("data/source/docs"))
+    ap.add_argument("--queries", type=Path, default=Path(__file__).with_name("data") / "hybrid_eval.jsonl")
+    ap.add_argument("--rounds", type=int, default=1, help="passes over the questions (repeats are fully cached)")
+    ap.add_argument("--chat-latency", type=float, default=0.05, help="s before prefill (network, queueing)")
+    ap.add_argument("--prefill-ms", type=float, default=0.2, help="ms per uncached prompt token")
+    ap.add_argument("--no-provider-cache", action="store_true", help="stub without prefix caching")
+    args = ap.parse_args()
+
+    questions = [json.loads(line)["question"] for line in args.queries.read_text(encoding="utf-8").splitlines()
+                 if line.strip()] + EXTRA_QUESTIONS
+    stub = StubMistralServer(chat_latency=args.chat_latency, prefill_latency=args.prefill_ms / 1000,
+                             prefix_cache=not args.no_provider_cache)
+    Config.MISTRAL_SERVER_URL, Config.LLM_API_KEY = stub.start(), "stub"
+    Config.ANSWER_CACHE_ENABLED = False
+    Config.QUERY_BATCH_WINDOW_MS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            index_dir = build_temp_index(args.source, Path(tmp), 800, 120)
+            rag.activate_index(rag.load_index_state(index_dir / "faiss.index", index_dir / "meta.json"))
+            results = asyncio.run(run(questions, stub, args.rounds))
+    finally:
+        stub.stop()
+    print(f"=== {len(questions)} questions x {args.rounds}, prefill {args.prefill_ms} ms/token, "
+          f"chat latency {args.chat_latency * 1000:.0f} ms, provider cache {'off' if args.no_provider_cache else 'on'},"
+          f" tokenizer={rag.prompt_tokens().provider} ===")
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_query_embedder.py
+"""
+Query-embedding latency / throughput: remote (Mistral API or stub) vs local ONNX on CPU.
+
+For each backend: sequential single-query latency, throughput with --concurrency
+simultaneous single-query calls, and throughput when queries are sent as batches.
+
+    python -m benchmarks.bench_query_embedder --embed-latency 0.15       # stub stands in for the API
+    python -m benchmarks.bench_query_embedder --real                     # real API (MISTRAL_API_KEY)
+    python -m benchmarks.bench_query_embedder --onnx-dir models/query-embedder --threads 4
+
+The local column needs onnxruntime + tokenizers and an export from export_onnx.py;
+it is skipped (with the reason) otherwise.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import fmt_ms, spawn_stub_process
+from src.config import Config
+from src.embedding.query_embedder import MistralQueryEmbedder, OnnxQueryEmbedder
+
+QUESTIONS = [
+    "What projects has Erika built?",
+    "Quais ferramentas a Erika usa no dia a dia?",
+    "Welke opleiding heeft Erika gevolgd?",
+    "Does she have experience with FAISS, dbt and Airflow?",
+]
+
+
+def _questions(n: int, tag: str):
+    return [f"{QUESTIONS[i % len(QUESTIONS)]} ({tag} {i})" for i in range(n)]  # unique: no cache effects
+
+
+async def bench(embedder, n: int, concurrency: int, batch_sizes):
+    await embedder.embed(["warm up"])
+    seq = []
+    for q in _questions(n, "seq"):
+        t0 = time.perf_counter()
+        await embedder.embed([q])
+        seq.append(time.perf_counter() - t0)
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(q):
+        async with sem:
+            await embedder.embed([q])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in _questions(n, "conc")))
+    conc_qps = n / (time.perf_counter() - t0)
+
+    batched = {}
+    for b in batch_sizes:
+        qs = _questions(max(n, b), f"b{b}")
+        t0 = time.perf_counter()
+        for i in range(0, len(qs), b):
+            await embedder.embed(qs[i : i + b])
+        wall = time.perf_counter() - t0
+        batched[b] = (len(qs) / wall, wall / -(-len(qs) // b))
+    return seq, conc_qps, batched
+
+
+def report(name: str, seq, conc_qps: float, batched, concurrency: int):
+    print(f"\n[{name}]")
+    print(f"  single query      {fmt_ms(seq)}")
+    print(f"  concurrency={concurrency:<3d}    {conc_qps:8.1f} q/s")
+    for b, (qps, per_batch) in batched.items():
+        print(f"  batch={b:<3d}         {qps:8.1f} q/s  ({per_batch * 1000:.1f}ms per batch)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=64, help="queries per measurement")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--batch", type=int, nargs="+", default=[8, 32])
+    ap.add_argument("--embed-latency", type=float, default=0.15, help="stub API latency (s), ignored with --real")
+    ap.add_argument("--real", action="store_true", help="call the real Mistral API instead of the stub")
+    ap.add_argument("--onnx-dir", default=Config.ONNX_MODEL_DIR)
+    ap.add_argument("--threads", type=int, default=Config.ONNX_THREADS, help="onnxruntime intra-op threads (0 = all)")
+    args = ap.parse_args()
+
+    from mistralai import Mistral
+
+    stub = None
+    if args.real:
+        client = Mistral(api_key=Config.LLM_API_KEY or os.getenv("MISTRAL_API_KEY"), server_url=Config.MISTRAL_SERVER_URL)
+        remote_name = "remote: Mistral API"
+    else:
+        stub, url = spawn_stub_process(embed_latency=args.embed_latency)
+        client = Mistral(api_key="stub-key", server_url=url)
+        remote_name = f"remote: stub API ({args.embed_latency * 1000:.0f}ms per call)"
+
+    print(f"=== query embedder benchmark: n={args.n}, concurrency={args.concurrency}, batches={args.batch} ===")
+    try:
+        remote = MistralQueryEmbedder(client)
+        report(remote_name, *asyncio.run(bench(remote, args.n, args.concurrency, args.batch)), args.concurrency)
+    finally:
+        if stub is not None:
+            stub.terminate()
+
+    try:
+        local = OnnxQueryEmbedder(args.onnx_dir, threads=args.threads, max_batch=max(args.batch))
+    except (RuntimeError, FileNotFoundError) as e:
+        print(f"\n[local: onnx] skipped: {e}")
+        return
+    name = f"local: onnx {local.model} ({args.threads or os.cpu_count()} threads)"
+    report(name, *asyncio.run(bench(local, args.n, args.concurrency, args.batch)), args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_sessions.py
+"""
+Prompt size per turn as a conversation grows: history re-sent in full vs. bounded and compacted.
+
+Runs --turns follow-up questions through rag.answer_stream with one session_id against the
+local stub API (its replies stand in for answers, condensed follow-ups and summaries) and the
+toy index, once per mode:
+
+    full       every earlier turn in the prompt (SESSION_HISTORY_TOKENS huge, no compaction)
+    compacted  SESSION_HISTORY_TOKENS / SESSION_KEEP_TURNS / SESSION_SUMMARY_TOKENS as given
+
+and prints the locally counted history and total prompt tokens at a few turns, and the
+wall time of the run.
+
+    python -m benchmarks.bench_sessions
+    python -m benchmarks.bench_sessions --turns 40 --history-tokens 400
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import rag
+from benchmarks.common import build_toy_index
+from benchmarks.stub_mistral import STUB_ANSWER, StubMistralServer
+from src.config import Config
+
+QUESTIONS = ["What projects has Erika built?", "Tell me more about that project.", "Which tools did she use there?",
+             "And before that?", "What did she learn from it?"]
+
+
+def _reply(messages):
+    system = messages[0]["content"]
+    if "standalone question" in system:
+        return "Which tools did Erika use in the RAG portfolio project?"
+    if "running summary" in system:
+        return "The visitor asked about Erika's RAG projects, the tools she used (FAISS, Mistral) and her background."
+    return ("Erika built a RAG assistant with FAISS and Mistral for her portfolio, and a demand forecasting "
+            "pipeline before that. ") * 3 + "\n\n" + STUB_ANSWER.split("\n\n", 1)[1]
+
+
+async def run(turns: int, session_id: str):
+    rows = []
+    for i in range(turns):
+        async for event, data in rag.answer_stream(QUESTIONS[i % len(QUESTIONS)], session_id=session_id):
+            if event == "done":
+                rows.append(data["prompt_tokens"])
+        await rag.drain_session_tasks()
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--turns", type=int, default=20)
+    ap.add_argument("--history-tokens", type=int, default=Config.SESSION_HISTORY_TOKENS)
+    ap.add_argument("--keep-turns", type=int, default=Config.SESSION_KEEP_TURNS)
+    ap.add_argument("--summary-tokens", type=int, default=Config.SESSION_SUMMARY_TOKENS)
+    args = ap.parse_args()
+
+    stub = StubMistralServer(reply=_reply)
+    Config.MISTRAL_SERVER_URL, Config.LLM_API_KEY = stub.start(), "stub"
+    Config.QUERY_BATCH_WINDOW_MS, Config.ANSWER_CACHE_ENABLED = 0, False
+    show = sorted({t for t in (1, 2, 5, 10, 20, 40, args.turns) if t <= args.turns})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            build_toy_index(Path(tmp), n_chunks=300)
+            rag.INDEX_PATH, rag.META_PATH = Path(tmp) / "faiss.index", Path(tmp) / "meta.json"
+            print(f"=== {args.turns} turns, SESSION_HISTORY_TOKENS {args.history_tokens}, "
+                  f"keep {args.keep_turns}, summary {args.summary_tokens} ===")
+            print(f"{'mode':10s} {'turn':>5s} {'history':>8s} {'total':>7s}")
+            for mode, budget in (("full", 10 ** 9), ("compacted", args.history_tokens)):
+                Config.SESSION_HISTORY_TOKENS, Config.SESSION_KEEP_TURNS = budget, args.keep_turns
+                Config.SESSION_SUMMARY_TOKENS = args.summary_tokens
+                rag._sessions = None
+                t0 = time.perf_counter()
+                rows = asyncio.run(run(args.turns, session_id=mode))
+                wall = time.perf_counter() - t0
+                for t in show:
+                    print(f"{mode:10s} {t:5d} {rows[t - 1]['history']:8d} {rows[t - 1]['total']:7d}")
+                print(f"{mode:10s} {'':5s} {'':8s} {'':7s} ({wall:.1f} s)")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_speculation.py
+"""
+Suggested follow-ups precomputed while the visitor reads (SPECULATE) vs. computed when asked.
+
+--visitors concurrent conversations of --turns questions each go through rag.answer_stream
+against the local stub API (--chat-latency to first token, --embed-latency) and a toy index.
+Between turns a visitor reads for --think seconds, then, with probability --click, asks one of
+the suggestions the last answer ended with (sometimes retyped in lower case), else something
+new. Per SPECULATE mode:
+
+    ttft clicked   p50 / p99 ms to the first text of turns that asked a suggestion
+    ttft other     the same for the other follow-ups
+    hit            share of clicked turns answered from speculation
+    chat calls     chat completions per visitor turn (1.0 = no extra LLM work)
+    wasted s       compute time spent on suggestions nobody asked
+
+    python -m benchmarks.bench_speculation
+    python -m benchmarks.bench_speculation --visitors 16 --click 0.4 --think 0.5
+"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import rag
+from benchmarks.common import build_toy_index, pct
+from benchmarks.stub_mistral import StubMistralServer
+from src.config import Config
+from src.llm.history import suggestions
+from src.observability.metrics import SPECULATIVE, SPECULATIVE_SECONDS
+
+OTHER = ["Where is Erika based?", "Is Erika open to new roles?", "What languages does Erika speak?",
+         "Has Erika published anything?", "What was Erika's first job?"]
+
+
+async def visitor(i: int, turns: int, think: float, click: float, rng: random.Random, out: dict):
+    question, suggested = "Tell me about Erika", False
+    for _ in range(turns):
+        t0, ttft, text = time.perf_counter(), None, []
+        async for event, data in rag.answer_stream(question, session_id=f"v{i}"):
+            if event == "delta":
+                ttft = ttft if ttft is not None else (time.perf_counter() - t0) * 1000
+                text.append(data["text"])
+        out["clicked" if suggested else "other"].append(ttft)
+        await asyncio.sleep(think * rng.uniform(0.5, 1.5))
+        options = suggestions("".join(text))
+        suggested = bool(options) and rng.random() < click
+        if suggested:
+            question = rng.choice(options)
+            question = question.lower().rstrip("?") if rng.random() < 0.3 else question
+        else:
+            question = rng.choice(OTHER)
+
+
+async def run(visitors: int, turns: int, think: float, click: float, seed: int) -> dict:
+    out = {"clicked": [], "other": []}
+    rng = random.Random(seed)
+    await asyncio.gather(*(visitor(i, turns, think, click, random.Random(rng.random()), out) for i in range(visitors)))
+    if rag._speculator is not None:
+        rag._speculator.cancel()
+    out["other"] = out["other"][visitors:]  # first turns: not follow-ups
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--visitors", type=int, default=8)
+    ap.add_argument("--turns", type=int, default=5)
+    ap.add_argument("--think", type=float, default=1.5, help="mean seconds between an answer and the next question")
+    ap.add_argument("--click", type=float, default=0.6, help="probability the next question is a suggestion")
+    ap.add_argument("--chat-latency", type=float, default=0.6)
+    ap.add_argument("--embed-latency", type=float, default=0.05)
+    ap.add_argument("--concurrency", type=int, default=Config.SPECULATE_CONCURRENCY)
+    ap.add_argument("--modes", nargs="+", default=["off", "retrieval", "answer"])
+    args = ap.parse_args()
+
+    stub = StubMistralServer(chat_latency=args.chat_latency, token_latency=0.01, embed_latency=args.embed_latency)
+    Config.MISTRAL_SERVER_URL, Config.LLM_API_KEY = stub.start(), "stub"
+    Config.QUERY_BATCH_WINDOW_MS, Config.ANSWER_CACHE_ENABLED = 0, False
+    Config.SESSION_CONDENSE, Config.SPECULATE_CONCURRENCY = "concat", args.concurrency
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            build_toy_index(Path(tmp), n_chunks=300)
+            rag.INDEX_PATH, rag.META_PATH = Path(tmp) / "faiss.index", Path(tmp) / "meta.json"
+            print(f"=== {args.visitors} visitors x {args.turns} turns, think {args.think}s, click {args.click:.0%}, "
+                  f"chat latency {args.chat_latency}s, speculation concurrency {args.concurrency} ===")
+            print(f"{'mode':10s} {'clicked p50':>11s} {'p99':>7s} {'other p50':>9s} {'p99':>7s} {'hit':>6s}"
+                  f" {'chat calls':>10s} {'wasted s':>8s}")
+            for mode in args.modes:
+                Config.SPECULATE = mode
+                rag._sessions, rag._speculator, rag._qcache = None, None, None
+                hits0 = SPECULATIVE.value(outcome="hit")
+                wasted0, calls0 = SPECULATIVE_SECONDS.value(result="wasted"), stub.calls.get("/v1/chat/completions", 0)
+                res = asyncio.run(run(args.visitors, args.turns, args.think, args.click, seed=0))
+                clicked = [t for t in res["clicked"] if t is not None]
+                other = [t for t in res["other"] if t is not None]
+                hits = SPECULATIVE.value(outcome="hit") - hits0
+                calls = stub.calls.get("/v1/chat/completions", 0) - calls0
+                print(f"{mode:10s} {pct(clicked, 50):11.0f} {pct(clicked, 99):7.0f} {pct(other, 50):9.0f}"
+                      f" {pct(other, 99):7.0f} {hits / max(1, len(clicked)):6.0%}"
+                      f" {calls / (args.visitors * args.turns):10.2f}"
+                      f" {SPECULATIVE_SECONDS.value(result='wasted') - wasted0:8.1f}")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
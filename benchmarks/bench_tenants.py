@@ -0,0 +1,101 @@
+# benchmarks/bench_tenants.py
+"""
+Many tenants in one process: latency of cold (index loaded on demand) vs. hot (resident)
+tenants, and the memory ceiling under TENANT_INDEX_BUDGET_MB.
+
+Builds --tenants toy indexes under a temp INDEX_DIR/tenants/, then sends --requests
+rag.retrieve calls (query embeddings from the local stub, cached after the first) to
+tenants drawn from a Zipf distribution, a few at a time, once per budget. Per budget:
+
+    hit         share of requests whose tenant was resident
+    hot / cold  p50 / p99 ms of requests to resident / not yet loaded tenants
+    peak        largest resident size (on-disk bytes of the loaded indexes)
+    rss         process RSS after the run (VmRSS)
+
+    python -m benchmarks.bench_tenants
+    python -m benchmarks.bench_tenants --tenants 200 --chunks 1000 --budgets-mb 16 64 512
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import rag
+from benchmarks.common import build_toy_index, pct
+from benchmarks.stub_mistral import StubMistralServer
+from src.config import Config
+
+
+def _rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+async def run(tenants, requests: int, concurrency: int, zipf: float, seed: int):
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, len(tenants) + 1)
+    weights = ranks ** -zipf
+    picks = rng.choice(len(tenants), size=requests, p=weights / weights.sum())
+    hot, cold = [], []
+
+    async def one(tenant: str):
+        resident = tenant in rag.tenant_indexes().resident()
+        t0 = time.perf_counter()
+        await rag.retrieve("What projects has Erika built?", tenant=tenant)
+        (hot if resident else cold).append((time.perf_counter() - t0) * 1000)
+
+    for i in range(0, requests, concurrency):
+        await asyncio.gather(*(one(tenants[j]) for j in picks[i:i + concurrency]))
+    return hot, cold
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tenants", type=int, default=120)
+    ap.add_argument("--chunks", type=int, default=300, help="chunks per tenant index")
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--zipf", type=float, default=1.1, help="skew of the tenant popularity")
+    ap.add_argument("--budgets-mb", type=float, nargs="+", default=[16, 64, 1024])
+    args = ap.parse_args()
+
+    stub = StubMistralServer()
+    Config.MISTRAL_SERVER_URL, Config.LLM_API_KEY = stub.start(), "stub"
+    Config.QUERY_BATCH_WINDOW_MS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            tenants = [f"t{i:03d}" for i in range(args.tenants)]
+            for t in tenants:
+                build_toy_index(root / "tenants" / t, n_chunks=args.chunks)
+            rag.INDEX_PATH, rag.META_PATH = root / "faiss.index", root / "meta.json"
+            size = sum(f.stat().st_size for f in (root / "tenants").rglob("*") if f.is_file())
+            print(f"=== {args.tenants} tenants x {args.chunks} chunks ({size / 2 ** 20:.0f} MB on disk), "
+                  f"{args.requests} requests, zipf {args.zipf}, concurrency {args.concurrency} ===")
+            print(f"{'budget MB':>9s} {'hit':>6s} {'hot p50':>8s} {'hot p99':>8s} {'cold p50':>9s} {'cold p99':>9s}"
+                  f" {'resident':>8s} {'peak MB':>8s} {'rss MB':>7s}")
+            for budget in args.budgets_mb:
+                Config.TENANT_INDEX_BUDGET_MB = budget
+                rag._tenants = None
+                hot, cold = asyncio.run(run(tenants, args.requests, args.concurrency, args.zipf, seed=0))
+                st = rag.tenant_stats()
+                print(f"{budget:9.0f} {len(hot) / args.requests:6.1%} {pct(hot, 50):8.1f} {pct(hot, 99):8.1f}"
+                      f" {pct(cold, 50):9.1f} {pct(cold, 99):9.1f} {st['tenants']:8d}"
+                      f" {st['peak_bytes'] / 2 ** 20:8.1f} {_rss_mb():7.0f}")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_worker_memory.py
+"""
+Memory of N API workers holding the same index, with and without IO_FLAG_MMAP.
+
+Each worker is a separate process that loads the index through rag.load_index_state (as a
+uvicorn/gunicorn worker does at warmup) and runs one search. Reported per setup:
+
+    pss total   sum of the workers' proportional set size (shared pages split between them);
+                what the host actually spends on N workers
+    rss/worker  resident size of one worker (counts shared pages in full)
+
+Linux only (reads /proc/<pid>/smaps_rollup).
+
+    python -m benchmarks.bench_worker_memory --chunks 100000 --workers 4
+"""
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import build_toy_index
+
+
+def _mem_kb(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                out[parts[0][:-1].lower()] = int(parts[1])
+    return out
+
+
+def _worker(index_dir: str, mmap: bool, dim: int, loaded, done):
+    import numpy as np
+
+    import rag
+    from src.config import Config
+
+    Config.INDEX_MMAP = mmap
+    rag.query_embedder = lambda: type("E", (), {"model": "mistral-embed", "dim": dim})()
+    state = rag.load_index_state(Path(index_dir, "faiss.index"), Path(index_dir, "meta.json"))
+    state["index"].search(np.ones((1, dim), dtype="float32"), 8)
+    loaded.set()
+    done.wait(120)
+
+
+def run(index_dir: Path, workers: int, mmap: bool, dim: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    done = ctx.Event()
+    loaded = [ctx.Event() for _ in range(workers)]
+    procs = [ctx.Process(target=_worker, args=(str(index_dir), mmap, dim, ev, done)) for ev in loaded]
+    for p in procs:
+        p.start()
+    try:
+        for ev in loaded:
+            ev.wait(300)
+        time.sleep(0.2)
+        mem = [_mem_kb(p.pid) for p in procs]
+    finally:
+        done.set()
+        for p in procs:
+            p.join(30)
+    return {"pss_mb": sum(m["pss"] for m in mem) / 1024, "rss_mb": sum(m["rss"] for m in mem) / 1024 / workers}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--chunks", type=int, default=100000)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--types", nargs="+", default=["flat", "ivf_flat"])
+    args = ap.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench-workers-"))
+    print(f"=== {args.workers} workers, {args.chunks} chunks x {args.dim} dims ===")
+    print(f"{'index':9s} {'mmap':>5s} {'index MB':>9s} {'pss total':>10s} {'rss/worker':>11s}")
+    try:
+        for index_type in args.types:
+            index_dir = build_toy_index(root / index_type, n_chunks=args.chunks, dim=args.dim, index_type=index_type)
+            size = (index_dir / "faiss.index").stat().st_size / 2**20
+            for mmap in (False, True):
+                r = run(index_dir, args.workers, mmap, args.dim)
+                print(f"{index_type:9s} {str(mmap):>5s} {size:9.0f} {r['pss_mb']:9.0f}M {r['rss_mb']:10.0f}M")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
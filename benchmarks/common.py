@@ -0,0 +1,109 @@
+# benchmarks/common.py
+"""Shared helpers for the offline benchmarks (toy index, in-process server, percentiles)."""
+import hashlib
+import json
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import faiss
+import numpy as np
+
+from benchmarks.stub_mistral import fake_embedding
+
+
+def toy_texts(n: int) -> List[str]:
+    topics = ["FAISS retrieval", "Mistral LLM", "ETL pipeline", "EyeSense project", "SecureMed",
+              "career transition", "education", "Python and SQL", "dbt and Airflow", "Cloud Run"]
+    return [f"Chunk {i}: Erika worked on {topics[i % len(topics)]} (part {i})." for i in range(n)]
+
+
+def build_toy_index(index_dir: Path, n_chunks: int = 200, dim: int = 1024, chunk_store: bool = True,
+                    lexical: bool = True, index_type: str = "flat", nlist: int = 0) -> Path:
+    """Write faiss.index + chunks.bin (+ lexical.bin) + manifest meta.json built from stub embeddings.
+
+    chunk_store=False writes the legacy (pre-manifest) layout with texts inlined in meta.json.
+    """
+    from src.index.ann import build_index
+    from src.index.chunk_store import write_chunk_store
+    from src.index.lexical import lexical_manifest_entry, write_lexical_index
+    from src.index.manifest import build_manifest, file_sha1, write_manifest
+
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    texts = toy_texts(n_chunks)
+    sources = [f"docs/toy_{i * 7 // n_chunks}.md" for i in range(n_chunks)]  # 7 contiguous "files"
+    mat = np.array([fake_embedding(t, dim) for t in texts], dtype="float32")
+    index, index_params = build_index(mat, index_type, nlist=nlist)
+    faiss.write_index(index, str(index_dir / "faiss.index"))
+    if not chunk_store:
+        with open(index_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"model": "mistral-embed", "dim": dim, "metric": "cosine", "texts": texts}, f, ensure_ascii=False)
+        return index_dir
+    sha1 = write_chunk_store(index_dir / "chunks.bin", texts, sources)
+    lexical_sha1 = write_lexical_index(index_dir / "lexical.bin", enumerate(texts), len(texts)) if lexical else None
+    files = []
+    for i, src in enumerate(sources):
+        if not files or files[-1]["path"] != src:
+            files.append({"path": src, "sha1": hashlib.sha1(src.encode()).hexdigest(), "chunks": [i, i]})
+        files[-1]["chunks"][1] = i + 1
+    write_manifest(index_dir / "meta.json", build_manifest(
+        provider="mistral", model="mistral-embed", dim=dim, index_type=index_params["type"], ntotal=index.ntotal,
+        index_params=index_params,
+        chunk_unit="chars", chunk_size=800, chunk_overlap=120, chunk_store_sha1=sha1, files=files,
+        index_sha1=file_sha1(index_dir / "faiss.index"),
+        lexical=lexical_manifest_entry(lexical_sha1) if lexical else None,
+    ))
+    return index_dir
+
+
+def _stub_main(port: int, kwargs: dict):
+    from benchmarks.stub_mistral import StubMistralServer
+
+    StubMistralServer(port=port, **kwargs)._httpd.serve_forever()
+
+
+def spawn_stub_process(**kwargs):
+    """Run StubMistralServer in a child process so it doesn't share the GIL with the app under test."""
+    import multiprocessing as mp
+
+    port = free_port()
+    proc = mp.get_context("spawn").Process(target=_stub_main, args=(port, kwargs), daemon=True)
+    proc.start()
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_app_in_thread(app, port: int):
+    """Start uvicorn on a daemon thread and wait until it accepts connections."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    t = threading.Thread(target=server.run, daemon=True)
+    t.start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.02)
+    return server
+
+
+def pct(values: List[float], p: float) -> float:
+    return float(np.percentile(np.asarray(values, dtype="float64"), p)) if values else float("nan")
+
+
+def fmt_ms(values: List[float]) -> str:
+    return f"p50={pct(values, 50) * 1000:7.1f}ms  p99={pct(values, 99) * 1000:7.1f}ms  n={len(values)}"
@@ -0,0 +1,103 @@
+# benchmarks/eval_context_packing.py
+"""
+Prompt size before and after context packing (src/llm/context_packer.py), and what it costs.
+
+For every question in benchmarks/data/hybrid_eval.jsonl ({question, sources}) the hits from
+rag._search go through rag._build_prompts once per CONTEXT_TOKEN_BUDGET. Per budget:
+
+    ctx raw     context tokens with every hit verbatim (the old build_context)
+    ctx         context tokens actually sent (merged, deduplicated, packed)
+    prompt      system + user prompt tokens
+    saved       1 - prompt / prompt with the raw context
+    hit         share of questions whose context still contains a chunk of an expected source
+    pack ms     p50 time of _build_prompts (token counting included)
+
+    python -m benchmarks.eval_context_packing --stub
+    python -m benchmarks.eval_context_packing --stub --chunk-size 400 --chunk-overlap 200
+    python -m benchmarks.eval_context_packing --index data/index --tokenizer mistral
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import rag
+from benchmarks.common import pct
+from benchmarks.eval_hybrid import build_temp_index
+from src.config import Config
+
+
+async def evaluate(index_dir: Path, queries, budgets):
+    state = rag.load_index_state(index_dir / "faiss.index", index_dir / "meta.json")
+    rag.activate_index(state)
+    index, chunks, lexical = state["index"], state["chunks"], state["lexical"]
+    hits = []
+    for q in queries:
+        qv = await rag.aembed_query(q["question"])
+        hits.append(await rag._search(index, chunks, qv, q["question"], lexical))
+
+    results = {}
+    for budget in budgets:
+        Config.CONTEXT_TOKEN_BUDGET = budget
+        rows = []
+        for q, h in zip(queries, hits):
+            t0 = time.perf_counter()
+            _, _, passages, usage = rag._build_prompts(q["question"], "en", h)
+            ms = (time.perf_counter() - t0) * 1000
+            expected = set(q["sources"])
+            rows.append({**usage, "ms": ms, "hit": any(Path(p["source"]).name in expected for p in passages)})
+        results[budget] = rows
+    return results
+
+
+def report(results):
+    print(f"{'budget':>7s} {'ctx raw':>8s} {'ctx':>6s} {'prompt':>7s} {'saved':>6s} {'hit':>5s} {'pack ms':>8s}")
+    for budget, rows in results.items():
+        raw_prompt = np.mean([r["total"] - r["context"] + r["context_raw"] for r in rows])
+        prompt = np.mean([r["total"] for r in rows])
+        print(f"{budget or 'none':>7} {np.mean([r['context_raw'] for r in rows]):8.0f} {np.mean([r['context'] for r in rows]):6.0f}"
+              f" {prompt:7.0f} {1 - prompt / raw_prompt:6.1%} {np.mean([r['hit'] for r in rows]):5.2f}"
+              f" {pct([r['ms'] for r in rows], 50):8.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--index", type=Path, help="existing index dir (faiss.index + meta.json + lexical.bin)")
+    ap.add_argument("--source", type=Path, default=Path("data/source/docs"))
+    ap.add_argument("--queries", type=Path, default=Path(__file__).with_name("data") / "hybrid_eval.jsonl")
+    ap.add_argument("--stub", action="store_true", help="embed with the local stub (random vectors)")
+    ap.add_argument("--chunk-size", type=int, default=800, help="chars, when building from --source")
+    ap.add_argument("--chunk-overlap", type=int, default=120)
+    ap.add_argument("--budgets", type=int, nargs="+", default=[0, 1000, 600, 300])
+    ap.add_argument("--tokenizer", default=Config.PROMPT_TOKENIZER, help="auto | mistral | estimate")
+    args = ap.parse_args()
+
+    queries = [json.loads(line) for line in args.queries.read_text(encoding="utf-8").splitlines() if line.strip()]
+    stub = None
+    if args.stub:
+        from benchmarks.stub_mistral import StubMistralServer
+        stub = StubMistralServer(embed_latency=0.0)
+        Config.MISTRAL_SERVER_URL, Config.LLM_API_KEY = stub.start(), "stub"
+    Config.PROMPT_TOKENIZER = args.tokenizer
+    Config.QUERY_BATCH_WINDOW_MS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            index_dir = args.index or build_temp_index(args.source, Path(tmp), args.chunk_size, args.chunk_overlap)
+            results = asyncio.run(evaluate(index_dir, queries, args.budgets))
+    finally:
+        if stub:
+            stub.stop()
+    print(f"=== {len(queries)} questions, k={Config.TOP_K}, tokenizer={rag.prompt_tokens().provider}"
+          f" ({rag.prompt_tokens().model}), index={args.index or args.source} ===")
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# benchmarks/eval_hybrid.py
+"""
+Offline retrieval eval: hit@k / MRR of dense-only vs BM25-only vs hybrid (RRF) retrieval.
+
+Questions come from benchmarks/data/hybrid_eval.jsonl ({question, sources, kind}); a hit
+is any top-k chunk whose source file is one of `sources`. "term" questions name a tool or
+company literally, "semantic" ones paraphrase (en/pt/nl).
+
+    python -m benchmarks.eval_hybrid --index data/index          # an existing mistral-embed index
+    python -m benchmarks.eval_hybrid --source data/source/docs    # build a temp index (needs MISTRAL_API_KEY)
+    python -m benchmarks.eval_hybrid --stub                       # offline plumbing check
+
+With --stub the query/chunk embeddings are random (benchmarks/stub_mistral.py), so the
+dense column is a chance baseline there; use a real index for the dense-vs-hybrid numbers.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import rag
+from benchmarks.common import pct
+from src.config import Config
+from src.index.chunk_store import write_chunk_store
+from src.index.lexical import lexical_manifest_entry, write_lexical_index
+from src.index.manifest import build_manifest, file_sha1, write_manifest
+
+CHUNK_SIZE, CHUNK_OVERLAP = 800, 120  # same as ingest_mistral.py
+
+
+def _chunks(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
+    s = " ".join(text.split())
+    return [s[i : i + size] for i in range(0, len(s), size - overlap)] if s else []
+
+
+def build_temp_index(source: Path, out: Path, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> Path:
+    """chunk + embed the .md/.txt files under `source` with the configured Mistral endpoint."""
+    from mistralai import Mistral
+
+    texts, sources, files = [], [], []
+    for p in sorted(source.rglob("*")):
+        if p.suffix.lower() not in {".md", ".txt"}:
+            continue
+        parts = _chunks(p.read_text(encoding="utf-8", errors="ignore"), chunk_size, chunk_overlap)
+        files.append({"path": p.name, "sha1": file_sha1(p), "chunks": [len(texts), len(texts) + len(parts)]})
+        texts.extend(parts)
+        sources.extend([p.name] * len(parts))
+    client = Mistral(api_key=Config.LLM_API_KEY, server_url=Config.MISTRAL_SERVER_URL)
+    vecs = []
+    for i in range(0, len(texts), 32):
+        res = client.embeddings.create(model="mistral-embed", inputs=texts[i : i + 32])
+        vecs.extend(item.embedding for item in res.data)
+    mat = np.ascontiguousarray(vecs, dtype="float32")
+    faiss.normalize_L2(mat)
+    index = faiss.IndexFlatIP(mat.shape[1])
+    index.add(mat)
+    out.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(index, str(out / "faiss.index"))
+    chunks_sha1 = write_chunk_store(out / "chunks.bin", texts, sources)
+    lexical_sha1 = write_lexical_index(out / "lexical.bin", enumerate(texts), len(texts))
+    write_manifest(out / "meta.json", build_manifest(
+        provider="mistral", model="mistral-embed", dim=mat.shape[1], index_type="flat", ntotal=index.ntotal,
+        chunk_unit="chars", chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunk_store_sha1=chunks_sha1,
+        files=files, index_sha1=file_sha1(out / "faiss.index"), lexical=lexical_manifest_entry(lexical_sha1),
+    ))
+    return out
+
+
+def _rank_of_first_hit(hit_sources, expected):
+    for rank, src in enumerate(hit_sources, 1):
+        if Path(src).name in expected:
+            return rank
+    return None
+
+
+async def evaluate(index_dir: Path, queries, k: int):
+    state = rag.load_index_state(index_dir / "faiss.index", index_dir / "meta.json")
+    rag.activate_index(state)
+    index, chunks, lexical = state["index"], state["chunks"], state["lexical"]
+    if lexical is None:
+        raise SystemExit(f"{index_dir} has no lexical.bin; re-run the ingest")
+
+    rows, lex_lat = [], []
+    for q in queries:
+        qv = await rag.aembed_query(q["question"])
+        dense = await rag._search(index, chunks, qv)
+        hybrid = await rag._search(index, chunks, qv, q["question"], lexical)
+        t0 = time.perf_counter()
+        ids, _ = lexical.search(q["question"], k)
+        lex_lat.append(time.perf_counter() - t0)
+        bm25 = [chunks.source(int(i)) or "" for i in ids]
+        expected = set(q["sources"])
+        rows.append({
+            "kind": q.get("kind", "all"),
+            "dense": _rank_of_first_hit([h["source"] for h in dense], expected),
+            "bm25": _rank_of_first_hit(bm25, expected),
+            "hybrid": _rank_of_first_hit([h["source"] for h in hybrid], expected),
+        })
+    return rows, lex_lat
+
+
+def report(rows, lex_lat, k: int):
+    print(f"{'queries':10s} {'n':>3s}  " + "  ".join(f"{m + ' hit@' + str(k):>13s} {'MRR':>5s}" for m in ("dense", "bm25", "hybrid")))
+    for kind in sorted({r["kind"] for r in rows}) + ["all"]:
+        sel = [r for r in rows if kind == "all" or r["kind"] == kind]
+        cells = []
+        for m in ("dense", "bm25", "hybrid"):
+            hit = np.mean([r[m] is not None for r in sel])
+            mrr = np.mean([1.0 / r[m] if r[m] else 0.0 for r in sel])
+            cells.append(f"{hit:13.2f} {mrr:5.2f}")
+        print(f"{kind:10s} {len(sel):3d}  " + "  ".join(cells))
+    print(f"\nBM25 search latency: p50 {pct(lex_lat, 50) * 1e6:.0f}µs  p99 {pct(lex_lat, 99) * 1e6:.0f}µs")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--index", type=Path, help="existing index dir (faiss.index + meta.json + lexical.bin)")
+    ap.add_argument("--source", type=Path, default=Path("data/source/docs"))
+    ap.add_argument("--queries", type=Path, default=Path(__file__).with_name("data") / "hybrid_eval.jsonl")
+    ap.add_argument("--stub", action="store_true", help="embed with the local stub (random vectors)")
+    ap.add_argument("--k", type=int, default=5)
+    args = ap.parse_args()
+
+    queries = [json.loads(line) for line in args.queries.read_text(encoding="utf-8").splitlines() if line.strip()]
+    stub = None
+    if args.stub:
+        from benchmarks.stub_mistral import StubMistralServer
+        stub = StubMistralServer(embed_latency=0.0)
+        Config.MISTRAL_SERVER_URL, Config.LLM_API_KEY = stub.start(), "stub"
+    Config.ANSWER_CACHE_ENABLED = False
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            index_dir = args.index or build_temp_index(args.source, Path(tmp))
+            rows, lex_lat = asyncio.run(evaluate(index_dir, queries, args.k))
+    finally:
+        if stub:
+            stub.stop()
+    print(f"=== {len(queries)} questions, k={args.k}, index={args.index or args.source}"
+          f"{' (stub embeddings: dense = chance)' if args.stub else ''} ===")
+    report(rows, lex_lat, args.k)
+
+
+if __name__ == "__main__":
+    main()
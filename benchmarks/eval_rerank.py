@@ -0,0 +1,138 @@
+# benchmarks/eval_rerank.py
+"""
+Offline eval of the second retrieval stage (src/index/rerank.py): what reaches the prompt
+with and without MMR / a cross-encoder, and what it costs.
+
+Per setup, over benchmarks/data/hybrid_eval.jsonl ({question, sources}):
+
+    hit@k      share of questions with at least one top-k chunk from an expected source file
+    prec@k     share of the k chunks that come from an expected source (answer-relevant context)
+    dup        share of chunk pairs in the context that overlap (word Jaccard > 0.3; two
+               windows sharing half their text score ~0.33)
+    srcs       distinct source files in the context
+    +ms        p50 / p95 added by the second stage over plain top-k search
+
+    python -m benchmarks.eval_rerank --stub                              # offline (BM25 + random dense)
+    python -m benchmarks.eval_rerank --stub --chunk-size 400 --chunk-overlap 200   # heavily overlapping chunks
+    python -m benchmarks.eval_rerank --index data/index                  # a real mistral-embed index
+    python -m benchmarks.eval_rerank --index data/index --cross-encoder onnx   # + models/reranker
+
+With --stub the dense side is random (see eval_hybrid.py), so only the hybrid BM25 signal
+is meaningful there, and MMR compares chunk texts (MMR_SIMILARITY=text) since random vectors
+can't show overlap. The cross-encoder rows need RERANKER's model (export_onnx.py --cross-encoder).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import rag
+from benchmarks.common import pct
+from benchmarks.eval_hybrid import build_temp_index
+from src.config import Config
+from src.index.rerank import text_similarity
+
+SETUPS = {  # name -> (MMR_LAMBDA, cross-encoder on)
+    "top-k": (1.0, False),
+    "mmr 0.7": (0.7, False),
+    "mmr 0.5": (0.5, False),
+    "cross-enc": (1.0, True),
+    "cross-enc+mmr": (0.7, True),
+}
+
+
+def _dup_rate(texts) -> float:
+    if len(texts) < 2:
+        return 0.0
+    sim = text_similarity(texts)
+    pairs = list(itertools.combinations(range(len(texts)), 2))
+    return sum(sim[i, j] > 0.3 for i, j in pairs) / len(pairs)
+
+
+async def evaluate(index_dir: Path, queries, k: int, cross_encoder: str):
+    state = rag.load_index_state(index_dir / "faiss.index", index_dir / "meta.json")
+    rag.activate_index(state)
+    index, chunks, lexical = state["index"], state["chunks"], state["lexical"]
+    Config.TOP_K = k
+    qvs = [await rag.aembed_query(q["question"]) for q in queries]
+
+    results = {}
+    for name, (lam, use_ce) in SETUPS.items():
+        if use_ce and cross_encoder == "off":
+            continue
+        Config.MMR_LAMBDA, Config.RERANKER = lam, cross_encoder if use_ce else "off"
+        Config.RERANK_BUDGET_MS = 1e9  # measure the cost, don't skip
+        rag._reranker = None
+        try:
+            rag.reranker()
+        except Exception as e:
+            print(f"{name}: skipped ({type(e).__name__}: {e})")
+            continue
+        if rag.reranker().cross_encoder is not None:
+            rag.reranker().cross_encoder.score_sync("warmup", ["warmup"])
+        rows, lat = [], []
+        for q, qv in zip(queries, qvs):
+            t0 = time.perf_counter()
+            hits = await rag._search(index, chunks, qv, q["question"], lexical, started=t0)
+            lat.append(time.perf_counter() - t0)
+            expected = set(q["sources"])
+            rel = [Path(h["source"]).name in expected for h in hits]
+            rows.append({"hit": any(rel), "prec": sum(rel) / max(len(hits), 1),
+                         "dup": _dup_rate([h["text"] for h in hits]), "srcs": len({h["source"] for h in hits})})
+        results[name] = (rows, lat)
+    return results
+
+
+def report(results, k: int):
+    base = results["top-k"][1]
+    print(f"{'setup':14s} {'hit@' + str(k):>6s} {'prec@' + str(k):>7s} {'dup':>5s} {'srcs':>5s} {'+ms p50':>8s} {'+ms p95':>8s}")
+    for name, (rows, lat) in results.items():
+        added = [max(0.0, a - b) * 1000 for a, b in zip(lat, base)]
+        print(f"{name:14s} {np.mean([r['hit'] for r in rows]):6.2f} {np.mean([r['prec'] for r in rows]):7.2f}"
+              f" {np.mean([r['dup'] for r in rows]):5.2f} {np.mean([r['srcs'] for r in rows]):5.1f}"
+              f" {pct(added, 50):8.2f} {pct(added, 95):8.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--index", type=Path, help="existing index dir (faiss.index + meta.json + lexical.bin)")
+    ap.add_argument("--source", type=Path, default=Path("data/source/docs"))
+    ap.add_argument("--queries", type=Path, default=Path(__file__).with_name("data") / "hybrid_eval.jsonl")
+    ap.add_argument("--stub", action="store_true", help="embed with the local stub (random vectors)")
+    ap.add_argument("--k", type=int, default=Config.TOP_K)
+    ap.add_argument("--chunk-size", type=int, default=800, help="chars, when building from --source")
+    ap.add_argument("--chunk-overlap", type=int, default=120)
+    ap.add_argument("--cross-encoder", default=Config.RERANKER, help="off | onnx | sentence-transformers")
+    args = ap.parse_args()
+
+    queries = [json.loads(line) for line in args.queries.read_text(encoding="utf-8").splitlines() if line.strip()]
+    stub = None
+    if args.stub:
+        from benchmarks.stub_mistral import StubMistralServer
+        stub = StubMistralServer(embed_latency=0.0)
+        Config.MISTRAL_SERVER_URL, Config.LLM_API_KEY = stub.start(), "stub"
+        Config.MMR_SIMILARITY = "text"
+    Config.ANSWER_CACHE_ENABLED = False
+    Config.QUERY_BATCH_WINDOW_MS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            index_dir = args.index or build_temp_index(args.source, Path(tmp), args.chunk_size, args.chunk_overlap)
+            results = asyncio.run(evaluate(index_dir, queries, args.k, args.cross_encoder))
+    finally:
+        if stub:
+            stub.stop()
+    print(f"=== {len(queries)} questions, k={args.k}, candidates={Config.RERANK_CANDIDATES}, "
+          f"index={args.index or args.source}{' (stub embeddings)' if args.stub else ''} ===")
+    report(results, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# benchmarks/fake_gcs.py
+"""
+Local stand-ins for a GCS bucket, serving the files of a directory.
+
+    LocalBucket(root)       in-process object with the bucket/blob methods app.py uses
+                            (get_blob, size/crc32c/md5_hash/generation, ranged download_as_bytes)
+    FakeGcsServer(root)     HTTP server speaking the subset of the JSON API that
+                            google-cloud-storage uses for get_blob + ranged media downloads;
+                            `client()` returns a real storage.Client pointed at it
+
+Bump `generation` to "publish" a new version; a ranged read pinned to an older generation
+fails with 412 like the real service.
+"""
+import base64
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+from src.index.download import crc32c
+
+
+def object_metadata(path: Path, name: str, bucket: str, generation: int) -> dict:
+    data = path.read_bytes()
+    crc = crc32c()
+    crc.update(data)
+    return {
+        "kind": "storage#object", "bucket": bucket, "name": name, "generation": str(generation),
+        "metageneration": "1", "size": str(len(data)), "contentType": "application/octet-stream",
+        "crc32c": base64.b64encode(crc.digest()).decode(),
+        "md5Hash": base64.b64encode(hashlib.md5(data).digest()).decode(),
+    }
+
+
+class PreconditionFailed(Exception):
+    pass
+
+
+class LocalBlob:
+    def __init__(self, bucket: "LocalBucket", name: str):
+        meta = object_metadata(bucket.root / name, name, bucket.name, bucket.generation)
+        self.bucket, self.name = bucket, name
+        self.generation, self.size = bucket.generation, int(meta["size"])
+        self.crc32c, self.md5_hash = meta["crc32c"], meta["md5Hash"]
+
+    def reload(self):
+        pass
+
+    def download_as_bytes(self, start=None, end=None, if_generation_match=None, **_):
+        bucket = self.bucket
+        if if_generation_match is not None and if_generation_match != bucket.generation:
+            raise PreconditionFailed(f"412: {self.name} generation {if_generation_match} != {bucket.generation}")
+        data = bucket.corrupt.get(self.name) or (bucket.root / self.name).read_bytes()
+        start = start or 0
+        if start == 0:
+            with bucket.lock:
+                bucket.downloads.append(self.name)
+        with bucket.lock:
+            bucket.range_reads += 1
+        return data[start : (len(data) if end is None else end + 1)]
+
+
+class LocalBucket:
+    """`downloads` lists object names in the order their first byte range was requested."""
+
+    def __init__(self, root, name: str = "fake-bucket", generation: int = 1):
+        self.root, self.name, self.generation = Path(root), name, generation
+        self.downloads, self.range_reads = [], 0
+        self.corrupt = {}  # name -> bytes served instead of the file (metadata still describes the file)
+        self.lock = threading.Lock()
+
+    def get_blob(self, name: str):
+        return LocalBlob(self, name) if (self.root / name).is_file() else None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server.fake
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        m = re.match(r"^(/download)?/storage/v1/b/([^/]+)/o/(.+)$", url.path)
+        if not m or m.group(2) != srv.bucket:
+            return self._json({"error": {"code": 404, "message": "Not Found"}}, 404)
+        name = unquote(m.group(3))
+        path = srv.root / name
+        if not path.is_file():
+            return self._json({"error": {"code": 404, "message": f"No such object: {name}"}}, 404)
+        gen = query.get("ifGenerationMatch")
+        if gen is not None and int(gen) != srv.generation:
+            return self._json({"error": {"code": 412, "message": "Precondition Failed"}}, 412)
+        if query.get("alt") != "media":
+            return self._json(object_metadata(path, name, srv.bucket, srv.generation))
+
+        data = path.read_bytes()
+        start, end = 0, len(data) - 1
+        rng = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if rng:
+            start = int(rng.group(1))
+            end = min(int(rng.group(2)), end) if rng.group(2) else end
+        with srv.lock:
+            srv.media_requests.append((name, start, end))
+        body = data[start : end + 1]
+        self.send_response(206 if rng else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Goog-Generation", str(srv.generation))
+        if rng:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class FakeGcsServer:
+    def __init__(self, root, bucket: str = "fake-bucket", generation: int = 1, host: str = "127.0.0.1"):
+        self.root, self.bucket, self.generation = Path(root), bucket, generation
+        self.media_requests = []
+        self.lock = threading.Lock()
+        self._httpd = _Server((host, 0), _Handler)
+        self._httpd.fake = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def client(self):
+        from google.api_core.client_options import ClientOptions
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud import storage
+
+        return storage.Client(project="test", credentials=AnonymousCredentials(),
+                              client_options=ClientOptions(api_endpoint=self.url))
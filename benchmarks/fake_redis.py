@@ -0,0 +1,49 @@
+# benchmarks/fake_redis.py
+"""
+Local stand-in for Redis, for SESSION_STORE=redis without a server.
+
+    FakeRedis()     in-process object with the async redis-py calls RedisSessionStore uses
+                    (get, set with ex=, delete, ttl); keys expire like SETEX
+
+`clock` can be replaced to expire keys without waiting.
+"""
+import time
+from typing import Dict, Optional, Tuple
+
+
+class FakeRedis:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self.calls = {"get": 0, "set": 0, "delete": 0}
+
+    def _live(self, key: str):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= self.clock():
+            del self._data[key]
+            return None
+        return item
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self.calls["get"] += 1
+        item = self._live(key)
+        return item[0] if item else None
+
+    async def set(self, key: str, value, ex: Optional[float] = None) -> bool:
+        self.calls["set"] += 1
+        data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+        self._data[key] = (data, self.clock() + ex if ex else None)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        self.calls["delete"] += 1
+        return sum(self._data.pop(k, None) is not None for k in keys)
+
+    async def ttl(self, key: str) -> int:
+        item = self._live(key)
+        if item is None:
+            return -2
+        return -1 if item[1] is None else int(item[1] - self.clock())
+
+    def __len__(self) -> int:
+        return sum(self._live(k) is not None for k in list(self._data))
@@ -0,0 +1,231 @@
+# benchmarks/stub_mistral.py
+"""
+Tiny local stand-in for the Mistral HTTP API (embeddings + chat completions).
+
+Point the app at it with MISTRAL_SERVER_URL=http://127.0.0.1:<port> so benchmarks
+and tests run offline with a controllable latency.
+
+Chat requests also pay `prefill_latency` per prompt token (words and punctuation) that is
+not covered by the prefix cache: like a provider with prompt caching, the stub remembers
+recent prompts and only "processes" what follows the longest prefix shared with one of them
+(`prompts` records (tokens, cached tokens) per call).
+
+Faults, for exercising the client's retries / hedging / circuit breaker: `chat_faults` is a
+script consumed one entry per chat request (an int = answer with that HTTP status, a float =
+that many extra seconds before answering, None = normal), and `error_rate` / `slow_rate`
+inject `error_status` / `slow_latency` at random (seeded) once the script is used up.
+"""
+import collections
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+STUB_ANSWER = "Erika builds RAG systems with FAISS and Mistral 😊\n\n- What projects has Erika built?\n- Which tools does Erika use?\n- What is Erika's education?"
+
+
+def fake_embedding(text: str, dim: int = 1024) -> list:
+    """Deterministic pseudo-embedding: same text -> same unit vector."""
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "little")
+    v = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    v /= np.linalg.norm(v) + 1e-9
+    return v.tolist()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "StubMistral/1.0"
+
+    def log_message(self, fmt, *args):  # keep benchmark output clean
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):  # client cancelled (e.g. dropped speculative work)
+            pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(length) or b"{}")
+        stub = self.server.stub
+        with stub.lock:
+            stub.calls[self.path] = stub.calls.get(self.path, 0) + 1
+
+        if self.path.endswith("/embeddings"):
+            time.sleep(stub.embed_latency)
+            inputs = req.get("inputs") or req.get("input") or []
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            data = [
+                {"object": "embedding", "embedding": fake_embedding(t, stub.dim), "index": i}
+                for i, t in enumerate(inputs)
+            ]
+            n_tok = sum(len(t.split()) for t in inputs)
+            self._send_json({
+                "id": "stub-emb", "object": "list", "model": req.get("model", "mistral-embed"), "data": data,
+                "usage": {"prompt_tokens": n_tok, "completion_tokens": 0, "total_tokens": n_tok},
+            })
+            return
+
+        if self.path.endswith("/chat/completions"):
+            fault = stub.next_fault()
+            if isinstance(fault, int):
+                self.send_response(fault)
+                if stub.retry_after is not None:
+                    self.send_header("Retry-After", str(stub.retry_after))
+                body = json.dumps({"detail": f"stub fault {fault}"}).encode("utf-8")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            time.sleep(stub.chat_latency + (fault or 0.0))
+            n_prompt = stub.prefill(req.get("messages") or [])
+            text = stub.reply(req.get("messages") or []) if stub.reply else stub.answer
+            usage = {"prompt_tokens": n_prompt, "completion_tokens": len(text.split()),
+                     "total_tokens": n_prompt + len(text.split())}
+            if req.get("stream"):
+                try:
+                    self._stream_chat(req, text, usage)
+                except (BrokenPipeError, ConnectionResetError):  # client cancelled (e.g. a losing hedge)
+                    pass
+                return
+            self._send_json({
+                "id": "stub-chat", "object": "chat.completion", "model": req.get("model", "stub"),
+                "created": int(time.time()),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self._send_json({"detail": f"unknown path {self.path}"}, status=404)
+
+    def _stream_chat(self, req: dict, text: str, usage: dict):
+        """SSE chunks in the chat.completion.chunk shape; one word per event, usage on the last."""
+        stub = self.server.stub
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()  # HTTP/1.0: body ends when the connection closes
+        words = text.split(" ")
+        for i, w in enumerate(words):
+            chunk = {
+                "id": "stub-chat", "object": "chat.completion.chunk", "model": req.get("model", "stub"),
+                "created": int(time.time()),
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": w if i == 0 else " " + w},
+                             "finish_reason": "stop" if i == len(words) - 1 else None}],
+            }
+            if i == len(words) - 1:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if stub.token_latency:
+                time.sleep(stub.token_latency)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # default backlog of 5 would serialize a parallel burst
+
+
+class StubMistralServer:
+    """Run the stub on a background thread: `with StubMistralServer(embed_latency=0.2) as url: ...`."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, embed_latency: float = 0.0,
+                 chat_latency: float = 0.0, token_latency: float = 0.0, dim: int = 1024,
+                 answer: str = STUB_ANSWER, prefill_latency: float = 0.0, prefix_cache: bool = True,
+                 chat_faults=(), error_rate: float = 0.0, error_status: int = 503, slow_rate: float = 0.0,
+                 slow_latency: float = 1.0, retry_after: float = None, seed: int = 0, reply=None):
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency  # time to first token when streaming (plus prefill)
+        self.token_latency = token_latency
+        self.prefill_latency = prefill_latency  # per uncached prompt token
+        self.prefix_cache = prefix_cache
+        self.prompts: list = []  # (prompt tokens, cached tokens) per chat call
+        self._seen = collections.deque(maxlen=64)
+        self.chat_faults = collections.deque(chat_faults)
+        self.error_rate, self.error_status = error_rate, error_status
+        self.slow_rate, self.slow_latency = slow_rate, slow_latency
+        self.retry_after = retry_after  # Retry-After header (seconds) on injected errors
+        self._rng = random.Random(seed)
+        self.dim = dim
+        self.answer = answer
+        self.reply = reply  # optional messages -> completion text (default: always `answer`)
+        self.calls: dict = {}
+        self.lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.stub = self
+        self._thread = None
+
+    def next_fault(self):
+        """This chat request's fault: HTTP status (int), extra latency (float) or None."""
+        with self.lock:
+            if self.chat_faults:
+                return self.chat_faults.popleft()
+            r = self._rng.random()
+        if r < self.error_rate:
+            return self.error_status
+        if r < self.error_rate + self.slow_rate:
+            return float(self.slow_latency)
+        return None
+
+    def prefill(self, messages: list) -> int:
+        """Sleep for the uncached part of the prompt; returns its size in tokens."""
+        text = "".join(f"<{m.get('role')}>{m.get('content')}" for m in messages)
+        with self.lock:
+            shared = 0
+            if self.prefix_cache:
+                shared = max((len(os.path.commonprefix([seen, text])) for seen in self._seen), default=0)
+                self._seen.append(text)
+            n, cached = len(_PIECE.findall(text)), len(_PIECE.findall(text[:shared]))
+            self.prompts.append((n, cached))
+        if self.prefill_latency:
+            time.sleep(self.prefill_latency * (n - cached))
+        return n
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> str:
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Local stub for the Mistral embeddings/chat API")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--embed-latency", type=float, default=0.05)
+    ap.add_argument("--chat-latency", type=float, default=0.5)
+    args = ap.parse_args()
+    stub = StubMistralServer(port=args.port, embed_latency=args.embed_latency, chat_latency=args.chat_latency)
+    print(f"Stub Mistral API on {stub.url}")
+    stub._httpd.serve_forever()
@@ -0,0 +1,157 @@
+# export_onnx.py
+# Export the ingest.py embedding model (EMBEDDING_MODEL) to ONNX, int8-quantize it, and
+# write the directory QUERY_EMBEDDER=onnx loads (ONNX_MODEL_DIR):
+#   model.onnx / model.int8.onnx, tokenizer.json, embedder.json
+# With --cross-encoder, export RERANK_MODEL instead, for RERANKER=onnx (RERANK_MODEL_DIR):
+#   model.onnx / model.int8.onnx, tokenizer.json, reranker.json
+# Runs in the ingest venv (torch + sentence-transformers + onnx + onnxruntime).
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+from src.config import Config
+from src.embedding.query_embedder import OnnxQueryEmbedder
+from src.index.rerank import OnnxCrossEncoder
+
+PARITY_SAMPLES = [
+    "What projects has Erika built?",
+    "Quais ferramentas a Erika usa?",
+    "Welke opleiding heeft Erika gevolgd?",
+    "Does she have experience with FAISS and dbt?",
+]
+
+
+class _Encoder(torch.nn.Module):
+    """Transformer body only: token embeddings out, pooling happens in OnnxQueryEmbedder."""
+
+    def __init__(self, auto_model):
+        super().__init__()
+        self.m = auto_model
+
+    def forward(self, input_ids, attention_mask):
+        return self.m(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+
+def export(model_name: str, out: Path, max_length: int, quantize: bool) -> Path:
+    st = SentenceTransformer(model_name, device="cpu")
+    pooling = "cls" if st[1].get_config_dict().get("pooling_mode_cls_token") else "mean"
+    out.mkdir(parents=True, exist_ok=True)
+
+    dummy = st.tokenizer(["export"], return_tensors="pt", padding="max_length", max_length=16)
+    onnx_path = out / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(st[0].auto_model).eval(),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            str(onnx_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["token_embeddings"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "seq"}, "attention_mask": {0: "batch", 1: "seq"},
+                          "token_embeddings": {0: "batch", 1: "seq"}},
+            opset_version=17,
+        )
+    model_file = onnx_path.name
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(onnx_path), str(out / "model.int8.onnx"), weight_type=QuantType.QInt8)
+        model_file = "model.int8.onnx"
+
+    st.tokenizer.save_pretrained(str(out))  # fast tokenizers write tokenizer.json
+    info = {
+        "model": model_name,  # must equal the index manifest's embedder.model
+        "dim": st.get_sentence_embedding_dimension(),
+        "file": model_file,
+        "pooling": pooling,
+        "max_length": min(max_length, st.max_seq_length),
+        "pad_token": st.tokenizer.pad_token,
+        "pad_id": st.tokenizer.pad_token_id,
+    }
+    (out / "embedder.json").write_text(json.dumps(info, indent=2), encoding="utf-8")
+
+    ref = st.encode(PARITY_SAMPLES, normalize_embeddings=True)
+    got = OnnxQueryEmbedder(out).embed_sync(PARITY_SAMPLES)
+    cos = np.sum(ref * got, axis=1)
+    print(f"Exported {model_name} -> {out / model_file} (dim={info['dim']}, pooling={pooling})")
+    print(f"Parity vs sentence-transformers: min cosine {cos.min():.4f}, mean {cos.mean():.4f}")
+    return out
+
+
+class _Classifier(torch.nn.Module):
+    """Sequence-classification head: one relevance logit per (question, passage) pair."""
+
+    def __init__(self, model, input_names):
+        super().__init__()
+        self.m, self.input_names = model, input_names
+
+    def forward(self, *inputs):
+        return self.m(**dict(zip(self.input_names, inputs))).logits
+
+
+def export_cross_encoder(model_name: str, out: Path, max_length: int, quantize: bool) -> Path:
+    from sentence_transformers import CrossEncoder
+
+    ce = CrossEncoder(model_name, device="cpu")
+    out.mkdir(parents=True, exist_ok=True)
+    dummy = ce.tokenizer(["export"], ["a passage"], return_tensors="pt", padding="max_length", max_length=16)
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+    onnx_path = out / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            _Classifier(ce.model.eval(), names),
+            tuple(dummy[n] for n in names),
+            str(onnx_path),
+            input_names=names,
+            output_names=["logits"],
+            dynamic_axes={**{n: {0: "batch", 1: "seq"} for n in names}, "logits": {0: "batch"}},
+            opset_version=17,
+        )
+    model_file = onnx_path.name
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(onnx_path), str(out / "model.int8.onnx"), weight_type=QuantType.QInt8)
+        model_file = "model.int8.onnx"
+
+    ce.tokenizer.save_pretrained(str(out))
+    info = {
+        "model": model_name,
+        "file": model_file,
+        "max_length": min(max_length, ce.tokenizer.model_max_length),
+        "pad_token": ce.tokenizer.pad_token,
+        "pad_id": ce.tokenizer.pad_token_id,
+    }
+    (out / "reranker.json").write_text(json.dumps(info, indent=2), encoding="utf-8")
+
+    pairs = [(q, p) for q in PARITY_SAMPLES for p in PARITY_SAMPLES[:2]]
+    ref = 1 / (1 + np.exp(-np.asarray(ce.predict(pairs, activation_fct=lambda x: x)).reshape(len(pairs), -1)[:, 0]))
+    onnx_ce = OnnxCrossEncoder(out)
+    got = np.concatenate([onnx_ce.score_sync(q, [p]) for q, p in pairs])
+    print(f"Exported {model_name} -> {out / model_file}")
+    print(f"Parity vs sentence-transformers: max |prob diff| {np.abs(ref - got).max():.4f}")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export EMBEDDING_MODEL to ONNX for QUERY_EMBEDDER=onnx")
+    ap.add_argument("--cross-encoder", action="store_true",
+                    help="export RERANK_MODEL for RERANKER=onnx instead (default --out RERANK_MODEL_DIR)")
+    ap.add_argument("--model")
+    ap.add_argument("--out", type=Path)
+    ap.add_argument("--max-length", type=int)
+    ap.add_argument("--no-quantize", action="store_true", help="keep fp32 weights only")
+    args = ap.parse_args()
+    if args.cross_encoder:
+        export_cross_encoder(args.model or Config.RERANK_MODEL, args.out or Path(Config.RERANK_MODEL_DIR),
+                             args.max_length or 256, quantize=not args.no_quantize)
+    else:
+        export(args.model or Config.EMBEDDING_MODEL, args.out or Path(Config.ONNX_MODEL_DIR),
+               args.max_length or 128, quantize=not args.no_quantize)
+
+
+if __name__ == "__main__":
+    main()
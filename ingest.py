@@ -1,6 +1,6 @@
 # ingest.py
 # Build a single FAISS index from ALL files under data/source/** (pdf/md/txt)
-import os, json
+import argparse, os, json, time
 from pathlib import Path
 from typing import List, Dict, Tuple
 import numpy as np
@@ -8,6 +8,13 @@ import faiss
 from pypdf import PdfReader
 from sentence_transformers import SentenceTransformer
 from src.config import Config
+from src.index.chunk_store import write_chunk_store
+from src.index.lexical import LEXICAL_FILE, lexical_manifest_entry, write_lexical_index
+from src.index.ann import build_index_from_config
+from src.index.manifest import build_manifest, file_sha1, write_manifest
+from src.ingest.embed_cache import EmbeddingCache
+from src.ingest.incremental import DELTA_FILE, update_index
+from src.ingest.pipeline import StageStats, embed_texts_sync, extract_texts
 
 DATA_DIR = Path("data")
 SRC_DIR  = DATA_DIR / "source"
@@ -59,6 +66,50 @@ def _iter_source_files(root: Path) -> List[Path]:
     return files
 
 # ---------- main ----------
+def main_incremental():
+    """Embed only new/changed files, drop vectors of changed/deleted ones, and write delta.npz."""
+    embed_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+    files = _iter_source_files(SRC_DIR)
+    stats = StageStats()
+    cache = EmbeddingCache(Config.EMBED_CACHE_PATH, Config.EMBEDDING_MODEL) if Config.EMBED_CACHE_PATH else None
+    encode = lambda batch: embed_model.encode(batch, normalize_embeddings=True)
+
+    def embed(texts: List[str]) -> np.ndarray:
+        mat = embed_texts_sync(texts, encode, cache=cache, batch_size=Config.EMBED_BATCH_SIZE, stats=stats)
+        faiss.normalize_L2(mat)
+        return mat
+
+    result = update_index(
+        IDX_DIR,
+        SRC_DIR,
+        files,
+        read_fn=_load_text,
+        chunk_fn=lambda text: _split_words(text.strip(), Config.CHUNK_SIZE, Config.CHUNK_OVERLAP),
+        embed_fn=embed,
+        provider="sentence-transformers",
+        model=Config.EMBEDDING_MODEL,
+        dim=embed_model.get_sentence_embedding_dimension(),
+        chunk_unit="words",
+        chunk_size=Config.CHUNK_SIZE,
+        chunk_overlap=Config.CHUNK_OVERLAP,
+        cache=cache,
+        workers=Config.INGEST_WORKERS,
+        stats=stats,
+    )
+    d, manifest = result["diff"], result["manifest"]
+    print("\n=== Incremental ingest summary ===")
+    print(f"Files added     : {len(d['added'])}")
+    print(f"Files changed   : {len(d['changed'])}")
+    print(f"Files removed   : {len(d['removed'])}")
+    print(f"Files unchanged : {len(d['unchanged'])}")
+    print(f"Vectors removed : {result['removed_vectors']}")
+    print(f"Vectors added   : {result['added_vectors']}")
+    print(f"Index size      : {manifest['index']['ntotal']} ({result['tombstones']} tombstoned chunks)")
+    print(f"Index version   : {manifest['content_hash'][:12]}")
+    if "delta" in manifest and (d["added"] or d["changed"] or d["removed"]):
+        print(f"Wrote           : {IDX_DIR/DELTA_FILE} (from {manifest['delta']['base_version'][:12]})")
+    print(stats.report())
+
 def main():
     # load model once
     embed_model = SentenceTransformer(Config.EMBEDDING_MODEL)
@@ -68,14 +119,22 @@ def main():
     if not files:
         raise SystemExit("Put your files under data/source/ (pdf/md/txt).")
 
+    stats = StageStats()
+    # content-hash-keyed cache: unchanged files/chunks are neither re-read nor re-embedded,
+    # and an interrupted run picks up where it stopped
+    cache = EmbeddingCache(Config.EMBED_CACHE_PATH, Config.EMBEDDING_MODEL) if Config.EMBED_CACHE_PATH else None
+    texts_by_file = extract_texts(files, _load_text, cache=cache, workers=Config.INGEST_WORKERS, stats=stats)
+    encode = lambda batch: embed_model.encode(batch, normalize_embeddings=True)
+
     all_vecs: List[np.ndarray] = []
     meta: List[Dict] = []
+    file_entries: List[Dict] = []
     total_chunks = 0
     used_files = 0
     skipped_files = 0
 
     for f in files:
-        text = _load_text(f).strip()
+        text = texts_by_file[f].strip()
         if not text:
             print(f"[skip] no text extracted: {f.relative_to(SRC_DIR)}")
             skipped_files += 1
@@ -86,8 +145,8 @@ def main():
             skipped_files += 1
             continue
 
-        # encode; ensure 2D shape even for single-chunk case
-        vecs = embed_model.encode(chunks, normalize_embeddings=True)
+        # encode (cache misses only); ensure 2D shape even for single-chunk case
+        vecs = embed_texts_sync(chunks, encode, cache=cache, batch_size=Config.EMBED_BATCH_SIZE, stats=stats)
         vecs = np.asarray(vecs, dtype="float32")
         if vecs.ndim == 1:
             # single chunk → make it (1, dim)
@@ -103,8 +162,10 @@ def main():
             continue
 
         all_vecs.append(vecs)
+        rel = str(f.relative_to(SRC_DIR))
+        file_entries.append({"path": rel, "sha1": file_sha1(f), "chunks": [len(meta), len(meta) + len(chunks)]})
         for c in chunks:
-            meta.append({"source": str(f.relative_to(SRC_DIR)), "text": c})
+            meta.append({"source": rel, "text": c})
         total_chunks += len(chunks)
         used_files += 1
         print(f"[ok] {f.relative_to(SRC_DIR)} → {len(chunks)} chunks")
@@ -117,12 +178,37 @@ def main():
     faiss.normalize_L2(mat)
 
     IDX_DIR.mkdir(parents=True, exist_ok=True)
-    index = faiss.IndexFlatIP(mat.shape[1])
-    index.add(mat)
+    t0 = time.perf_counter()
+    index, index_params = build_index_from_config(mat)  # flat / hnsw / ivf_flat / ivf_pq
+    stats.record("index", time.perf_counter() - t0, chunks=index.ntotal)
 
     faiss.write_index(index, str(IDX_DIR / "faiss.index"))
-    with open(IDX_DIR / "meta.json", "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False)
+    # texts/sources go to the mmap-able chunk store; meta.json is the versioned manifest
+    chunks_sha1 = write_chunk_store(
+        IDX_DIR / "chunks.bin",
+        [m["text"] for m in meta],
+        [m["source"] for m in meta],
+    )
+    t0 = time.perf_counter()
+    lexical_sha1 = write_lexical_index(IDX_DIR / LEXICAL_FILE, enumerate(m["text"] for m in meta), len(meta))
+    stats.record("lexical", time.perf_counter() - t0, chunks=len(meta))
+    manifest = build_manifest(
+        provider="sentence-transformers",
+        model=Config.EMBEDDING_MODEL,
+        dim=mat.shape[1],
+        index_type=index_params["type"],
+        index_params=index_params,
+        ntotal=index.ntotal,
+        chunk_unit="words",
+        chunk_size=Config.CHUNK_SIZE,
+        chunk_overlap=Config.CHUNK_OVERLAP,
+        chunk_store_sha1=chunks_sha1,
+        files=file_entries,
+        index_sha1=file_sha1(IDX_DIR / "faiss.index"),
+        lexical=lexical_manifest_entry(lexical_sha1),
+    )
+    write_manifest(IDX_DIR / "meta.json", manifest)
+    (IDX_DIR / DELTA_FILE).unlink(missing_ok=True)  # a full build has no base to diff against
 
     print("\n=== Ingest summary ===")
     print(f"Files scanned   : {len(files)}")
@@ -131,7 +217,16 @@ def main():
     print(f"Total chunks    : {total_chunks}")
     print(f"Embedding dim   : {mat.shape[1]}")
     print(f"Index size      : {index.ntotal}")
-    print(f"Wrote           : {IDX_DIR/'faiss.index'}, {IDX_DIR/'meta.json'}")
+    print(f"Index type      : {index_params}")
+    print(f"Index version   : {manifest['content_hash'][:12]}")
+    print(f"Wrote           : {IDX_DIR/'faiss.index'}, {IDX_DIR/'chunks.bin'}, {IDX_DIR/LEXICAL_FILE}, {IDX_DIR/'meta.json'}")
+    print(stats.report())
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Embed data/source/** with SentenceTransformers into data/index/")
+    ap.add_argument("--incremental", action="store_true",
+                    help="update the existing index with new/changed/deleted files only")
+    if ap.parse_args().incremental:
+        main_incremental()
+    else:
+        main()
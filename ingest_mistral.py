@@ -1,13 +1,23 @@
 # ingest_mistral.py
+import argparse
+import asyncio
 import os
-import json
+import time
 import faiss
 import numpy as np
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 from mistralai import Mistral
 from pypdf import PdfReader
 from dotenv import load_dotenv
+from src.index.chunk_store import write_chunk_store
+from src.index.lexical import LEXICAL_FILE, lexical_manifest_entry, write_lexical_index
+from src.index.ann import build_index_from_config
+from src.index.manifest import build_manifest, file_sha1, write_manifest
+from src.config import Config
+from src.ingest.embed_cache import EmbeddingCache
+from src.ingest.incremental import DELTA_FILE, update_index
+from src.ingest.pipeline import StageStats, embed_texts_async, extract_texts
 
 load_dotenv()
 
@@ -25,7 +35,7 @@ API_KEY = os.getenv("MISTRAL_API_KEY")
 if not API_KEY:
     raise RuntimeError("Set MISTRAL_API_KEY in your environment.")
 
-client = Mistral(api_key=API_KEY)
+client = Mistral(api_key=API_KEY, server_url=Config.MISTRAL_SERVER_URL)
 
 # ========= Utils =========
 def read_file_text(p: Path) -> str:
@@ -54,82 +64,152 @@ def chunk_text(s: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) ->
         i += max(1, size - overlap)
     return chunks
 
-def embed_batch(texts: List[str], batch_size: int = 32) -> np.ndarray:
+async def _embed_one_batch(batch: List[str]) -> List[List[float]]:
+    res = await client.embeddings.create_async(model=MODEL, inputs=batch)
+    # res.data is List[Embedding] with .embedding list[float]
+    return [item.embedding for item in res.data]
+
+def embed_batch(texts: List[str], batch_size: int = 32, cache: EmbeddingCache | None = None,
+                stats: StageStats | None = None) -> np.ndarray:
     """
-    Embeds in batches using the new client: client.embeddings.create(model=..., inputs=[...]).
+    Embeds with up to EMBED_CONCURRENCY batches in flight (client.embeddings.create_async),
+    backing off on 429/5xx. Chunks already in `cache` are not re-embedded.
     Returns float32 array of shape (N, DIM).
     """
-    vecs = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i : i + batch_size]
-        # Mistral expects list[str]; ensure all are strings and non-empty
-        batch = [t if isinstance(t, str) else str(t) for t in batch]
-        batch = [t for t in batch if t.strip()]
-        if not batch:
-            continue
-        res = client.embeddings.create(model=MODEL, inputs=batch)
-        # res.data is List[Embedding] with .embedding list[float]
-        for item in res.data:
-            vecs.append(item.embedding)
-    if not vecs:
+    # Mistral expects list[str]; ensure all are strings and non-empty
+    texts = [t if isinstance(t, str) else str(t) for t in texts]
+    texts = [t for t in texts if t.strip()]
+    if not texts:
         return np.zeros((0, DIM), dtype="float32")
-    arr = np.array(vecs, dtype="float32")
+    arr = asyncio.run(embed_texts_async(
+        texts,
+        _embed_one_batch,
+        cache=cache,
+        batch_size=batch_size,
+        concurrency=Config.EMBED_CONCURRENCY,
+        max_retries=Config.EMBED_MAX_RETRIES,
+        stats=stats,
+    ))
+    arr = np.ascontiguousarray(arr, dtype="float32")
     # normalize for cosine similarity
     faiss.normalize_L2(arr)
     return arr
 
 # ========= Load docs & build corpus =========
-def load_corpus() -> List[str]:
+def source_paths() -> List[Path]:
     if not SOURCE_DIR.exists():
         raise RuntimeError(f"Source dir not found: {SOURCE_DIR.resolve()}. Put your files there.")
-    texts = []
-    for p in sorted(SOURCE_DIR.rglob("*")):
-        if not p.is_file():
-            continue
-        if p.suffix.lower() not in {".txt", ".md", ".pdf"}:
-            continue
-        content = read_file_text(p)
-        parts = chunk_text(content)
-        texts.extend(parts)
+    return [p for p in sorted(SOURCE_DIR.rglob("*")) if p.is_file() and p.suffix.lower() in {".txt", ".md", ".pdf"}]
+
+def file_chunks(content: str) -> List[str]:
     # sanitize: only non-empty strings
-    texts = [t.strip() for t in texts if isinstance(t, str) and t.strip()]
+    return [t.strip() for t in chunk_text(content) if isinstance(t, str) and t.strip()]
+
+def load_corpus(cache: EmbeddingCache | None = None, stats: StageStats | None = None) -> Tuple[List[str], List[str], List[dict]]:
+    """Returns (chunk texts, per-chunk source path, per-file manifest entries)."""
+    paths = source_paths()
+    # PDFs are parsed in a process pool; unchanged files come from the cache
+    contents = extract_texts(paths, read_file_text, cache=cache, workers=Config.INGEST_WORKERS, stats=stats)
+    t0 = time.perf_counter()
+    texts, sources, files = [], [], []
+    for p in paths:
+        parts = file_chunks(contents[p])
+        rel = str(p.relative_to(SOURCE_DIR))
+        start = len(texts)
+        texts.extend(parts)
+        sources.extend([rel] * len(parts))
+        files.append({"path": rel, "sha1": file_sha1(p), "chunks": [start, len(texts)]})
+    if stats:
+        stats.record("chunk", time.perf_counter() - t0, files=len(paths), chunks=len(texts))
     if not texts:
         raise RuntimeError("No text chunks found. Ensure data/source has .txt/.md/.pdf with readable text.")
-    return texts
+    return texts, sources, files
+
+def main_incremental():
+    """Embed only new/changed files, drop vectors of changed/deleted ones, and write delta.npz."""
+    stats = StageStats()
+    cache = EmbeddingCache(Config.EMBED_CACHE_PATH, MODEL) if Config.EMBED_CACHE_PATH else None
+    result = update_index(
+        INDEX_DIR,
+        SOURCE_DIR,
+        source_paths(),
+        read_fn=read_file_text,
+        chunk_fn=file_chunks,
+        embed_fn=lambda texts: embed_batch(texts, batch_size=Config.EMBED_BATCH_SIZE, cache=cache, stats=stats),
+        provider="mistral",
+        model=MODEL,
+        dim=DIM,
+        chunk_unit="chars",
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        cache=cache,
+        workers=Config.INGEST_WORKERS,
+        stats=stats,
+    )
+    d, manifest = result["diff"], result["manifest"]
+    print(f"Files: +{len(d['added'])} ~{len(d['changed'])} -{len(d['removed'])} ={len(d['unchanged'])}")
+    if not (d["added"] or d["changed"] or d["removed"]):
+        print(f"Index is up to date (version {manifest['content_hash'][:12]})")
+        return
+    print(f"Vectors: -{result['removed_vectors']} +{result['added_vectors']} -> {manifest['index']['ntotal']} "
+          f"({result['tombstones']} tombstoned chunks; a full ingest compacts them)")
+    print(f"Wrote delta: {INDEX_DIR / DELTA_FILE} (version {manifest['delta']['base_version'][:12]} -> "
+          f"{manifest['content_hash'][:12]})")
+    print(stats.report())
 
 def main():
-    texts = load_corpus()
+    stats = StageStats()
+    # content-hash-keyed cache: re-runs (or a resumed interrupted run) skip unchanged chunks
+    cache = EmbeddingCache(Config.EMBED_CACHE_PATH, MODEL) if Config.EMBED_CACHE_PATH else None
+    texts, sources, files = load_corpus(cache=cache, stats=stats)
     print(f"Chunks to embed: {len(texts)}")
 
-    embeddings = embed_batch(texts, batch_size=32)
+    embeddings = embed_batch(texts, batch_size=Config.EMBED_BATCH_SIZE, cache=cache, stats=stats)
     if embeddings.shape[0] != len(texts):
         raise RuntimeError(f"Embeddings count mismatch: {embeddings.shape[0]} vs {len(texts)}")
 
-    # FAISS index (cosine via inner product + L2-normalized vectors)
-    index = faiss.IndexFlatIP(DIM)
-    index.add(embeddings)
+    # FAISS index (cosine via inner product + L2-normalized vectors); type from INDEX_TYPE
+    t0 = time.perf_counter()
+    index, index_params = build_index_from_config(embeddings)
+    stats.record("index", time.perf_counter() - t0, chunks=index.ntotal)
+    print(f"Index: {index_params}")
 
-    # Save outputs
+    # Save outputs (texts go to the mmap-able chunk store, meta.json is the versioned manifest)
     index_path = INDEX_DIR / "faiss.index"
     meta_path = INDEX_DIR / "meta.json"
+    chunks_path = INDEX_DIR / "chunks.bin"
 
     faiss.write_index(index, str(index_path))
-    with open(meta_path, "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "model": MODEL,
-                "dim": DIM,
-                "metric": "cosine",
-                "chunk_size": CHUNK_SIZE,
-                "chunk_overlap": CHUNK_OVERLAP,
-                "texts": texts,
-            },
-            f,
-            ensure_ascii=False,
-            indent=2,
-        )
-
-    print(f"Wrote index: {index_path}  and meta: {meta_path}")
+    chunks_sha1 = write_chunk_store(chunks_path, texts, sources)
+    t0 = time.perf_counter()
+    lexical_sha1 = write_lexical_index(INDEX_DIR / LEXICAL_FILE, enumerate(texts), len(texts))  # BM25 for hybrid search
+    stats.record("lexical", time.perf_counter() - t0, chunks=len(texts))
+    manifest = build_manifest(
+        provider="mistral",
+        model=MODEL,
+        dim=DIM,
+        index_type=index_params["type"],
+        index_params=index_params,
+        ntotal=index.ntotal,
+        chunk_unit="chars",
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        chunk_store_sha1=chunks_sha1,
+        files=files,
+        index_sha1=file_sha1(index_path),
+        lexical=lexical_manifest_entry(lexical_sha1),
+    )
+    write_manifest(meta_path, manifest)
+    (INDEX_DIR / DELTA_FILE).unlink(missing_ok=True)  # a full build has no base to diff against
+
+    print(f"Wrote index: {index_path}, chunks: {chunks_path}, lexical: {INDEX_DIR / LEXICAL_FILE} and meta: {meta_path} (version {manifest['content_hash'][:12]})")
+    print(stats.report())
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Embed data/source/** with mistral-embed into data/index/")
+    ap.add_argument("--incremental", action="store_true",
+                    help="update the existing index with new/changed/deleted files only")
+    if ap.parse_args().incremental:
+        main_incremental()
+    else:
+        main()
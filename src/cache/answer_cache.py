@@ -0,0 +1,95 @@
+"""Semantic answer cache: reuse a stored answer when a new question embeds close to a cached one."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Small FAISS-backed cache of (question vector -> answer, citations).
+
+    Entries are scoped by (language, index_version); a lookup only matches entries of
+    the same scope whose cosine similarity is >= `threshold`. The cache holds at most
+    `max_entries` answers and evicts the least recently used one. `invalidate()` drops
+    everything and is called whenever rag loads a different index.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512):
+        self.threshold = float(threshold)
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._indexes: Dict[Tuple[str, str], faiss.IndexIDMap] = {}
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _scope_index(self, scope: Tuple[str, str], dim: int) -> faiss.IndexIDMap:
+        idx = self._indexes.get(scope)
+        if idx is None:
+            idx = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+            self._indexes[scope] = idx
+        return idx
+
+    def lookup(self, qvec: np.ndarray, lang: str, index_version: str) -> Optional[dict]:
+        """Return {"answer", "citations", "question", "score"} for the nearest cached question, or None."""
+        q = np.asarray(qvec, dtype="float32").reshape(1, -1)
+        with self._lock:
+            idx = self._indexes.get((lang, index_version))
+            if idx is None or idx.ntotal == 0 or idx.d != q.shape[1]:
+                self.misses += 1
+                return None
+            scores, ids = idx.search(q, 1)
+            score, eid = float(scores[0][0]), int(ids[0][0])
+            if eid == -1 or score < self.threshold or eid not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(eid)
+            self.hits += 1
+            entry = self._entries[eid]
+            return {**entry["value"], "score": score}
+
+    def store(self, qvec: np.ndarray, lang: str, index_version: str, question: str,
+              answer: str, citations: List[dict]):
+        q = np.asarray(qvec, dtype="float32").reshape(1, -1)
+        scope = (lang, index_version)
+        with self._lock:
+            eid = self._next_id
+            self._next_id += 1
+            self._scope_index(scope, q.shape[1]).add_with_ids(q, np.array([eid], dtype="int64"))
+            self._entries[eid] = {
+                "scope": scope,
+                "ts": time.time(),
+                "value": {"answer": answer, "citations": list(citations), "question": question},
+            }
+            while len(self._entries) > self.max_entries:
+                old_id, old = self._entries.popitem(last=False)
+                idx = self._indexes[old["scope"]]
+                idx.remove_ids(np.array([old_id], dtype="int64"))
+                if idx.ntotal == 0:  # an index version or language nobody asks about any more
+                    del self._indexes[old["scope"]]
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "scopes": len(self._indexes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,165 @@
+"""In-process LRU/TTL cache of query embeddings, optionally persisted to disk."""
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+_PUNCT = re.compile(r"[^\w\s]+", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Case/whitespace/punctuation-insensitive form of a question (accents are kept)."""
+    q = unicodedata.normalize("NFKC", question or "").casefold()
+    q = _PUNCT.sub(" ", q)
+    return _SPACES.sub(" ", q).strip()
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded map (model, normalized question) -> unit query vector.
+
+    Evicts least-recently-used entries past `max_entries` and treats entries older than
+    `ttl` seconds as misses. With `path` set, entries are loaded on start and written
+    back (atomically) every `persist_every` inserts and on `save()`. Inserts made on an
+    event loop write in a worker thread, one save at a time.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400.0, path: Optional[str] = None,
+                 persist_every: int = 32):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self.path = path or None
+        self.persist_every = max(1, int(persist_every))
+        self.logger = logging.getLogger("query_cache")
+        self._data: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # saves in order: an older snapshot never replaces a newer one
+        self._dirty = 0
+        self._saving = False
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        if self.path:
+            self._load()
+
+    @staticmethod
+    def key(model: str, question: str) -> Tuple[str, str]:
+        return (model, normalize_question(question))
+
+    def get(self, model: str, question: str) -> Optional[np.ndarray]:
+        k = self.key(model, question)
+        now = time.time()
+        with self._lock:
+            item = self._data.get(k)
+            if item is None:
+                self.misses += 1
+                return None
+            vec, ts = item
+            if self.ttl > 0 and now - ts > self.ttl:
+                del self._data[k]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(k)
+            self.hits += 1
+            return vec
+
+    def put(self, model: str, question: str, vec: np.ndarray):
+        k = self.key(model, question)
+        vec = np.asarray(vec, dtype="float32").reshape(-1)
+        with self._lock:
+            self._data[k] = (vec, time.time())
+            self._data.move_to_end(k)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            self._dirty += 1
+            flush = self.path and self._dirty >= self.persist_every and not self._saving
+            self._saving = self._saving or bool(flush)
+        if flush:
+            try:
+                asyncio.get_running_loop().run_in_executor(None, self._background_save)
+            except RuntimeError:  # no event loop: the caller is a thread already
+                self._background_save()
+
+    def _background_save(self):
+        try:
+            self.save()
+        finally:
+            self._saving = False
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "persist_path": self.path,
+            }
+
+    # ---------- persistence ----------
+    def save(self):
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                items = list(self._data.items())
+                self._dirty = 0
+            if items:
+                self._write(items)
+
+    def _write(self, items):
+        tmp = None
+        try:
+            folder = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(folder, exist_ok=True)
+            # a unique name next to the target: other workers may share the path
+            fd, tmp = tempfile.mkstemp(dir=folder, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    models=np.array([k[0] for k, _ in items]),
+                    questions=np.array([k[1] for k, _ in items]),
+                    vecs=np.stack([v for _, (v, _) in items]),
+                    ts=np.array([ts for _, (_, ts) in items], dtype="float64"),
+                )
+            os.replace(tmp, self.path)
+        except Exception as e:
+            self.logger.warning(f"Could not persist query cache to {self.path}: {e}")
+            if tmp and os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as z:
+                models, questions, vecs, ts = z["models"], z["questions"], z["vecs"], z["ts"]
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable query cache {self.path}: {e}")
+            return
+        now = time.time()
+        for m, q, v, t in zip(models, questions, vecs, ts):
+            if self.ttl > 0 and now - float(t) > self.ttl:
+                continue
+            self._data[(str(m), str(q))] = (v.astype("float32"), float(t))
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+        self.logger.info(f"Loaded {len(self._data)} cached query vectors from {self.path}")
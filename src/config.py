@@ -8,6 +8,8 @@ class Config:
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "mistral")
     LLM_MODEL = os.getenv("LLM_MODEL", "mistral-large-latest")
     LLM_API_KEY = os.getenv("MISTRAL_API_KEY") or os.getenv("LLM_API_KEY")
+    # Override the Mistral API base URL (e.g. a local stub server for benchmarks/tests)
+    MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL") or None
 
     # RAG knobs
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "paraphrase-multilingual-mpnet-base-v2")
@@ -15,3 +17,117 @@ class Config:
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 60))
     TOP_K = int(os.getenv("TOP_K", 8))
     TEMPERATURE = float(os.getenv("TEMPERATURE", 0.4))
+
+    # Query embedder: mistral (API) | onnx (local export of EMBEDDING_MODEL, see export_onnx.py) | sentence-transformers
+    QUERY_EMBEDDER = os.getenv("QUERY_EMBEDDER", "mistral")
+    ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/query-embedder")
+    ONNX_THREADS = int(os.getenv("ONNX_THREADS", 0))  # onnxruntime intra-op threads; 0 = all cores
+    QUERY_EMBED_BATCH = int(os.getenv("QUERY_EMBED_BATCH", 32))
+    # Micro-batching: concurrent query embeddings / index searches wait up to the window to share one call
+    QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", 5))  # 0 = only what is already queued
+    QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", 32))
+
+    # Index location shared by app.py (download) and rag.py (load), and by every worker on the host
+    INDEX_DIR = os.getenv("INDEX_DIR", "data/index")
+    INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() in {"1", "true", "yes"}  # faiss IO_FLAG_MMAP
+
+    # ANN index (built at ingest; flat | hnsw | ivf_flat | ivf_pq) and query-time knobs
+    INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+    HNSW_M = int(os.getenv("HNSW_M", 32))
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", 200))
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", 64))
+    IVF_NLIST = int(os.getenv("IVF_NLIST", 0))  # 0 = ~4*sqrt(N)
+    IVF_NPROBE = int(os.getenv("IVF_NPROBE", 8))
+    PQ_M = int(os.getenv("PQ_M", 64))
+    PQ_NBITS = int(os.getenv("PQ_NBITS", 8))
+    INDEX_TRAIN_SAMPLE = int(os.getenv("INDEX_TRAIN_SAMPLE", 50000))
+
+    # Ingest pipeline (process pool for extraction, concurrent embedding batches, on-disk cache)
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 32))
+    EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 4))
+    EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", 6))
+    EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "data/.cache/embeddings.sqlite")  # "" = off
+
+    # Query-embedding cache (LRU + TTL; QUERY_CACHE_PATH="" disables persistence)
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 86400))
+    QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "")
+
+    # Semantic answer cache (cosine threshold on question embeddings, per language + index version)
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 512))
+
+    # Hybrid retrieval: BM25 (lexical.bin) + dense, merged with reciprocal rank fusion
+    HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in {"1", "true", "yes"}
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 20))  # per ranker, before fusion
+    RRF_K = int(os.getenv("RRF_K", 60))
+
+    # Second stage (src/index/rerank.py): over-fetch RERANK_CANDIDATES, thresholds, cross-encoder, MMR -> TOP_K
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 30))
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", 0.7))  # 1 = relevance only, no diversity
+    MMR_SIMILARITY = os.getenv("MMR_SIMILARITY", "auto")  # auto (stored vectors, else text) | text (word overlap)
+    RERANKER = os.getenv("RERANKER", "off")  # cross-encoder: off | onnx | sentence-transformers
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")  # multilingual
+    RERANK_MODEL_DIR = os.getenv("RERANK_MODEL_DIR", "models/reranker")  # export_onnx.py --cross-encoder
+    RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", 0))  # cross-encoder probability; 0 = keep all
+    DENSE_MIN_SCORE = float(os.getenv("DENSE_MIN_SCORE", 0))  # query cosine; 0 = keep all
+    RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 250))  # skip the cross-encoder past this
+
+    # Prompt assembly (src/llm/context_packer.py): merge/dedupe hits, then pack them best first into the budget
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1000))  # tokens of retrieved context; 0 = no cap
+    PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "auto")  # auto | mistral (mistral-common) | estimate
+    PROMPT_TOKENIZER_FILE = os.getenv("PROMPT_TOKENIZER_FILE", "")  # tekken .json; "" = the one mistral-common ships
+    PROMPT_STYLE = os.getenv("PROMPT_STYLE", "full")  # full (BASE_SYSTEM_PROMPT) | compact (short, per language)
+    # Static system prompt alone in the system message, per-request instructions last (provider prefix caching)
+    LLM_PREFIX_CACHE = os.getenv("LLM_PREFIX_CACHE", "true").lower() in {"1", "true", "yes"}
+
+    # LLM client (src/llm/resilience.py): one pooled client, deadline per request, retries, hedging, circuit breaker
+    REQUEST_DEADLINE_S = float(os.getenv("REQUEST_DEADLINE_S", 30))  # whole /ask; LLM calls stop retrying at it; 0 = none
+    LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", 20))  # one attempt (streaming: until the first token)
+    LLM_CONNECT_TIMEOUT_S = float(os.getenv("LLM_CONNECT_TIMEOUT_S", 5))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+    LLM_KEEPALIVE_S = float(os.getenv("LLM_KEEPALIVE_S", 60))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+    LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", 0.25))  # full-jitter backoff: U(0, base * 2^n)
+    LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", 0))  # send a second request past this; 0 = off
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))  # failed calls in a row that open it; 0 = off
+    LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", 30))  # open -> one trial call after this
+
+    # Multi-tenant: /ask with "tenant" answers from <INDEX_DIR>/tenants/<id> (GCS: <prefix>/<TENANT_GCS_PREFIX>/<id>)
+    TENANT_GCS_PREFIX = os.getenv("TENANT_GCS_PREFIX", "tenants").strip("/")
+    TENANT_INDEX_BUDGET_MB = float(os.getenv("TENANT_INDEX_BUDGET_MB", 512))  # loaded tenant indexes (LRU by bytes)
+
+    # Conversation sessions: /ask with "session_id" keeps history (src/serving/sessions.py, src/llm/history.py)
+    SESSION_STORE = os.getenv("SESSION_STORE", "memory")  # memory (per worker) | redis (shared, needs `redis`)
+    SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "")
+    SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", 1800))  # idle session expiry
+    SESSION_MAX = int(os.getenv("SESSION_MAX", 10000))  # memory store: sessions kept (LRU)
+    SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", 600))  # history in the prompt; compacted past it
+    SESSION_KEEP_TURNS = int(os.getenv("SESSION_KEEP_TURNS", 2))  # newest turns kept verbatim by compaction
+    SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", 200))  # running summary of older turns
+    SESSION_CONDENSE = os.getenv("SESSION_CONDENSE", "llm").lower()  # follow-up -> standalone query: llm | concat | off
+
+    # Speculative follow-ups (src/serving/speculation.py): with a session, the suggestions of the last answer are
+    # precomputed while the visitor reads it
+    SPECULATE = os.getenv("SPECULATE", "off").lower()  # off | retrieval (embedding calls) | answer (+ LLM calls)
+    SPECULATE_MAX_QUESTIONS = int(os.getenv("SPECULATE_MAX_QUESTIONS", 3))  # first N suggestions of an answer
+    SPECULATE_CONCURRENCY = int(os.getenv("SPECULATE_CONCURRENCY", 2))  # speculative jobs running per worker
+    SPECULATE_TTL_S = float(os.getenv("SPECULATE_TTL_S", 300))  # results unused after this are dropped
+    SPECULATE_MAX_SESSIONS = int(os.getenv("SPECULATE_MAX_SESSIONS", 1000))  # sessions with speculation kept
+
+    # Admission control for /ask and /ask/stream (src/serving/admission.py)
+    MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", 16))  # answers in flight per worker; 0 = unlimited
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))  # waiting beyond that -> 503
+    ADMISSION_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", 5))  # longest wait for a slot -> 503
+    RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", 0))  # per client IP, e.g. 0.5; 0 = off
+    RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", 10))
+    RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", 10000))  # buckets kept (LRU)
+    API_KEYS = os.getenv("API_KEYS", "")  # "key1,key2:20" (X-API-Key header; optional per-key RPS)
+    API_KEY_RATE_LIMIT_RPS = float(os.getenv("API_KEY_RATE_LIMIT_RPS", 10))
+    API_KEY_RATE_LIMIT_BURST = float(os.getenv("API_KEY_RATE_LIMIT_BURST", 50))
+    TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() in {"1", "true", "yes"}  # client IP from the proxy (Cloud Run)
+
+    # Observability: /metrics is always on; TRACE_MODE=off | log (JSON span tree per request) | otel
+    TRACE_MODE = os.getenv("TRACE_MODE", "off")
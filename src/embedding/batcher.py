@@ -0,0 +1,101 @@
+"""
+Request coalescing for the query path.
+
+`MicroBatcher` collects items submitted by concurrent requests for up to `window_s`
+(or until `max_batch` are waiting), runs one batched call, and resolves each caller's
+future with its own result. rag.py uses one for query embeddings (one API call / one
+ONNX run for many visitors) and one for FAISS searches (one `index.search` over a
+stacked query matrix).
+
+Batch sizes go into a `SizeHistogram` so the window can be tuned: mostly 1s means
+traffic is too sparse to coalesce and the window is pure added latency.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Sequence, Set
+
+
+class SizeHistogram:
+    """Counts of observed batch sizes in power-of-two buckets (upper bounds, inclusive)."""
+
+    def __init__(self, bounds: Sequence[int] = (1, 2, 4, 8, 16, 32, 64)):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last = overflow
+        self.total = 0
+        self.sum = 0
+
+    def observe(self, size: int):
+        i = next((j for j, b in enumerate(self.bounds) if size <= b), len(self.bounds))
+        self.counts[i] += 1
+        self.total += 1
+        self.sum += size
+
+    def snapshot(self) -> Dict:
+        buckets = {str(b): c for b, c in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "batches": self.total,
+            "items": self.sum,
+            "mean_size": round(self.sum / self.total, 2) if self.total else 0.0,
+            "buckets": buckets,
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent `submit(item)` calls into `fn(items) -> results` (same order).
+
+    window_s <= 0 disables waiting: each item is still routed through `fn`, as a batch of
+    whatever is already queued in the same loop iteration. An exception from `fn` is
+    raised in every caller of that batch.
+    """
+
+    def __init__(self, fn: Callable[[List], Awaitable[List]], window_s: float, max_batch: int):
+        self.fn = fn
+        self.window_s = max(0.0, window_s)
+        self.max_batch = max(1, max_batch)
+        self.histogram = SizeHistogram()
+        self._pending: List = []
+        self._timer = None
+        self._loop = None
+        self._tasks: Set[asyncio.Task] = set()  # running batches: the loop only keeps weak references
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # a new event loop (tests, benchmarks): drop stale state
+            self._loop, self._pending, self._timer = loop, [], None
+        fut = loop.create_future()
+        self._pending.append((item, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            if self.window_s:
+                self._timer = loop.call_later(self.window_s, self._flush)
+            else:
+                self._timer = loop.call_soon(self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+            self.histogram.observe(len(batch))
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            results = await self.fn([item for item, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), res in zip(batch, results):
+            if not fut.done():  # caller may have been cancelled
+                fut.set_result(res)
+
+    def stats(self) -> Dict:
+        return {"window_ms": self.window_s * 1000, "max_batch": self.max_batch, **self.histogram.snapshot()}
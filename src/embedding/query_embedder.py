@@ -0,0 +1,139 @@
+"""
+Pluggable query embedders (QUERY_EMBEDDER):
+
+    mistral                remote mistral-embed API (default; matches ingest_mistral.py indexes)
+    onnx                   local ONNX export (optionally int8-quantized) of the ingest.py model, on CPU
+    sentence-transformers  local PyTorch model (dev / parity checks; pulls in torch)
+
+Every backend has .provider / .model / .dim and returns L2-normalized float32 arrays of
+shape (n, dim) from `embed` (async) and `embed_sync`. The index manifest's embedder
+model is checked against `.model`, so a query is never compared with vectors from
+another model.
+"""
+import asyncio
+import json
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+BACKENDS = ("mistral", "onnx", "sentence-transformers")
+
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    mat = np.ascontiguousarray(mat, dtype="float32")
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    return mat / np.maximum(norms, 1e-12)
+
+
+class MistralQueryEmbedder:
+    """mistral-embed over the shared async SDK client (one HTTP round-trip per call)."""
+
+    provider = "mistral"
+
+    def __init__(self, client, model: str = "mistral-embed", dim: int = 1024):
+        self.client, self.model, self.dim = client, model, dim
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        res = await self.client.embeddings.create_async(model=self.model, inputs=list(texts))
+        return _normalize([item.embedding for item in res.data])
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        res = self.client.embeddings.create(model=self.model, inputs=list(texts))
+        return _normalize([item.embedding for item in res.data])
+
+
+class OnnxQueryEmbedder:
+    """
+    Transformer encoder exported by export_onnx.py, run with onnxruntime on CPU.
+
+    `model_dir` holds embedder.json (model name, dim, onnx file, pooling, max_length,
+    pad token), tokenizer.json and the .onnx file. `threads` caps onnxruntime's intra-op
+    pool (0 = its default, all cores); `max_batch` bounds the rows per session.run;
+    `concurrency` bounds simultaneous runs so parallel requests don't oversubscribe the CPU.
+    """
+
+    provider = "onnx"
+
+    def __init__(self, model_dir, threads: int = 0, max_batch: int = 32, concurrency: int = 1):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                f"QUERY_EMBEDDER=onnx needs onnxruntime and tokenizers (pip install onnxruntime tokenizers): {e}"
+            ) from e
+        model_dir = Path(model_dir)
+        info = json.loads((model_dir / "embedder.json").read_text(encoding="utf-8"))
+        self.model, self.dim = info["model"], int(info["dim"])
+        self.pooling = info.get("pooling", "mean")
+        self.max_batch = max(1, max_batch)
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(str(model_dir / info["file"]), opts, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=int(info.get("max_length", 128)))
+        self._tokenizer.enable_padding(pad_id=int(info.get("pad_id", 0)), pad_token=info.get("pad_token", "[PAD]"))
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        enc = self._tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in enc], dtype="int64")
+        mask = np.array([e.attention_mask for e in enc], dtype="int64")
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        with self._slots:
+            out = self._session.run(None, feeds)[0]
+        if out.ndim == 3:  # token embeddings -> sentence embedding
+            if self.pooling == "cls":
+                out = out[:, 0]
+            else:
+                m = mask[..., None].astype("float32")
+                out = (out * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+        return out
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        parts = [self._run(texts[i : i + self.max_batch]) for i in range(0, len(texts), self.max_batch)]
+        return _normalize(np.concatenate(parts) if parts else np.zeros((0, self.dim), dtype="float32"))
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        # onnxruntime releases the GIL inside run(); the loop keeps serving meanwhile
+        return await asyncio.to_thread(self.embed_sync, list(texts))
+
+
+class SentenceTransformerQueryEmbedder:
+    """The ingest.py model in PyTorch; heavy, but handy to check an ONNX export against."""
+
+    provider = "sentence-transformers"
+
+    def __init__(self, model: str, max_batch: int = 32):
+        from sentence_transformers import SentenceTransformer
+
+        self._st = SentenceTransformer(model)
+        self.model, self.dim = model, self._st.get_sentence_embedding_dimension()
+        self.max_batch = max_batch
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        return _normalize(self._st.encode(list(texts), batch_size=self.max_batch, normalize_embeddings=True))
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.embed_sync, list(texts))
+
+
+def make_query_embedder(kind: str, *, client=None, onnx_dir: Optional[str] = None, threads: int = 0,
+                        max_batch: int = 32, st_model: Optional[str] = None):
+    """Backend by name; `client` is the shared Mistral client (only used by "mistral")."""
+    if kind == "mistral":
+        return MistralQueryEmbedder(client)
+    if kind == "onnx":
+        return OnnxQueryEmbedder(onnx_dir, threads=threads, max_batch=max_batch)
+    if kind == "sentence-transformers":
+        return SentenceTransformerQueryEmbedder(st_model, max_batch=max_batch)
+    raise ValueError(f"unknown QUERY_EMBEDDER {kind!r}; expected one of {BACKENDS}")
@@ -0,0 +1,91 @@
+"""FAISS index factory (flat / HNSW / IVF-Flat / IVF-PQ) and query-time tuning knobs."""
+import logging
+import math
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+logger = logging.getLogger("ann")
+
+
+def auto_nlist(n: int) -> int:
+    """~4*sqrt(N) inverted lists, but keep >= 39 training points per centroid (faiss' minimum)."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def build_index(vectors: np.ndarray, index_type: str = "flat", *, hnsw_m: int = 32,
+                ef_construction: int = 200, nlist: int = 0, pq_m: int = 64, pq_nbits: int = 8,
+                train_sample: int = 50000, seed: int = 0) -> Tuple[faiss.Index, dict]:
+    """
+    Build an inner-product index over L2-normalized `vectors` (cosine).
+    Returns (index, params) where params is what ended up being used (goes to the manifest).
+    IVF variants fall back to flat when the corpus is too small to train them.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, d = vectors.shape
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        index.add(vectors)
+        return index, {"type": "hnsw", "M": hnsw_m, "efConstruction": ef_construction}
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or auto_nlist(n)
+        min_train = 39 * nlist if index_type == "ivf_flat" else 39 * max(nlist, 2 ** pq_nbits)
+        if n < min_train or nlist < 2:
+            logger.warning(f"{n} vectors are too few to train {index_type} (need {min_train}); using flat")
+            index_type = "flat"
+        else:
+            quantizer = faiss.IndexFlatIP(d)
+            if index_type == "ivf_flat":
+                index = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+                params = {"type": "ivf_flat", "nlist": nlist}
+            else:
+                if d % pq_m:
+                    raise ValueError(f"PQ m={pq_m} must divide dim={d}")
+                index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, pq_nbits, faiss.METRIC_INNER_PRODUCT)
+                params = {"type": "ivf_pq", "nlist": nlist, "pq_m": pq_m, "pq_nbits": pq_nbits}
+            rng = np.random.default_rng(seed)
+            sample = vectors if n <= train_sample else vectors[rng.choice(n, train_sample, replace=False)]
+            index.train(sample)
+            index.add(vectors)
+            params["train_sample"] = int(sample.shape[0])
+            return index, params
+
+    index = faiss.IndexFlatIP(d)
+    index.add(vectors)
+    return index, {"type": "flat"}
+
+
+def build_index_from_config(vectors: np.ndarray, index_type: Optional[str] = None) -> Tuple[faiss.Index, dict]:
+    from src.config import Config
+
+    return build_index(
+        vectors,
+        index_type or Config.INDEX_TYPE,
+        hnsw_m=Config.HNSW_M,
+        ef_construction=Config.HNSW_EF_CONSTRUCTION,
+        nlist=Config.IVF_NLIST,
+        pq_m=Config.PQ_M,
+        pq_nbits=Config.PQ_NBITS,
+        train_sample=Config.INDEX_TRAIN_SAMPLE,
+    )
+
+
+def apply_search_params(index: faiss.Index, ef_search: Optional[int] = None, nprobe: Optional[int] = None) -> dict:
+    """Set efSearch (HNSW) / nprobe (IVF) on a loaded index; returns what was applied."""
+    applied = {}
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = min(int(nprobe), ivf.nlist)
+        applied["nprobe"] = ivf.nprobe
+    real = faiss.downcast_index(index)
+    if hasattr(real, "hnsw") and ef_search:
+        real.hnsw.efSearch = int(ef_search)
+        applied["efSearch"] = real.hnsw.efSearch
+    return applied
@@ -0,0 +1,132 @@
+"""
+Compact, memory-mapped chunk store (chunks.bin) that replaces the texts array in meta.json.
+
+Layout (little-endian):
+    b"RAGCHNK1"                 magic
+    u32 header_len              + header JSON: {"count", "sources", "sha1"}
+    pad to 8 bytes
+    u64 offsets[count + 1]      byte offsets into the blob
+    u32 source_ids[count]       index into header["sources"] (0xFFFFFFFF = none)
+    pad to 8 bytes
+    blob                        all chunk texts, UTF-8, concatenated
+
+Opening the store parses only the small header; offsets/source ids are zero-copy views
+over the mmap and a text is decoded only when it is asked for.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b"RAGCHNK1"
+NO_SOURCE = 0xFFFFFFFF
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def write_chunk_store(path, texts: Sequence[str], sources: Optional[Sequence[str]] = None) -> str:
+    """Write `texts` (and optional per-chunk `sources`) to `path` atomically; returns the blob sha1."""
+    if sources is not None and len(sources) != len(texts):
+        raise ValueError(f"sources/texts length mismatch: {len(sources)} vs {len(texts)}")
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded], dtype="<u8")
+    blob = b"".join(encoded)
+
+    source_names: List[str] = []
+    source_ids = np.full(len(encoded), NO_SOURCE, dtype="<u4")
+    if sources is not None:
+        lookup = {}
+        for i, s in enumerate(sources):
+            if s is None:
+                continue
+            if s not in lookup:
+                lookup[s] = len(source_names)
+                source_names.append(s)
+            source_ids[i] = lookup[s]
+
+    sha1 = hashlib.sha1(blob).hexdigest()
+    header = json.dumps({"count": len(encoded), "sources": source_names, "sha1": sha1}, ensure_ascii=False).encode("utf-8")
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        head = MAGIC + struct.pack("<I", len(header)) + header
+        f.write(head + b"\0" * _pad8(len(head)))
+        f.write(offsets.tobytes())
+        f.write(source_ids.tobytes())
+        f.write(b"\0" * _pad8(source_ids.nbytes))
+        f.write(blob)
+    os.replace(tmp, path)
+    return sha1
+
+
+class ChunkStore:
+    """Read-only view over chunks.bin; `text(i)` / `source(i)` decode lazily from the mmap."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if mm[:8] != MAGIC:
+            mm.close()
+            raise ValueError(f"{self.path} is not a chunk store (bad magic)")
+        (hlen,) = struct.unpack_from("<I", mm, 8)
+        self.header = json.loads(mm[12 : 12 + hlen].decode("utf-8"))
+        self.count = int(self.header["count"])
+        self.sources: List[str] = self.header.get("sources") or []
+        self.sha1: str = self.header.get("sha1", "")
+
+        pos = 12 + hlen
+        pos += _pad8(pos)
+        self._offsets = np.frombuffer(mm, dtype="<u8", count=self.count + 1, offset=pos)
+        pos += self._offsets.nbytes
+        self._source_ids = np.frombuffer(mm, dtype="<u4", count=self.count, offset=pos)
+        pos += self._source_ids.nbytes
+        self._blob_start = pos + _pad8(self._source_ids.nbytes)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def text(self, i: int) -> str:
+        a = self._blob_start + int(self._offsets[i])
+        b = self._blob_start + int(self._offsets[i + 1])
+        return self._mm[a:b].decode("utf-8")
+
+    def source(self, i: int) -> Optional[str]:
+        sid = int(self._source_ids[i])
+        return None if sid == NO_SOURCE else self.sources[sid]
+
+    def close(self):
+        # drop numpy views first; an mmap with exported buffers cannot be closed
+        self._offsets = self._source_ids = None
+        self._mm.close()
+
+
+class ListChunkStore:
+    """Same interface over in-memory lists (legacy meta.json with inline texts)."""
+
+    def __init__(self, texts: List[str], sources: Optional[List[Optional[str]]] = None):
+        self._texts = texts
+        self._sources = sources
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def text(self, i: int) -> str:
+        return self._texts[i]
+
+    def source(self, i: int) -> Optional[str]:
+        return self._sources[i] if self._sources is not None else None
+
+    def close(self):
+        pass
@@ -0,0 +1,93 @@
+"""
+Index deltas: the difference between two index versions (removed ids + new vectors/chunks).
+
+Chunk ids are positions in chunks.bin and never reused: an incremental ingest appends the
+chunks of new/changed files at the end and removes the vectors of changed/deleted files
+from the (ID-mapped) FAISS index, leaving their text behind as unreachable tombstones.
+
+delta.npz holds remove_ids, add_ids, add_vecs, texts, sources and a JSON header with
+{base_version, version}; apply it with `apply_delta` on a copy of the base index.
+"""
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import faiss
+import numpy as np
+
+from src.index.chunk_store import write_chunk_store
+
+
+def to_id_mapped(index: faiss.Index) -> faiss.Index:
+    """Return an index that supports add_with_ids/remove_ids, keeping current ids (= positions)."""
+    if faiss.try_extract_index_ivf(index) is not None:
+        return index  # IVF stores ids natively
+    real = faiss.downcast_index(index)
+    if isinstance(real, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return index
+    if hasattr(real, "hnsw"):
+        raise ValueError("HNSW indexes cannot remove vectors; run a full ingest instead of --incremental")
+    if not isinstance(real, faiss.IndexFlat):
+        raise ValueError(f"Incremental updates are not supported for {type(real).__name__}")
+    mapped = faiss.IndexIDMap2(faiss.IndexFlatIP(index.d))
+    if index.ntotal:
+        mapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype="int64"))
+    return mapped
+
+
+def apply_delta(index: faiss.Index, delta: dict, copy: bool = True) -> faiss.Index:
+    """Remove + add the delta's vectors. With copy=True the given index is left untouched."""
+    target = faiss.clone_index(index) if copy else index
+    target = to_id_mapped(target)
+    remove_ids = np.asarray(delta["remove_ids"], dtype="int64")
+    if remove_ids.size:
+        target.remove_ids(remove_ids)
+    add_ids = np.asarray(delta["add_ids"], dtype="int64")
+    if add_ids.size:
+        target.add_with_ids(np.ascontiguousarray(delta["add_vecs"], dtype="float32"), add_ids)
+    return target
+
+
+def write_delta(path, *, base_version: str, version: str, remove_ids, add_ids, add_vecs,
+                texts: List[str], sources: List[Optional[str]]) -> str:
+    """Write delta.npz atomically; returns its sha1."""
+    header = json.dumps({"base_version": base_version, "version": version})
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        header=np.array(header),
+        remove_ids=np.asarray(remove_ids, dtype="int64"),
+        add_ids=np.asarray(add_ids, dtype="int64"),
+        add_vecs=np.asarray(add_vecs, dtype="float32"),
+        texts=np.array(texts, dtype=str),
+        sources=np.array([s or "" for s in sources], dtype=str),
+    )
+    data = buf.getvalue()
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return hashlib.sha1(data).hexdigest()
+
+
+def read_delta(path) -> dict:
+    with np.load(path, allow_pickle=False) as z:
+        header = json.loads(str(z["header"]))
+        return {
+            **header,
+            "remove_ids": z["remove_ids"],
+            "add_ids": z["add_ids"],
+            "add_vecs": z["add_vecs"],
+            "texts": [str(t) for t in z["texts"]],
+            "sources": [str(s) or None for s in z["sources"]],
+        }
+
+
+def extend_chunk_store(base, path, texts: List[str], sources: List[Optional[str]]) -> str:
+    """Write base chunks (tombstones included) + appended ones to `path`; returns the blob sha1."""
+    all_texts = [base.text(i) for i in range(len(base))] + list(texts)
+    all_sources = [base.source(i) for i in range(len(base))] + list(sources)
+    return write_chunk_store(path, all_texts, all_sources)
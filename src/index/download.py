@@ -0,0 +1,158 @@
+"""
+Verified, parallel download of index artifacts from GCS.
+
+`download_blob` fetches an object as `part_size` byte ranges, `workers` at a time, and
+consumes them in order: the bytes are hashed (CRC32C, or MD5 for objects without one)
+and written to `<dest>.part-*`, decompressed on the fly when the
+object is zstd (`.zst`). Only a file whose checksum matches is moved to `dest` with
+os.replace, so a download that dies halfway never leaves a truncated file behind that a
+later start would mistake for a complete index.
+
+Every range read is pinned to the generation the metadata came from
+(if_generation_match), so a publish in the middle of a download fails the download
+instead of stitching two versions together.
+"""
+import base64
+import hashlib
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+try:  # zstd artifacts are optional (requirements_runtime: zstandard)
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_PART_SIZE = 8 << 20
+ZSTD_SUFFIX = ".zst"
+
+
+class DownloadIntegrityError(Exception):
+    """Downloaded bytes do not match the object's CRC32C / MD5 metadata."""
+
+
+def _crc32c_table():
+    table = []
+    for i in range(256):
+        c = i
+        for _ in range(8):
+            c = (c >> 1) ^ 0x82F63B78 if c & 1 else c >> 1
+        table.append(c)
+    return table
+
+
+class _PyCrc32c:
+    """Pure-python CRC32C (Castagnoli); only used when google-crc32c is missing (slow)."""
+
+    _table = None
+
+    def __init__(self):
+        if _PyCrc32c._table is None:
+            _PyCrc32c._table = _crc32c_table()
+        self._crc = 0xFFFFFFFF
+
+    def update(self, data: bytes):
+        crc, table = self._crc, self._table
+        for b in data:
+            crc = table[(crc ^ b) & 0xFF] ^ (crc >> 8)
+        self._crc = crc
+
+    def digest(self) -> bytes:
+        return (self._crc ^ 0xFFFFFFFF).to_bytes(4, "big")
+
+
+def crc32c():
+    """Incremental CRC32C with .update(bytes) / .digest() (4 bytes, big-endian like GCS)."""
+    try:
+        import google_crc32c  # installed with google-cloud-storage; C implementation
+
+        return google_crc32c.Checksum()
+    except ImportError:
+        return _PyCrc32c()
+
+
+def expected_checksums(blob) -> Dict[str, bytes]:
+    """{"crc32c": ..., "md5": ...} from object metadata (composite objects have no MD5)."""
+    out = {}
+    if getattr(blob, "crc32c", None):
+        out["crc32c"] = base64.b64decode(blob.crc32c)
+    if getattr(blob, "md5_hash", None):
+        out["md5"] = base64.b64decode(blob.md5_hash)
+    return out
+
+
+def _fetch(blob, start: int, end: int, generation) -> bytes:
+    # raw: never let the client gunzip; checksum=None: a range can't be checked against the whole-object hash
+    kwargs = {"if_generation_match": generation} if generation else {}
+    return blob.download_as_bytes(start=start, end=end, raw_download=True, checksum=None, **kwargs)
+
+
+def download_blob(blob, dest, *, part_size: int = DEFAULT_PART_SIZE, workers: int = 4,
+                  decompress: Optional[bool] = None, verify: bool = True) -> dict:
+    """
+    Download `blob` (metadata already loaded, e.g. by bucket.get_blob) to `dest` atomically.
+    `decompress` defaults to True for names ending in .zst. Returns {"bytes", "written", "parts", "verified"}.
+    """
+    if getattr(blob, "size", None) is None:
+        blob.reload()
+    size = int(blob.size)
+    decompress = blob.name.endswith(ZSTD_SUFFIX) if decompress is None else decompress
+    if decompress and zstandard is None:
+        raise RuntimeError(f"{blob.name} is zstd-compressed but the zstandard package is not installed")
+    expected = expected_checksums(blob) if verify else {}
+    hashers = {}
+    if "crc32c" in expected:
+        hashers["crc32c"] = crc32c()
+    elif "md5" in expected:  # MD5 only when there is no CRC32C: one pass over the bytes is enough
+        hashers["md5"] = hashlib.md5()
+
+    part_size = max(1, int(part_size))
+    ranges = [(a, min(a + part_size, size) - 1) for a in range(0, size, part_size)]
+    dest = os.fspath(dest)
+    tmp = f"{dest}.part-{os.getpid()}-{threading.get_ident()}"
+    written = 0
+    try:
+        decomp = zstandard.ZstdDecompressor().decompressobj() if decompress else None
+        with open(tmp, "wb") as f, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            todo, inflight = iter(ranges), deque()
+
+            def submit_next():
+                r = next(todo, None)
+                if r is not None:
+                    inflight.append(pool.submit(_fetch, blob, r[0], r[1], blob.generation))
+
+            for _ in range(max(1, workers)):  # at most `workers` parts buffered in memory
+                submit_next()
+            while inflight:
+                data = inflight.popleft().result()
+                submit_next()
+                for h in hashers.values():
+                    h.update(data)
+                out = decomp.decompress(data) if decomp is not None else data
+                f.write(out)
+                written += len(out)
+            f.flush()
+            os.fsync(f.fileno())
+        for kind, h in hashers.items():
+            if h.digest() != expected[kind]:
+                raise DownloadIntegrityError(f"{blob.name}: {kind} mismatch (got {h.digest().hex()}, "
+                                             f"object metadata says {expected[kind].hex()})")
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return {"bytes": size, "written": written, "parts": len(ranges), "verified": sorted(hashers)}
+
+
+def resolve_artifact(bucket, object_name: str):
+    """The blob for `object_name`, preferring a published `<name>.zst` when zstandard is available."""
+    if zstandard is not None:
+        blob = bucket.get_blob(object_name + ZSTD_SUFFIX)
+        if blob is not None:
+            return blob
+    return bucket.get_blob(object_name)
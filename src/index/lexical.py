@@ -0,0 +1,197 @@
+"""
+Compact, memory-mapped BM25 index (lexical.bin) built at ingest time next to faiss.index.
+
+Layout (little-endian):
+    b"RAGLEX01"                 magic
+    u32 header_len              + header JSON: {"n_docs", "n_terms", "n_postings", "k1", "b", "avgdl",
+                                                "tokenizer", "sha1"}
+    pad to 8 bytes
+    u64 term_hashes[n_terms]    sorted 64-bit hashes of the vocabulary
+    u64 offsets[n_terms + 1]    postings range per term
+    i32 doc_ids[n_postings]     chunk ids (same ids as faiss.index / chunks.bin)
+    f32 weights[n_postings]     precomputed BM25 impact: idf * tf*(k1+1) / (tf + k1*(1-b+b*dl/avgdl))
+
+A query is a binary search per token over the mmap'd hash array plus a sum of the
+matching postings: no per-query parsing of the vocabulary, no scoring of non-matches.
+"""
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"RAGLEX01"
+TOKENIZER = "fold-stop-v1"
+LEXICAL_FILE = "lexical.bin"
+
+# function words of the languages _guess_lang distinguishes (en/pt/nl), accent-folded
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have he her his how i if in into is
+it its me my no not of on or our she so than that the their them then there these they this to was we were
+what when where which who why will with would you your about also
+o os as um uma uns umas de da do das dos em no na nos nas por para pelo pela com sem se que e ou mas como
+mais muito ja eu voce ele ela eles elas seu sua seus suas meu minha ao aos ate sobre qual quais quando onde
+porque por que nao sim foi ser ter tem esta este isso isto essa esse
+de het een en van in op te dat die is zijn was voor met als aan er maar om ook dan bij of uit nog wel
+naar hoe wat wie waar wanneer welke je jij ik hij zij ze we wij u mijn haar hun niet geen over heeft hebben
+""".split())
+
+_WORD = re.compile(r"\w+(?:[.+#\-]\w+)*[+#]*")
+
+
+def _fold(text: str) -> str:
+    """NFKD + drop combining marks + casefold: "Você" / "voce", "Análise" / "analise" match."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-folded word tokens minus en/pt/nl stopwords; "ci-cd" also yields "ci" and "cd"."""
+    out = []
+    for tok in _WORD.findall(_fold(text)):
+        parts = re.split(r"[.\-]", tok) if ("." in tok or "-" in tok) else []
+        for t in [tok, *parts]:
+            if t and t not in STOPWORDS and not (len(t) == 1 and t.isalpha()):
+                out.append(t)
+    return out
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def write_lexical_index(path, docs: Iterable[Tuple[int, str]], n_docs: int, k1: float = 1.2, b: float = 0.75) -> str:
+    """
+    Build lexical.bin from (chunk id, text) pairs; ids not listed (tombstones) never match.
+    `n_docs` is the chunk id space (chunk store count). Returns the content sha1.
+    """
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    doc_len: Dict[int, int] = {}
+    for doc_id, text in docs:
+        counts = Counter(tokenize(text))
+        doc_len[doc_id] = sum(counts.values())
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+    live = len(doc_len)
+    avgdl = (sum(doc_len.values()) / live) if live else 0.0
+
+    hashed = sorted((term_hash(t), t) for t in postings)
+    hashes = np.array([h for h, _ in hashed], dtype="<u8")
+    if len(hashes) > 1 and np.any(hashes[1:] == hashes[:-1]):
+        raise ValueError("64-bit term hash collision in the vocabulary")  # ~3e-8 for 1M terms
+    offsets = np.zeros(len(hashed) + 1, dtype="<u8")
+    ids_parts, w_parts = [], []
+    for i, (_, term) in enumerate(hashed):
+        plist = postings[term]
+        df = len(plist)
+        idf = math.log(1.0 + (live - df + 0.5) / (df + 0.5))
+        ids = np.array([d for d, _ in plist], dtype="<i4")
+        tf = np.array([t for _, t in plist], dtype="float32")
+        dl = np.array([doc_len[d] for d in ids], dtype="float32")
+        norm = k1 * (1.0 - b + b * dl / (avgdl or 1.0))
+        ids_parts.append(ids)
+        w_parts.append((idf * tf * (k1 + 1.0) / (tf + norm)).astype("<f4"))
+        offsets[i + 1] = offsets[i] + df
+    doc_ids = np.concatenate(ids_parts) if ids_parts else np.zeros(0, dtype="<i4")
+    weights = np.concatenate(w_parts) if w_parts else np.zeros(0, dtype="<f4")
+
+    body = hashes.tobytes() + offsets.tobytes() + doc_ids.tobytes() + weights.tobytes()
+    sha1 = hashlib.sha1(body).hexdigest()
+    header = json.dumps({
+        "n_docs": int(n_docs), "n_terms": len(hashes), "n_postings": int(doc_ids.size),
+        "k1": k1, "b": b, "avgdl": avgdl, "tokenizer": TOKENIZER, "sha1": sha1,
+    }).encode("utf-8")
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        head = MAGIC + struct.pack("<I", len(header)) + header
+        f.write(head + b"\0" * _pad8(len(head)))
+        f.write(body)
+    os.replace(tmp, path)
+    return sha1
+
+
+def lexical_manifest_entry(sha1: str, file: str = LEXICAL_FILE) -> dict:
+    return {"file": file, "sha1": sha1, "tokenizer": TOKENIZER}
+
+
+class LexicalIndex:
+    """Read-only BM25 view over lexical.bin; `search` touches only the postings of query terms."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if mm[:8] != MAGIC:
+            mm.close()
+            raise ValueError(f"{self.path} is not a lexical index (bad magic)")
+        (hlen,) = struct.unpack_from("<I", mm, 8)
+        self.header = json.loads(mm[12 : 12 + hlen].decode("utf-8"))
+        self.n_docs = int(self.header["n_docs"])
+        self.sha1: str = self.header.get("sha1", "")
+        n_terms, n_post = int(self.header["n_terms"]), int(self.header["n_postings"])
+
+        pos = 12 + hlen
+        pos += _pad8(pos)
+        self._hashes = np.frombuffer(mm, dtype="<u8", count=n_terms, offset=pos)
+        pos += self._hashes.nbytes
+        self._offsets = np.frombuffer(mm, dtype="<u8", count=n_terms + 1, offset=pos)
+        pos += self._offsets.nbytes
+        self._doc_ids = np.frombuffer(mm, dtype="<i4", count=n_post, offset=pos)
+        pos += self._doc_ids.nbytes
+        self._weights = np.frombuffer(mm, dtype="<f4", count=n_post, offset=pos)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(chunk ids, BM25 scores) of the top-k matches, best first; empty when nothing matches."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        ids_parts, w_parts = [], []
+        for term in terms:
+            h = np.uint64(term_hash(term))
+            i = int(np.searchsorted(self._hashes, h))
+            if i < len(self._hashes) and self._hashes[i] == h:
+                a, b = int(self._offsets[i]), int(self._offsets[i + 1])
+                ids_parts.append(self._doc_ids[a:b])
+                w_parts.append(self._weights[a:b])
+        if not ids_parts:
+            return np.zeros(0, dtype="int64"), np.zeros(0, dtype="float32")
+        ids = np.concatenate(ids_parts)
+        uniq, inv = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inv, weights=np.concatenate(w_parts)).astype("float32")
+        if len(uniq) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(uniq))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return uniq[top].astype("int64"), scores[top]
+
+    def close(self):
+        self._hashes = self._offsets = self._doc_ids = self._weights = None
+        self._mm.close()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60, limit: int = 5) -> List[int]:
+    """Merge ranked id lists by sum(1 / (k + rank)); ties keep the order of the first ranking."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            if doc_id < 0:
+                continue
+            scores[int(doc_id)] = scores.get(int(doc_id), 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda d: -scores[d])[:limit]
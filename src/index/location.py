@@ -0,0 +1,109 @@
+"""
+The on-disk index directory, shared by every API worker process on the host.
+
+app.py downloads into it and rag.py loads from it; both resolve it from INDEX_DIR
+(Config.INDEX_DIR), so there is one location. With several uvicorn/gunicorn workers, the
+first one to need the index downloads it while holding an exclusive lock on `<dir>/.lock`
+(fcntl.flock, which also serializes threads of one process); the others block on the lock
+and then load the files that are already there. `<dir>/.generation` records the GCS
+generation of the files, so a worker neither re-downloads an index a sibling already
+fetched nor mistakes it for an outdated one on its next reload check.
+
+Workers share RAM through the page cache: chunks.bin and lexical.bin are always mmapped,
+and the FAISS index is read with IO_FLAG_MMAP (see `read_index`).
+"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: fall back to a per-process lock
+    fcntl = None
+
+LOCK_FILE = ".lock"
+GENERATION_FILE = ".generation"
+
+_process_lock = threading.Lock()
+
+
+class IndexLocation:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "faiss.index"
+
+    @property
+    def meta_path(self) -> Path:
+        return self.root / "meta.json"
+
+    def is_complete(self) -> bool:
+        # meta.json is written last by every download, so both present = a whole index
+        return self.index_path.exists() and self.meta_path.exists()
+
+    @contextmanager
+    def lock(self):
+        """Exclusive across processes (and threads) on this host while the block runs."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            with _process_lock:
+                yield
+            return
+        with open(self.root / LOCK_FILE, "a+") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def generation(self) -> Optional[int]:
+        """GCS generation of the files in the directory (None: unknown, e.g. copied in by hand)."""
+        try:
+            return int((self.root / GENERATION_FILE).read_text().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set_generation(self, generation: Optional[int]):
+        path = self.root / GENERATION_FILE
+        if generation is None:
+            path.unlink(missing_ok=True)
+            return
+        tmp = path.with_name(f"{GENERATION_FILE}.{os.getpid()}")
+        tmp.write_text(str(generation))
+        os.replace(tmp, path)
+
+    def ensure(self, download: Callable[[str], Optional[int]]) -> bool:
+        """
+        Make sure a complete index is present, calling download(dir) -> generation under the
+        lock when it isn't. Returns True when this call downloaded it.
+        """
+        if self.is_complete():
+            return False
+        with self.lock():
+            if self.is_complete():  # a sibling worker finished while we waited
+                return False
+            self.set_generation(download(str(self.root)))
+            return True
+
+
+def read_index(path, mmap: bool = True):
+    """
+    faiss.read_index, memory-mapping what FAISS can map: with IO_FLAG_MMAP the inverted lists
+    of IVF indexes stay in the page cache (shared by all workers) instead of each process's
+    heap. FAISS 1.8 still copies flat and HNSW storage into memory with or without the flag.
+    """
+    import faiss
+
+    return faiss.read_index(str(path), faiss.IO_FLAG_MMAP if mmap else 0)
+
+
+def is_mmapped(index) -> bool:
+    """True when the index's inverted lists live in a mapped file (such an index can't be cloned)."""
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    return ivf is not None and isinstance(faiss.downcast_InvertedLists(ivf.invlists), faiss.OnDiskInvertedLists)
@@ -0,0 +1,152 @@
+"""
+Versioned index manifest (meta.json) shared by both ingest scripts and the serving side.
+
+    {
+      "format_version": 1,
+      "embedder":   {"provider", "model", "dim", "normalized"},
+      "metric":     "cosine",
+      "index":      {"file", "type", "ntotal", "params"},
+      "chunking":   {"unit": "chars" | "words", "size", "overlap"},
+      "chunk_store": {"file", "count", "sha1"},
+      "files":      [{"path", "sha1", "chunks": [start, end)}],   # chunk id range per source
+      "lexical":    {"file", "sha1", "tokenizer"},                 # BM25 side of hybrid search (optional)
+      "delta":      {"file", "sha1", "base_version"},              # only after --incremental
+      "content_hash": "...",                                       # = index version
+      "created_at": "..."
+    }
+
+After incremental ingests the chunk store also keeps tombstoned chunks of changed/deleted
+files, so chunk_store.count (ids ever allocated) can exceed index.ntotal (live vectors).
+
+`load_manifest` also upgrades the two pre-manifest layouts (ingest.py list of
+{source, text}; ingest_mistral.py dict with "texts") so older indexes keep working.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+FORMAT_VERSION = 1
+SUPPORTED_METRICS = {"cosine"}
+
+
+class IndexManifestError(ValueError):
+    """The index on disk does not match its manifest or the query-side embedder."""
+
+
+def file_sha1(path, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(bufsize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def build_manifest(*, provider: str, model: str, dim: int, index_type: str, ntotal: int,
+                   chunk_unit: str, chunk_size: int, chunk_overlap: int,
+                   chunk_store_sha1: str, files: List[dict], index_sha1: str,
+                   index_file: str = "faiss.index", chunk_store_file: str = "chunks.bin",
+                   index_params: Optional[dict] = None, chunk_count: Optional[int] = None,
+                   lexical: Optional[dict] = None) -> dict:
+    content_hash = hashlib.sha1(f"{index_sha1}:{chunk_store_sha1}:{model}:{dim}".encode("utf-8")).hexdigest()
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "embedder": {"provider": provider, "model": model, "dim": int(dim), "normalized": True},
+        "metric": "cosine",
+        "index": {"file": index_file, "type": index_type, "ntotal": int(ntotal),
+                  "params": {k: v for k, v in (index_params or {}).items() if k != "type"}},
+        "chunking": {"unit": chunk_unit, "size": int(chunk_size), "overlap": int(chunk_overlap)},
+        "chunk_store": {"file": chunk_store_file, "count": int(ntotal if chunk_count is None else chunk_count),
+                        "sha1": chunk_store_sha1},
+        "files": files,
+        "content_hash": content_hash,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    if lexical:
+        manifest["lexical"] = lexical
+    return manifest
+
+
+def live_chunk_ids(manifest: dict) -> List[int]:
+    """Chunk ids that still have a vector (the per-file ranges; tombstones are not listed)."""
+    return [i for f in manifest.get("files") or [] for i in range(*f["chunks"])]
+
+
+def write_manifest(path, manifest: dict):
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_manifest(path) -> dict:
+    """Read meta.json; legacy layouts come back as format_version 0 with inline "texts"/"sources"."""
+    raw = Path(path).read_bytes()
+    meta = json.loads(raw)
+    legacy_hash = hashlib.sha1(raw).hexdigest()
+    if isinstance(meta, list):  # ingest.py before manifests: [{source, text}, ...]
+        return {
+            "format_version": 0,
+            "embedder": {"provider": "unknown", "model": None, "dim": None},
+            "metric": "cosine",
+            "texts": [m["text"] for m in meta],
+            "sources": [m.get("source") for m in meta],
+            "content_hash": legacy_hash,
+        }
+    if "format_version" not in meta:  # ingest_mistral.py before manifests
+        return {
+            "format_version": 0,
+            "embedder": {"provider": "mistral", "model": meta.get("model"), "dim": meta.get("dim")},
+            "metric": meta.get("metric", "cosine"),
+            "texts": meta.get("texts", []),
+            "sources": None,
+            "chunk_store": {"file": meta["chunk_store"], "count": meta.get("count"), "sha1": meta.get("chunks_sha1")}
+            if meta.get("chunk_store") else None,
+            "content_hash": legacy_hash,
+        }
+    if meta["format_version"] > FORMAT_VERSION:
+        raise IndexManifestError(
+            f"meta.json format_version {meta['format_version']} is newer than supported ({FORMAT_VERSION})"
+        )
+    return meta
+
+
+def validate_manifest(manifest: dict, index, chunk_count: int, chunk_sha1: Optional[str],
+                      query_model: Optional[str] = None, lexical=None, query_dim: Optional[int] = None):
+    """Fail fast when index, chunk store (and lexical index) and manifest disagree, or the query embedder differs."""
+    emb = manifest.get("embedder") or {}
+    dim = emb.get("dim")
+    if dim is not None and int(dim) != index.d:
+        raise IndexManifestError(f"index dim {index.d} != manifest embedder dim {dim}")
+    live = (manifest.get("index") or {}).get("ntotal")
+    stored = (manifest.get("chunk_store") or {}).get("count")
+    if live is None or stored is None:
+        if index.ntotal != chunk_count:
+            raise IndexManifestError(f"index has {index.ntotal} vectors but {chunk_count} chunks")
+    else:
+        if index.ntotal != live:
+            raise IndexManifestError(f"index has {index.ntotal} vectors but manifest says {live}")
+        if chunk_count != stored:
+            raise IndexManifestError(f"chunk store has {chunk_count} chunks but manifest says {stored}")
+    metric = manifest.get("metric", "cosine")
+    if metric not in SUPPORTED_METRICS:
+        raise IndexManifestError(f"unsupported metric {metric!r}")
+    store = manifest.get("chunk_store") or {}
+    if store.get("sha1") and chunk_sha1 and store["sha1"] != chunk_sha1:
+        raise IndexManifestError("chunk store content hash does not match manifest")
+    lex = manifest.get("lexical") or {}
+    if lexical is not None:
+        if len(lexical) != chunk_count:
+            raise IndexManifestError(f"lexical index covers {len(lexical)} chunk ids but the store has {chunk_count}")
+        if lex.get("sha1") and lexical.sha1 != lex["sha1"]:
+            raise IndexManifestError("lexical index content hash does not match manifest")
+    if query_dim is not None and int(query_dim) != index.d:
+        raise IndexManifestError(f"query embedder dim {query_dim} != index dim {index.d}")
+    model = emb.get("model")
+    if query_model and model and model != query_model:
+        raise IndexManifestError(
+            f"index was embedded with {model!r} but queries use {query_model!r}; re-ingest or switch embedder"
+        )
@@ -0,0 +1,248 @@
+"""
+Second retrieval stage: reorder an over-fetched candidate list before it reaches the prompt.
+
+First-stage retrieval (dense, or dense + BM25 fused with RRF) returns RERANK_CANDIDATES ids;
+`Reranker.rerank` then
+
+  1. drops candidates whose dense cosine is below DENSE_MIN_SCORE,
+  2. scores (question, chunk) pairs with a small CPU cross-encoder, when one is configured
+     and the request's latency budget still has room for it, dropping those below
+     RERANK_MIN_SCORE,
+  3. picks TOP_K with maximal marginal relevance (MMR_LAMBDA < 1), so overlapping windows
+     of the same passage don't fill the context with near-duplicates.
+
+Similarity between candidates uses their vectors (reconstructed from the index) and falls
+back to word-set Jaccard over the texts for indexes that can't reconstruct (IVF without a
+direct map) or when MMR_SIMILARITY=text.
+
+Cross-encoders (RERANKER):
+
+    off                    no cross-encoder (MMR / thresholds only)
+    onnx                   export of RERANK_MODEL by export_onnx.py --cross-encoder, on CPU
+    sentence-transformers  RERANK_MODEL via sentence_transformers.CrossEncoder (pulls in torch)
+
+Both return relevance probabilities in [0, 1] (sigmoid of the model's logit).
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+CROSS_ENCODERS = ("off", "onnx", "sentence-transformers")
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.asarray(x, dtype="float64")))
+
+
+def mmr(relevance: np.ndarray, similarity: np.ndarray, k: int, lam: float) -> List[int]:
+    """Greedy maximal marginal relevance: positions of `k` picks, best first."""
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    picked = [int(np.argmax(relevance))]
+    max_sim = similarity[picked[0]].astype("float64").copy()  # similarity to the closest pick so far
+    left = np.ones(n, dtype=bool)
+    left[picked[0]] = False
+    while len(picked) < min(k, n):
+        gain = lam * relevance - (1.0 - lam) * max_sim
+        gain[~left] = -np.inf
+        best = int(np.argmax(gain))
+        picked.append(best)
+        left[best] = False
+        np.maximum(max_sim, similarity[best], out=max_sim)
+    return picked
+
+
+def text_similarity(texts: Sequence[str]) -> np.ndarray:
+    """Pairwise Jaccard of lower-cased word sets (overlapping chunks of one passage score high)."""
+    vocab = {}
+    rows = [[vocab.setdefault(w, len(vocab)) for w in set(_WORD.findall(t.lower()))] for t in texts]
+    onehot = np.zeros((len(texts), max(len(vocab), 1)), dtype="float32")
+    for i, cols in enumerate(rows):
+        onehot[i, cols] = 1.0
+    inter = onehot @ onehot.T
+    sizes = onehot.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - inter
+    sim = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+    np.fill_diagonal(sim, 1.0)
+    return sim
+
+
+def candidate_vectors(index, ids: Sequence[int]) -> Optional[np.ndarray]:
+    """Stored vectors of `ids` (None when the index can't reconstruct, e.g. IVF without a direct map)."""
+    if not len(ids):
+        return None
+    try:
+        return np.asarray(index.reconstruct_batch(np.asarray(ids, dtype="int64")), dtype="float32")
+    except RuntimeError:
+        return None
+
+
+class OnnxCrossEncoder:
+    """
+    Cross-encoder exported by export_onnx.py --cross-encoder: reranker.json (model, onnx
+    file, max_length, pad token), tokenizer.json and the .onnx file, run on CPU.
+    """
+
+    provider = "onnx"
+
+    def __init__(self, model_dir, threads: int = 0):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                f"RERANKER=onnx needs onnxruntime and tokenizers (pip install onnxruntime tokenizers): {e}"
+            ) from e
+        model_dir = Path(model_dir)
+        info = json.loads((model_dir / "reranker.json").read_text(encoding="utf-8"))
+        self.model = info["model"]
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(str(model_dir / info["file"]), opts, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=int(info.get("max_length", 256)))
+        self._tokenizer.enable_padding(pad_id=int(info.get("pad_id", 0)), pad_token=info.get("pad_token", "[PAD]"))
+        self._lock = threading.Lock()  # one run at a time: a run already uses every intra-op thread
+
+    def score_sync(self, question: str, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros(0, dtype="float32")
+        enc = self._tokenizer.encode_batch([(question, t) for t in texts])
+        feeds = {
+            "input_ids": np.array([e.ids for e in enc], dtype="int64"),
+            "attention_mask": np.array([e.attention_mask for e in enc], dtype="int64"),
+        }
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in enc], dtype="int64")
+        with self._lock:
+            logits = self._session.run(None, feeds)[0]
+        return _sigmoid(logits.reshape(len(texts), -1)[:, 0]).astype("float32")
+
+    async def score(self, question: str, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.score_sync, question, list(texts))
+
+
+class SentenceTransformerCrossEncoder:
+    """RERANK_MODEL in PyTorch; heavy, but handy to check an ONNX export against."""
+
+    provider = "sentence-transformers"
+
+    def __init__(self, model: str):
+        from sentence_transformers import CrossEncoder
+
+        self._ce = CrossEncoder(model, device="cpu")
+        self.model = model
+
+    def score_sync(self, question: str, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros(0, dtype="float32")
+        logits = self._ce.predict([(question, t) for t in texts], activation_fct=lambda x: x)
+        return _sigmoid(np.asarray(logits).reshape(len(texts), -1)[:, 0]).astype("float32")
+
+    async def score(self, question: str, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.score_sync, question, list(texts))
+
+
+def make_cross_encoder(kind: str, *, model_dir: Optional[str] = None, model: Optional[str] = None,
+                       threads: int = 0):
+    """Cross-encoder backend by name; None for "off"."""
+    if kind == "off":
+        return None
+    if kind == "onnx":
+        return OnnxCrossEncoder(model_dir, threads=threads)
+    if kind == "sentence-transformers":
+        return SentenceTransformerCrossEncoder(model)
+    raise ValueError(f"unknown RERANKER {kind!r}; expected one of {CROSS_ENCODERS}")
+
+
+class Reranker:
+    """
+    Thresholds + cross-encoder + MMR over first-stage candidates (see module docstring).
+
+    `budget_ms` is a per-request deadline for retrieval as a whole: the cross-encoder only
+    runs when the time already spent plus its recent cost (EWMA) still fits, so a slow
+    embedding or search degrades to MMR order instead of a slow answer.
+    """
+
+    def __init__(self, cross_encoder=None, *, mmr_lambda: float = 0.7, min_dense: float = 0.0,
+                 min_cross: float = 0.0, budget_ms: float = 250.0):
+        self.cross_encoder = cross_encoder
+        self.mmr_lambda, self.min_dense, self.min_cross = mmr_lambda, min_dense, min_cross
+        self.budget_s = budget_ms / 1000
+        self.cost_s: Optional[float] = None  # EWMA of cross-encoder latency
+        self.counts = {"cross_encoder": 0, "skipped_budget": 0, "thresholded": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return (self.cross_encoder is not None or self.mmr_lambda < 1.0
+                or self.min_dense > 0.0 or self.min_cross > 0.0)
+
+    def has_time(self, started: Optional[float]) -> bool:
+        if started is None or self.cost_s is None:
+            return True
+        return time.perf_counter() - started + self.cost_s <= self.budget_s
+
+    async def rerank(self, question: str, texts: List[str], relevance: np.ndarray, k: int, *,
+                     dense: Optional[np.ndarray] = None, vectors: Optional[np.ndarray] = None,
+                     started: Optional[float] = None) -> List[int]:
+        """
+        Positions (into `texts`) of the chunks to keep, best first, at most `k`.
+        `relevance` is the first-stage score (higher = better; e.g. RRF or cosine), `dense`
+        each candidate's cosine to the query for DENSE_MIN_SCORE (NaN when unknown), and
+        `started` the request's perf_counter() start for the latency budget.
+        """
+        keep = np.arange(len(texts))
+        relevance = np.asarray(relevance, dtype="float64")
+        if self.min_dense > 0.0 and dense is not None:
+            keep = keep[~(np.asarray(dense)[keep] < self.min_dense)]  # NaN (unknown) is kept
+        relevance = relevance[keep]
+
+        if self.cross_encoder is not None and len(keep):
+            if self.has_time(started):
+                t0 = time.perf_counter()
+                relevance = np.asarray(await self.cross_encoder.score(question, [texts[i] for i in keep]), dtype="float64")
+                cost = time.perf_counter() - t0
+                self.cost_s = cost if self.cost_s is None else 0.8 * self.cost_s + 0.2 * cost
+                self.counts["cross_encoder"] += 1
+                if self.min_cross > 0.0:
+                    ok = relevance >= self.min_cross
+                    keep, relevance = keep[ok], relevance[ok]
+            else:
+                self.counts["skipped_budget"] += 1
+        if len(keep) < len(texts):
+            self.counts["thresholded"] += 1
+
+        if self.mmr_lambda >= 1.0 or len(keep) <= 1:
+            order = np.argsort(-relevance, kind="stable")[:k]
+        else:
+            if vectors is not None:
+                sub = vectors[keep]
+                sim = sub @ sub.T
+            else:
+                sim = text_similarity([texts[i] for i in keep])
+            order = mmr(relevance, sim, k, self.mmr_lambda)
+        return [int(keep[i]) for i in order]
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            "provider": getattr(self.cross_encoder, "provider", None),
+            "model": getattr(self.cross_encoder, "model", None),
+            "cost_ms": round(self.cost_s * 1000, 1) if self.cost_s is not None else None,
+            "mmr_lambda": self.mmr_lambda,
+            "budget_ms": self.budget_s * 1000,
+        }
@@ -0,0 +1,131 @@
+"""
+Many portfolios per process: one index per tenant, kept resident within a byte budget.
+
+A tenant's index lives under `<INDEX_DIR>/tenants/<tenant>/` (same files as the default
+index, plus an optional persona.json) and, with INDEX_GCS_URI, under
+`<prefix>/<TENANT_GCS_PREFIX>/<tenant>/` in the bucket; app.py downloads it there on first
+use. `TenantIndexCache` holds the loaded index states (rag's load_index_state) in LRU
+order and evicts the least recently used ones once their on-disk size passes
+TENANT_INDEX_BUDGET_MB. Requests for the same cold tenant share one load. With GCS, the
+index poller (app.refresh_tenant_indexes) re-downloads a tenant whose meta.json changed
+and evicts its loaded state, so the next request loads the new version.
+
+The size is that of the files: a ceiling on what the tenant can keep in RAM, whether it
+is read in (FAISS without mmap) or paged in through an mmap (chunks.bin, lexical.bin).
+An evicted state is dropped, not closed: requests still using it keep it alive.
+"""
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from src.observability.metrics import TENANT_EVICTIONS, TENANT_INDEX, TENANT_LOAD_SECONDS
+
+TENANT_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+ARTIFACTS = ("faiss.index", "chunks.bin", "lexical.bin", "meta.json")
+
+
+class UnknownTenant(LookupError):
+    pass
+
+
+def validate_tenant(tenant: str) -> str:
+    """The tenant id, if it is safe as a directory / object name (lowercase, digits, - and _)."""
+    if not isinstance(tenant, str) or not TENANT_ID.match(tenant):
+        raise ValueError(f"invalid tenant id {tenant!r}: use 1-64 of a-z, 0-9, '-' and '_'")
+    return tenant
+
+
+def tenant_dir(root, tenant: str) -> Path:
+    return Path(root) / "tenants" / validate_tenant(tenant)
+
+
+def index_bytes(index_dir) -> int:
+    """On-disk size of an index directory's artifacts."""
+    return sum((Path(index_dir) / name).stat().st_size for name in ARTIFACTS if (Path(index_dir) / name).exists())
+
+
+class TenantIndexCache:
+    """
+    tenant -> loaded index state, LRU within `budget_bytes` (state["bytes"] each).
+
+    `load(tenant)` runs in a worker thread and returns the state (raising UnknownTenant
+    when there is no such index). The most recently loaded tenant always stays, even when
+    it alone is over the budget.
+    """
+
+    def __init__(self, budget_bytes: int, load: Callable[[str], dict]):
+        self.budget_bytes = int(budget_bytes)
+        self.load = load
+        self._states: "OrderedDict[str, dict]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.resident_bytes = 0
+        self.peak_bytes = 0
+        self.counts = {"hits": 0, "misses": 0, "evictions": 0, "errors": 0}
+
+    async def get(self, tenant: str) -> dict:
+        state = self._states.get(tenant)
+        if state is not None:
+            self._states.move_to_end(tenant)
+            self.counts["hits"] += 1
+            TENANT_INDEX.inc(outcome="hit")
+            return state
+        task = self._loading.get(tenant)
+        if task is None:
+            self.counts["misses"] += 1
+            TENANT_INDEX.inc(outcome="miss")
+            task = asyncio.ensure_future(self._load(tenant))
+            self._loading[tenant] = task
+        # shielded: a cancelled request doesn't cancel a load other requests are waiting for
+        return await asyncio.shield(task)
+
+    async def _load(self, tenant: str) -> dict:
+        t0 = time.perf_counter()
+        try:
+            state = await asyncio.to_thread(self.load, tenant)
+        except Exception:
+            self.counts["errors"] += 1
+            TENANT_INDEX.inc(outcome="error")
+            raise
+        finally:
+            self._loading.pop(tenant, None)
+        TENANT_LOAD_SECONDS.observe(time.perf_counter() - t0)
+        self._admit(tenant, state)
+        return state
+
+    def _admit(self, tenant: str, state: dict):
+        self._states[tenant] = state
+        self.resident_bytes += state.get("bytes", 0)
+        while self.resident_bytes > self.budget_bytes and len(self._states) > 1:
+            _, evicted = self._states.popitem(last=False)
+            self.resident_bytes -= evicted.get("bytes", 0)
+            self.counts["evictions"] += 1
+            TENANT_EVICTIONS.inc()
+        self.peak_bytes = max(self.peak_bytes, self.resident_bytes)
+
+    def peek(self, tenant: str) -> Optional[dict]:
+        """The loaded state, if resident (not counted as a use)."""
+        return self._states.get(tenant)
+
+    def evict(self, tenant: str) -> bool:
+        """Drop a tenant (its index was republished: app.refresh_tenant_indexes); the next request loads it again."""
+        state = self._states.pop(tenant, None)
+        if state is not None:
+            self.resident_bytes -= state.get("bytes", 0)
+        return state is not None
+
+    def resident(self) -> Dict[str, int]:
+        """tenant -> bytes, least recently used first."""
+        return {t: s.get("bytes", 0) for t, s in self._states.items()}
+
+    def stats(self) -> dict:
+        return {"tenants": len(self._states), "resident_bytes": self.resident_bytes, "peak_bytes": self.peak_bytes,
+                "budget_bytes": self.budget_bytes, "loading": len(self._loading), **self.counts}
+
+    def collect(self):
+        yield ("rag_tenant_indexes_resident", "gauge", "Tenant indexes loaded in this process",
+               [("", {}, len(self._states))])
+        yield ("rag_tenant_index_resident_bytes", "gauge", "On-disk size of the loaded tenant indexes "
+               "(TENANT_INDEX_BUDGET_MB caps it)", [("", {}, self.resident_bytes)])
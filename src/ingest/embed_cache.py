@@ -0,0 +1,71 @@
+"""On-disk, content-hash-keyed cache of chunk embeddings and extracted file text (SQLite)."""
+import hashlib
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Maps (model, sha1(chunk text)) -> vector and file sha1 -> extracted text.
+
+    Every batch is committed as soon as it is embedded, so an interrupted ingest run
+    resumes by simply running again: cached chunks are never sent to the embedder twice.
+    """
+
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.model = model
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, key TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL,"
+            " PRIMARY KEY (model, key))"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS file_texts (sha1 TEXT PRIMARY KEY, text TEXT NOT NULL)")
+        self._db.commit()
+
+    # ---------- embeddings ----------
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        keys = list(dict.fromkeys(keys))
+        out = {}
+        for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+            part = keys[i : i + 500]
+            rows = self._db.execute(
+                f"SELECT key, vec FROM embeddings WHERE model = ? AND key IN ({','.join('?' * len(part))})",
+                [self.model, *part],
+            )
+            for key, blob in rows:
+                out[key] = np.frombuffer(blob, dtype="float32")
+        return out
+
+    def put_many(self, keys: List[str], vecs: np.ndarray):
+        vecs = np.asarray(vecs, dtype="float32")
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, key, dim, vec) VALUES (?, ?, ?, ?)",
+            [(self.model, k, int(v.shape[0]), v.tobytes()) for k, v in zip(keys, vecs)],
+        )
+        self._db.commit()
+
+    # ---------- extracted text ----------
+    def get_text(self, file_sha1: str) -> Optional[str]:
+        row = self._db.execute("SELECT text FROM file_texts WHERE sha1 = ?", (file_sha1,)).fetchone()
+        return row[0] if row else None
+
+    def put_text(self, file_sha1: str, text: str):
+        self._db.execute("INSERT OR REPLACE INTO file_texts (sha1, text) VALUES (?, ?)", (file_sha1, text))
+        self._db.commit()
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model,)).fetchone()[0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,160 @@
+"""
+Incremental ingest: update an existing index in place of a full rebuild.
+
+    diff      source tree vs the previous manifest's "files" (by content sha1)
+    remove    vectors of changed + deleted files (index.remove_ids on an ID-mapped index)
+    embed     only the chunks of new + changed files, appended with fresh ids
+    write     faiss.index, chunks.bin, lexical.bin (rebuilt over live chunks; no embedding),
+              delta.npz as <name>.new, then renamed into place; meta.json (with a "delta"
+              block) last, so an interrupted run never leaves a manifest over other files
+
+Running instances that serve the previous version download just delta.npz + meta.json
+(see app.reload_index); fresh instances keep downloading the full artifacts.
+"""
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from src.index.chunk_store import ChunkStore
+from src.index.delta import apply_delta, extend_chunk_store, to_id_mapped, write_delta
+from src.index.lexical import LEXICAL_FILE, lexical_manifest_entry, write_lexical_index
+from src.index.manifest import build_manifest, file_sha1, live_chunk_ids, load_manifest, write_manifest
+from src.ingest.embed_cache import EmbeddingCache
+from src.ingest.pipeline import StageStats, extract_texts
+
+DELTA_FILE = "delta.npz"
+
+
+def _staged(path: Path) -> Path:
+    return path.with_name(path.name + ".new")
+
+
+def diff_files(prev_files: List[dict], current: Dict[str, str]) -> Dict[str, List[str]]:
+    """Compare {path: sha1} of the source tree with manifest "files" entries."""
+    prev = {f["path"]: f["sha1"] for f in prev_files}
+    return {
+        "added": sorted(p for p in current if p not in prev),
+        "changed": sorted(p for p in current if p in prev and prev[p] != current[p]),
+        "removed": sorted(p for p in prev if p not in current),
+        "unchanged": sorted(p for p in current if prev.get(p) == current[p]),
+    }
+
+
+def update_index(index_dir: Path, source_dir: Path, paths: List[Path], *,
+                 read_fn: Callable[[Path], str], chunk_fn: Callable[[str], List[str]],
+                 embed_fn: Callable[[List[str]], np.ndarray], provider: str, model: str, dim: int,
+                 chunk_unit: str, chunk_size: int, chunk_overlap: int,
+                 cache: Optional[EmbeddingCache] = None, workers: int = 0,
+                 stats: Optional[StageStats] = None) -> dict:
+    """
+    Apply the source-tree changes to the index in `index_dir`. `embed_fn` must return
+    L2-normalized float32 vectors. Raises ValueError when a full ingest is required
+    (no manifest yet, different embedder/chunking, or an HNSW index).
+    Returns {"manifest", "diff", "removed_vectors", "added_vectors", "tombstones"}.
+    """
+    index_dir = Path(index_dir)
+    meta_path = index_dir / "meta.json"
+    if not meta_path.exists():
+        raise ValueError(f"No index in {index_dir}; run a full ingest first")
+    prev = load_manifest(meta_path)
+    if prev["format_version"] < 1 or not prev.get("chunk_store"):
+        raise ValueError("Index predates versioned manifests; run a full ingest first")
+    emb, chunking = prev["embedder"], prev["chunking"]
+    if (emb["model"], int(emb["dim"])) != (model, int(dim)):
+        raise ValueError(f"Index was embedded with {emb['model']} ({emb['dim']}d); run a full ingest for {model}")
+    if (chunking["unit"], chunking["size"], chunking["overlap"]) != (chunk_unit, chunk_size, chunk_overlap):
+        raise ValueError("Chunking settings changed since the last ingest; run a full ingest")
+
+    t0 = time.perf_counter()
+    by_rel = {str(p.relative_to(source_dir)): p for p in paths}
+    diff = diff_files(prev["files"], {rel: file_sha1(p) for rel, p in by_rel.items()})
+    if stats:
+        stats.record("diff", time.perf_counter() - t0, files=len(paths))
+    result = {"manifest": prev, "diff": diff, "removed_vectors": 0, "added_vectors": 0}
+    if not (diff["added"] or diff["changed"] or diff["removed"]):
+        result["tombstones"] = prev["chunk_store"]["count"] - prev["index"]["ntotal"]
+        return result
+
+    index = to_id_mapped(faiss.read_index(str(index_dir / prev["index"]["file"])))  # HNSW fails here, before embedding
+    store = ChunkStore(index_dir / prev["chunk_store"]["file"])
+    if (len(store), store.sha1, index.ntotal) != (prev["chunk_store"]["count"], prev["chunk_store"]["sha1"],
+                                                  prev["index"]["ntotal"]):
+        store.close()
+        raise ValueError(f"Index files in {index_dir} don't match meta.json (interrupted update?); "
+                         "run a full ingest")
+
+    # ids of changed/removed files go away; their text stays in chunks.bin as tombstones
+    old_ranges = {f["path"]: f["chunks"] for f in prev["files"]}
+    remove_ids = np.concatenate([np.arange(*old_ranges[p], dtype="int64") for p in diff["changed"] + diff["removed"]]
+                                or [np.zeros(0, dtype="int64")])
+
+    todo = sorted(diff["added"] + diff["changed"])
+    contents = extract_texts([by_rel[p] for p in todo], read_fn, cache=cache, workers=workers, stats=stats)
+    next_id = len(store)
+    texts, sources, entries = [], [], {}
+    for rel in todo:
+        parts = chunk_fn(contents[by_rel[rel]])
+        start = next_id + len(texts)
+        texts.extend(parts)
+        sources.extend([rel] * len(parts))
+        entries[rel] = {"path": rel, "sha1": file_sha1(by_rel[rel]), "chunks": [start, start + len(parts)]}
+    vecs = embed_fn(texts) if texts else np.zeros((0, dim), dtype="float32")
+    add_ids = np.arange(next_id, next_id + len(texts), dtype="int64")
+
+    t0 = time.perf_counter()
+    delta = {"remove_ids": remove_ids, "add_ids": add_ids, "add_vecs": vecs}
+    index = apply_delta(index, delta, copy=False)
+    if stats:
+        stats.record("index", time.perf_counter() - t0, chunks=len(texts))
+
+    # everything is written under a staging name first; meta.json goes last
+    index_path = index_dir / prev["index"]["file"]
+    chunks_path = index_dir / prev["chunk_store"]["file"]
+    staged = {path: _staged(path) for path in (chunks_path, index_dir / LEXICAL_FILE, index_dir / DELTA_FILE,
+                                                index_path)}
+    faiss.write_index(index, str(staged[index_path]))
+    chunks_sha1 = extend_chunk_store(store, staged[chunks_path], texts, sources)
+    store.close()
+
+    files = sorted([f for f in prev["files"] if f["path"] in diff["unchanged"]] + list(entries.values()),
+                   key=lambda f: f["path"])
+    store = ChunkStore(staged[chunks_path])
+    lexical_sha1 = write_lexical_index(staged[index_dir / LEXICAL_FILE],
+                                       ((i, store.text(i)) for i in live_chunk_ids({"files": files})), len(store))
+    store.close()
+    manifest = build_manifest(
+        provider=provider,
+        model=model,
+        dim=dim,
+        index_type=prev["index"]["type"],
+        index_params=prev["index"]["params"],
+        ntotal=index.ntotal,
+        chunk_count=next_id + len(texts),
+        chunk_unit=chunk_unit,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        chunk_store_sha1=chunks_sha1,
+        files=files,
+        index_sha1=file_sha1(staged[index_path]),
+        lexical=lexical_manifest_entry(lexical_sha1),
+    )
+    delta_sha1 = write_delta(
+        staged[index_dir / DELTA_FILE],
+        base_version=prev["content_hash"],
+        version=manifest["content_hash"],
+        texts=texts,
+        sources=sources,
+        **delta,
+    )
+    manifest["delta"] = {"file": DELTA_FILE, "sha1": delta_sha1, "base_version": prev["content_hash"]}
+    for path, tmp in staged.items():
+        os.replace(tmp, path)
+    write_manifest(meta_path, manifest)
+
+    result.update(manifest=manifest, removed_vectors=int(remove_ids.size), added_vectors=len(texts),
+                  tombstones=manifest["chunk_store"]["count"] - index.ntotal)
+    return result
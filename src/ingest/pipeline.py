@@ -0,0 +1,155 @@
+"""
+Staged ingest pipeline shared by ingest.py and ingest_mistral.py.
+
+    extract  (process pool, cached by file sha1)
+    embed    (concurrent batches with rate-limit-aware backoff, cached by chunk sha1)
+
+Each stage records its throughput in a StageStats so both scripts can print a report.
+"""
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.index.manifest import file_sha1
+from src.ingest.embed_cache import EmbeddingCache, text_key
+from src.llm.resilience import is_retryable, status_and_retry_after
+
+logger = logging.getLogger("ingest")
+
+
+class StageStats:
+    """Wall time and item counts per stage -> throughput report."""
+
+    def __init__(self):
+        self.stages: Dict[str, dict] = {}
+
+    def record(self, stage: str, seconds: float, **counts):
+        s = self.stages.setdefault(stage, {"seconds": 0.0})
+        s["seconds"] += seconds
+        for k, v in counts.items():
+            s[k] = s.get(k, 0) + v
+
+    def report(self) -> str:
+        lines = ["=== Stage throughput ==="]
+        for name, s in self.stages.items():
+            secs = s["seconds"]
+            counts = ", ".join(
+                f"{k}={v}" + (f" ({v / secs:,.1f}/s)" if secs > 0 and k in ("files", "chunks", "embedded") else "")
+                for k, v in s.items() if k != "seconds"
+            )
+            lines.append(f"{name:10s}: {secs:8.2f}s  {counts}")
+        return "\n".join(lines)
+
+
+# ---------- stage 1: extraction ----------
+def extract_texts(files: Sequence[Path], read_fn: Callable[[Path], str], cache: Optional[EmbeddingCache] = None,
+                  workers: int = 0, stats: Optional[StageStats] = None) -> Dict[Path, str]:
+    """
+    Text of every file, in parallel. `read_fn` must be a module-level function (it is pickled
+    to the worker processes). Results are cached by file content hash.
+    """
+    t0 = time.perf_counter()
+    hashes = {f: file_sha1(f) for f in files}
+    out: Dict[Path, str] = {}
+    todo = []
+    for f in files:
+        cached = cache.get_text(hashes[f]) if cache else None
+        if cached is not None:
+            out[f] = cached
+        else:
+            todo.append(f)
+
+    if todo:
+        if workers and workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                texts = list(pool.map(read_fn, todo))
+        else:
+            texts = [read_fn(f) for f in todo]
+        for f, text in zip(todo, texts):
+            out[f] = text
+            if cache and text:
+                cache.put_text(hashes[f], text)
+
+    if stats:
+        stats.record("extract", time.perf_counter() - t0, files=len(files), cached_files=len(files) - len(todo))
+    return out
+
+
+# ---------- stage 2: embedding ----------
+async def call_with_backoff(fn: Callable[[], Awaitable], max_retries: int = 6, base: float = 0.5, cap: float = 30.0):
+    """Retry `fn` on 429/5xx/connection errors with full-jitter exponential backoff (Retry-After wins)."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await fn()
+        except Exception as e:
+            status, retry_after = status_and_retry_after(e)
+            if attempt >= max_retries or not is_retryable(e, status):
+                raise
+            delay = retry_after if retry_after is not None else random.uniform(0, min(cap, base * 2 ** attempt))
+            logger.warning(f"embedding batch failed ({status or type(e).__name__}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def embed_texts_async(texts: Sequence[str], embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+                            cache: Optional[EmbeddingCache] = None, batch_size: int = 32, concurrency: int = 4,
+                            max_retries: int = 6, stats: Optional[StageStats] = None) -> np.ndarray:
+    """
+    Embed `texts` (order preserved) with up to `concurrency` batches in flight.
+    Only texts missing from the cache are sent; each finished batch is committed at once.
+    """
+    t0 = time.perf_counter()
+    keys = [text_key(t) for t in texts]
+    found = cache.get_many(keys) if cache else {}
+    missing = list(dict.fromkeys(k for k in keys if k not in found))
+    by_key = {k: t for k, t in zip(keys, texts)}
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(batch_keys: List[str]):
+        async with sem:
+            vecs = await call_with_backoff(lambda: embed_batch([by_key[k] for k in batch_keys]), max_retries=max_retries)
+        arr = np.asarray(vecs, dtype="float32")
+        if arr.shape[0] != len(batch_keys):
+            raise RuntimeError(f"Embeddings count mismatch: {arr.shape[0]} vs {len(batch_keys)}")
+        if cache:
+            cache.put_many(batch_keys, arr)
+        for k, v in zip(batch_keys, arr):
+            found[k] = v
+
+    await asyncio.gather(*(run(missing[i : i + batch_size]) for i in range(0, len(missing), batch_size)))
+    if stats:
+        stats.record("embed", time.perf_counter() - t0, chunks=len(texts), embedded=len(missing),
+                     cached=len(texts) - len(missing))
+    return _stack(keys, found)
+
+
+def embed_texts_sync(texts: Sequence[str], encode: Callable[[List[str]], np.ndarray],
+                     cache: Optional[EmbeddingCache] = None, batch_size: int = 64,
+                     stats: Optional[StageStats] = None) -> np.ndarray:
+    """Same contract as embed_texts_async for local (CPU/GPU-bound) encoders."""
+    t0 = time.perf_counter()
+    keys = [text_key(t) for t in texts]
+    found = cache.get_many(keys) if cache else {}
+    missing = list(dict.fromkeys(k for k in keys if k not in found))
+    by_key = {k: t for k, t in zip(keys, texts)}
+    for i in range(0, len(missing), batch_size):
+        batch_keys = missing[i : i + batch_size]
+        arr = np.asarray(encode([by_key[k] for k in batch_keys]), dtype="float32").reshape(len(batch_keys), -1)
+        if cache:
+            cache.put_many(batch_keys, arr)
+        found.update(zip(batch_keys, arr))
+    if stats:
+        stats.record("embed", time.perf_counter() - t0, chunks=len(texts), embedded=len(missing),
+                     cached=len(texts) - len(missing))
+    return _stack(keys, found)
+
+
+def _stack(keys: List[str], found: Dict[str, np.ndarray]) -> np.ndarray:
+    if not keys:
+        return np.zeros((0, 0), dtype="float32")
+    return np.stack([found[k] for k in keys]).astype("float32", copy=False)
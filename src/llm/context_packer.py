@@ -0,0 +1,154 @@
+"""
+Context assembly under a token budget: what of the retrieved hits goes into the prompt.
+
+`pack_context` takes the hits best first (as `rag._search` returns them) and
+
+  1. merges chunks of the same source that are neighbours in the chunk store (consecutive
+     ids) or whose texts overlap, cutting the overlapping window out, so a passage split
+     across chunks is sent once, in document order;
+  2. drops sentences already sent earlier in the context (the same passage retrieved from
+     two files, or overlap that step 1 could not stitch);
+  3. adds the resulting passages greedily, best first, while they fit CONTEXT_TOKEN_BUDGET;
+     the best passage is always kept, cut at a sentence boundary if it alone is too long.
+
+Token counts come from a local counter (src/llm/tokens.py), so the budget costs no API call.
+"""
+import re
+from typing import Callable, List, Optional, Tuple
+
+SEPARATOR = "\n\n---\n\n"
+MIN_OVERLAP = 16          # chars: shorter suffix/prefix matches are coincidence, not chunk overlap
+MIN_DEDUPE_SENTENCE = 24  # chars: short sentences ("Yes.", headings) may legitimately repeat
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+_SPACE = re.compile(r"\s+")
+
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b` (0 when under MIN_OVERLAP)."""
+    if len(a) < MIN_OVERLAP or len(b) < MIN_OVERLAP:
+        return 0
+    head = b[:MIN_OVERLAP]
+    pos = a.find(head, max(0, len(a) - len(b)))
+    while pos != -1:  # earliest match = longest overlap
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(head, pos + 1)
+    return 0
+
+
+def _join(a: str, b: str) -> Optional[str]:
+    """`a` followed by `b` without their shared window; None when they don't overlap."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    n = _overlap(a, b)
+    return a + b[n:] if n else None
+
+
+def _sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def _merge_source(hits: List[Tuple[int, dict]]) -> List[dict]:
+    """Passages of one source from its (rank, hit) pairs, stitched in chunk-id order."""
+    hits = sorted(hits, key=lambda rh: (rh[1].get("id") is None, rh[1].get("id") or 0, rh[0]))
+    out: List[dict] = []
+    for rank, h in hits:
+        last = out[-1] if out else None
+        if last is not None:
+            text = _join(last["text"], h["text"])
+            if text is None and h.get("id") is not None and h["id"] == last["ids"][-1] + 1:
+                text = last["text"] + " " + h["text"]  # neighbours without overlap (CHUNK_OVERLAP=0)
+            if text is None and h.get("id") is None:
+                text = _join(h["text"], last["text"])  # unknown order: try it the other way round
+            if text is not None:
+                last["text"], last["rank"] = text, min(last["rank"], rank)
+                last["ids"].append(h.get("id"))
+                continue
+        out.append({"source": h["source"], "text": h["text"], "rank": rank, "ids": [h.get("id")]})
+    return out
+
+
+def merge_hits(hits: List[dict]) -> List[dict]:
+    """Hits -> passages ({source, text, ids, rank}), best (lowest rank) first."""
+    by_source = {}
+    for rank, h in enumerate(hits):
+        by_source.setdefault(h["source"], []).append((rank, h))
+    passages = [p for group in by_source.values() for p in _merge_source(group)]
+    return sorted(passages, key=lambda p: p["rank"])
+
+
+def dedupe_sentences(passages: List[dict]) -> int:
+    """Drop sentences already seen in an earlier passage (in place); returns how many."""
+    seen, dropped = set(), 0
+    for p in passages:
+        kept = []
+        for s in _sentences(p["text"]):
+            key = _SPACE.sub(" ", s).strip().lower()
+            if len(key) >= MIN_DEDUPE_SENTENCE and key in seen:
+                dropped += 1
+                continue
+            seen.add(key)
+            kept.append(s.strip())
+        p["text"] = " ".join(kept)
+    return dropped
+
+
+def format_passage(p: dict) -> str:
+    return f"[{p['source']}] {p['text']}"
+
+
+def _truncate(p: dict, count: Callable[[str], int], budget: int) -> dict:
+    """Leading sentences of `p` that fit `budget` (at least the first sentence's words that fit)."""
+    kept = []
+    for s in _sentences(p["text"]):
+        if count(format_passage({**p, "text": " ".join(kept + [s])})) > budget:
+            break
+        kept.append(s)
+    if not kept:
+        words = p["text"].split()
+        lo, hi = 0, len(words)
+        while lo < hi:  # longest word prefix that fits
+            mid = (lo + hi + 1) // 2
+            if count(format_passage({**p, "text": " ".join(words[:mid])})) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        kept = words[:lo]
+    return {**p, "text": " ".join(kept)}
+
+
+def pack_context(hits: List[dict], count: Callable[[str], int], budget: int = 0) -> Tuple[str, List[dict], dict]:
+    """
+    (context text, passages used, stats) for `hits` (best first; {"text", "source"} and,
+    when known, the chunk "id"). `budget` caps the context's tokens (0 = no cap); stats
+    holds the hit/passage counts and the context's tokens before and after packing.
+    """
+    passages = [p for p in merge_hits(hits) if p["text"].strip()]
+    dropped = dedupe_sentences(passages)
+    passages = [p for p in passages if p["text"]]
+
+    sep = count(SEPARATOR)
+    used, total, truncated = [], 0, False
+    for p in passages:
+        cost = count(format_passage(p)) + (sep if used else 0)
+        if budget <= 0 or total + cost <= budget:
+            used.append(p)
+            total += cost
+        elif not used:  # never send an empty context when something was retrieved
+            used.append(_truncate(p, count, budget))
+            truncated = True
+            break
+    context = SEPARATOR.join(format_passage(p) for p in used)
+    stats = {
+        "hits": len(hits),
+        "passages": len(passages),
+        "packed": len(used),
+        "dropped_sentences": dropped,
+        "truncated": truncated,
+        "context_raw_tokens": count(SEPARATOR.join(f"[{h['source']}] {h['text']}" for h in hits)),
+        "context_tokens": count(context) if used else 0,
+    }
+    return context, used, stats
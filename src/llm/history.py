@@ -0,0 +1,163 @@
+"""
+Conversation history for session turns, at a flat prompt size (state: src/serving/sessions.py).
+
+    condense       a follow-up ("tell me more about that project") rewritten into a standalone
+                   question for retrieval (SESSION_CONDENSE: llm; concat = previous query +
+                   question, also the fallback; off)
+    history_block  the running summary + the newest turns that fit SESSION_HISTORY_TOKENS, put in
+                   the user prompt before the question
+    compact        once the stored turns pass SESSION_HISTORY_TOKENS, all but the last
+                   SESSION_KEEP_TURNS are folded into a summary of at most SESSION_SUMMARY_TOKENS
+                   (by the LLM; extractive when it can't answer)
+
+Answers are kept without their suggested follow-up bullets: they are not conversation (`suggestions`
+reads them, for src/serving/speculation.py).
+"""
+import re
+from typing import Callable, List, Optional, Tuple
+
+from src.llm.resilience import LLMUnavailable
+
+CONDENSE_MODES = ("llm", "concat", "off")
+
+CONDENSE_SYSTEM_PROMPT = (
+    "Rewrite the user's follow-up as one standalone question that can be understood without the "
+    "conversation: replace pronouns and references with what they refer to. Keep the user's language. "
+    "Reply with the question only."
+)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You keep a running summary of a conversation between a visitor and a portfolio assistant. "
+    "Merge the new turns into the summary: what was asked and the facts given, names of projects, "
+    "tools and places. At most 5 short sentences, no follow-up suggestions."
+)
+
+# words that point back at earlier turns (en / pt / nl)
+FOLLOW_UP = re.compile(
+    r"\b(it|its|that|this|those|these|they|them|there|he|she|his|her|more|else|also|another|same|"
+    r"isso|isto|esse|essa|este|esta|dele|dela|mais|também|outro|outra|"
+    r"dat|dit|die|deze|het|hij|zij|meer|ook|andere)\b",
+    re.IGNORECASE,
+)
+_BULLET = re.compile(r"^\s*([-•*]|\d+[.)])\s+")
+
+Count = Callable[[str], int]
+
+
+def _brief(answer: str) -> str:
+    """The answer without its bulleted follow-up suggestions."""
+    lines = answer.strip().splitlines()
+    while lines and (not lines[-1].strip() or _BULLET.match(lines[-1])):
+        lines.pop()
+    # "You could also ask:" style lead-in left above the bullets
+    if lines and lines[-1].rstrip().endswith(":") and len(lines) > 1:
+        lines.pop()
+    return "\n".join(lines).strip() or answer.strip()
+
+
+def suggestions(answer: str, limit: int = 5) -> List[str]:
+    """The follow-up questions / topics an answer ends with (its trailing bullets), in order."""
+    lines = [line for line in answer.strip().splitlines() if line.strip()]
+    tail = []
+    while lines and _BULLET.match(lines[-1]):
+        tail.append(_BULLET.sub("", lines.pop()))
+    out = []
+    for item in reversed(tail):
+        item = " ".join(item.replace("**", "").replace("`", "").split()).strip("\"'“”_ ")
+        if 3 <= len(item) <= 200 and item not in out:
+            out.append(item)
+    return out[:limit]
+
+
+def format_turn(turn: dict) -> str:
+    return f"User: {turn['q']}\nAssistant: {_brief(turn['a'])}"
+
+
+def _clip(text: str, count: Count, limit: int, keep_tail: bool = False) -> str:
+    """At most `limit` tokens of `text`, cut at a word boundary (head, or the tail)."""
+    if limit <= 0 or count(text) <= limit:
+        return text
+    words = text.split()
+    lo, hi = 0, len(words)
+    while lo < hi:  # longest prefix / suffix that fits
+        mid = (lo + hi + 1) // 2
+        part = " ".join(words[-mid:] if keep_tail else words[:mid])
+        lo, hi = (mid, hi) if count(part) <= limit else (lo, mid - 1)
+    part = " ".join(words[-lo:] if keep_tail else words[:lo]) if lo else ""
+    return ("… " + part if keep_tail else part + " …") if part else ""
+
+
+def has_history(state: Optional[dict]) -> bool:
+    return bool(state and (state["turns"] or state["summary"]))
+
+
+def looks_like_follow_up(question: str) -> bool:
+    return len(question.split()) <= 4 or bool(FOLLOW_UP.search(question))
+
+
+def history_block(state: Optional[dict], count: Count, budget: int) -> str:
+    """Summary + newest turns (whole turns, oldest first) within `budget` tokens; "" without history."""
+    if not has_history(state):
+        return ""
+    head = f"Summary of the earlier conversation: {state['summary']}" if state["summary"] else ""
+    used, turns = count(head) if head else 0, []
+    for turn in reversed(state["turns"]):
+        text = format_turn(turn)
+        n = count(text)
+        if turns and used + n > budget:
+            break
+        turns.append(_clip(text, count, budget - used) if used + n > budget else text)
+        used += n
+    return "\n\n".join(([head] if head else []) + turns[::-1])
+
+
+async def condense(llm, question: str, state: Optional[dict], mode: str = "llm") -> Tuple[str, str]:
+    """(retrieval query, how: none | llm | concat) for `question` in the conversation `state`."""
+    if mode not in CONDENSE_MODES:
+        raise ValueError(f"unknown SESSION_CONDENSE {mode!r}; expected one of {CONDENSE_MODES}")
+    if mode == "off" or not has_history(state) or not looks_like_follow_up(question):
+        return question, "none"
+    if mode == "llm":
+        context = "\n\n".join(([f"Summary: {state['summary']}"] if state["summary"] else [])
+                              + [format_turn(t) for t in state["turns"][-2:]])
+        try:
+            text = await llm.generate_response(f"{context}\n\nFollow-up: {question}\nStandalone question:",
+                                               system=CONDENSE_SYSTEM_PROMPT, temperature=0.0, max_tokens=64)
+        except LLMUnavailable:
+            text = ""
+        lines = [line.strip().strip('"“”') for line in (text or "").splitlines() if line.strip()]
+        query = lines[0] if lines else ""
+        if query and not llm.is_mock_response(text) and len(query) <= 3 * len(question) + 200:
+            return query, "llm"
+    previous = state["turns"][-1]["query"] if state["turns"] else state["summary"]
+    return f"{previous} {question}".strip(), "concat"
+
+
+def turn_tokens(turns: List[dict], count: Count) -> int:
+    return sum(count(format_turn(t)) for t in turns)
+
+
+async def compact(llm, state: dict, count: Count, budget: int, keep: int,
+                  summary_tokens: int) -> Optional[Tuple[int, str, str]]:
+    """
+    (fold turns numbered below this, new summary, how: llm | extractive) when the stored turns
+    are over `budget` tokens, else None. Pure: the caller writes it back (sessions.fold).
+    """
+    turns = state["turns"]
+    if len(turns) <= keep or turn_tokens(turns, count) <= budget:
+        return None
+    old = turns[:-keep] if keep > 0 else turns
+    transcript = "\n\n".join(format_turn(t) for t in old)
+    try:
+        text = await llm.generate_response(
+            f"Summary so far: {state['summary'] or '(none)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:",
+            system=SUMMARY_SYSTEM_PROMPT, temperature=0.2, max_tokens=summary_tokens,
+        )
+    except LLMUnavailable:
+        text = ""
+    if text and not llm.is_mock_response(text):
+        return old[-1]["n"] + 1, _clip(" ".join(text.split()), count, summary_tokens), "llm"
+    # extractive: the questions and first lines of the answers, newest kept when it is too long
+    facts = [f"Asked: {t['q']} Answer: {_brief(t['a']).splitlines()[0]}" for t in old]
+    summary = " ".join(([state["summary"]] if state["summary"] else []) + facts)
+    return old[-1]["n"] + 1, _clip(summary, count, summary_tokens, keep_tail=True), "extractive"
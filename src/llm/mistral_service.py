@@ -1,50 +1,194 @@
-"""LLM Service with Mistral AI integration (SDK v1)"""
+"""
+LLM Service with Mistral AI integration (SDK v1)
+
+Prompt layout: `system` is the static system prompt and `instructions` the request-specific
+system text (e.g. the answer language). With prefix_cache (LLM_PREFIX_CACHE, default on) the
+system message is `system` alone, byte-identical on every call, and `instructions` go at the
+end of the user turn, so a provider that caches prompt prefixes can reuse everything up to
+the question. Without it `instructions` are appended to the system message, as before.
+
+Calls go through src/llm/resilience.py (request deadline, retries, hedging, circuit breaker)
+and raise LLMUnavailable when no answer can be had; the mock response is only used when
+there is no API key at all (offline development).
+"""
 import asyncio
 import logging
 import os
-from typing import Optional
+from typing import AsyncIterator, List, Optional
+
+import httpx
 from mistralai import Mistral
+
 from src.config import Config
+from src.llm.resilience import CircuitBreaker, LLMUnavailable, RetryPolicy, call, remaining
+from src.observability.metrics import LLM_CALLS, LLM_MOCK_FALLBACKS, LLM_TOKENS
+
+MOCK_RESPONSE = "(mock) I don't know based on the current document."
+
+
+def _count_usage(usage, client: str):
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, kind="prompt", client=client)
+        LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, kind="completion", client=client)
+
+
+def _timeout_ms(seconds: Optional[float]) -> Optional[int]:
+    return max(1, int(seconds * 1000)) if seconds is not None else None
+
+
+def make_client(api_key: Optional[str], server_url: Optional[str] = None) -> Mistral:
+    """
+    The process-wide SDK client: sync and async httpx clients with a bounded pool of
+    keep-alive connections (LLM_MAX_CONNECTIONS, LLM_KEEPALIVE_S), built once and shared by
+    chat and query embeddings. SDK-level retries stay off; resilience.call does them.
+    """
+    limits = httpx.Limits(max_connections=Config.LLM_MAX_CONNECTIONS,
+                          max_keepalive_connections=Config.LLM_MAX_CONNECTIONS, keepalive_expiry=Config.LLM_KEEPALIVE_S)
+    timeout = httpx.Timeout(Config.LLM_TIMEOUT_S, connect=Config.LLM_CONNECT_TIMEOUT_S)
+    return Mistral(api_key=api_key, server_url=server_url,
+                   client=httpx.Client(limits=limits, timeout=timeout),
+                   async_client=httpx.AsyncClient(limits=limits, timeout=timeout))
+
+
+async def _next_delta(stream, client: str) -> Optional[str]:
+    """Next non-empty text delta of an SDK event stream (None at the end); counts usage on the way."""
+    async for event in stream:
+        _count_usage(getattr(event.data, "usage", None), client)  # sent on the last chunk
+        if not event.data.choices:
+            continue
+        delta = event.data.choices[0].delta.content
+        if isinstance(delta, str) and delta:
+            return delta
+    return None
+
+
+async def _close(stream):
+    await stream.response.aclose()
+
 
 class MistralLLMService:
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, client: Optional[Mistral] = None,
+                 prefix_cache: Optional[bool] = None, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, hedge_after_ms: Optional[float] = None):
         self.api_key = api_key or Config.LLM_API_KEY or os.getenv("MISTRAL_API_KEY")
         self.model = model or Config.LLM_MODEL or "mistral-large-latest"
+        self.prefix_cache = Config.LLM_PREFIX_CACHE if prefix_cache is None else prefix_cache
+        self.retry = retry or RetryPolicy(Config.LLM_MAX_RETRIES, Config.LLM_RETRY_BASE_S)
+        self.breaker = breaker or CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_RESET_S)
+        self.timeout = Config.LLM_TIMEOUT_S or None  # one attempt; streaming: until the first token
+        self.hedge_after = (Config.LLM_HEDGE_AFTER_MS if hedge_after_ms is None else hedge_after_ms) / 1000
         self.logger = logging.getLogger("mistral_llm")
         self.client = None
-        if self.api_key:
-            try:
-                self.client = Mistral(api_key=self.api_key)  # v1 client
-                self.logger.info("Mistral client initialized")
-            except Exception as e:
-                self.logger.error(f"Failed to initialize Mistral client: {e}")
+        if client is not None and self.api_key:
+            self.client = client  # shared with the query embedder (one connection pool)
+        elif self.api_key:
+            self.client = make_client(self.api_key, Config.MISTRAL_SERVER_URL)
+            self.logger.info("Mistral client initialized")
         else:
             self.logger.warning("No Mistral API key provided; using mock responses")
 
-    async def generate_response(self, prompt: str, system: str = "", temperature: float | None = None, max_tokens: int = 512) -> str:
-        """Generic chat completion wrapper used by the RAG layer."""
-        if not self.client:
-            return await self._mock_response(prompt)
-
+    def messages(self, prompt: str, system: str = "", instructions: str = "") -> List[dict]:
+        """Chat messages in this service's layout (see module docstring)."""
+        if instructions and self.prefix_cache:
+            prompt = f"{prompt}\n\n{instructions}"
+        elif instructions:
+            system = f"{system}\n\n{instructions}" if system else instructions
         messages = []
         if system:
             messages.append({"role": "system", "content": system})
         messages.append({"role": "user", "content": prompt})
+        return messages
 
-        def _call():
-            return self.client.chat.complete(
+    async def generate_response(self, prompt: str, system: str = "", temperature: float | None = None, max_tokens: int = 512,
+                                instructions: str = "") -> str:
+        """Chat completion used by the RAG layer; raises LLMUnavailable when the provider can't answer."""
+        if not self.client:
+            LLM_CALLS.inc(outcome="no_client", client=self.breaker.name)
+            return await self._mock_response(prompt)
+
+        messages = self.messages(prompt, system, instructions)
+
+        async def attempt(timeout: Optional[float]):
+            return await self.client.chat.complete_async(
+                model=self.model,
+                messages=messages,
+                temperature=Config.TEMPERATURE if temperature is None else temperature,
+                max_tokens=max_tokens,
+                timeout_ms=_timeout_ms(timeout),
+            )
+
+        try:
+            resp = await call(attempt, retry=self.retry, breaker=self.breaker, timeout=self.timeout,
+                              hedge_after=self.hedge_after)
+        except LLMUnavailable as e:
+            self.logger.error(f"Mistral API unavailable: {e}")
+            raise
+        _count_usage(getattr(resp, "usage", None), self.breaker.name)
+        return resp.choices[0].message.content
+
+    async def generate_response_stream(self, prompt: str, system: str = "", temperature: float | None = None, max_tokens: int = 512,
+                                       instructions: str = "") -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_response: yields text deltas as they arrive. Retries and
+        hedging cover the wait for the first token; a stream that breaks after it raises.
+        """
+        if not self.client:
+            LLM_CALLS.inc(outcome="no_client", client=self.breaker.name)
+            async for piece in self._mock_stream(prompt):
+                yield piece
+            return
+
+        messages = self.messages(prompt, system, instructions)
+
+        async def attempt(timeout: Optional[float]):
+            stream = await self.client.chat.stream_async(
                 model=self.model,
                 messages=messages,
                 temperature=Config.TEMPERATURE if temperature is None else temperature,
                 max_tokens=max_tokens,
+                timeout_ms=_timeout_ms(timeout),
             )
+            try:
+                return stream, await _next_delta(stream, self.breaker.name)
+            except BaseException:  # failed, timed out or lost the hedge: release the connection
+                await _close(stream)
+                raise
+
+        try:
+            stream, piece = await call(attempt, retry=self.retry, breaker=self.breaker, timeout=self.timeout,
+                                       hedge_after=self.hedge_after, discard=lambda r: _close(r[0]))
+        except LLMUnavailable as e:
+            self.logger.error(f"Mistral API unavailable (stream): {e}")
+            raise
         try:
-            resp = await asyncio.to_thread(_call)
-            return resp.choices[0].message.content
+            while piece is not None:
+                yield piece
+                left = remaining()
+                more = _next_delta(stream, self.breaker.name)
+                piece = await (asyncio.wait_for(more, left) if left is not None else more)
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
         except Exception as e:
-            self.logger.error(f"Mistral API error: {e}")
-            return await self._mock_response(prompt)
+            self.logger.error(f"Mistral stream broke: {e}")
+            LLM_CALLS.inc(outcome="stream_error", client=self.breaker.name)
+            self.breaker.failure()
+            raise LLMUnavailable(f"LLM stream broke after it started: {e}") from e
+        finally:
+            await _close(stream)
+
+    @staticmethod
+    def is_mock_response(text: str) -> bool:
+        """True when `text` is the offline/error fallback rather than a real completion."""
+        return text == MOCK_RESPONSE
 
     async def _mock_response(self, prompt: str) -> str:
+        LLM_MOCK_FALLBACKS.inc()
         await asyncio.sleep(0.1)
-        return "(mock) I don't know based on the current document."
+        return MOCK_RESPONSE
+
+    async def _mock_stream(self, prompt: str) -> AsyncIterator[str]:
+        LLM_MOCK_FALLBACKS.inc()
+        words = MOCK_RESPONSE.split(" ")
+        for i, w in enumerate(words):
+            await asyncio.sleep(0.01)
+            yield w if i == 0 else " " + w
@@ -0,0 +1,253 @@
+"""
+Failure handling for calls to the LLM provider (used by MistralLLMService).
+
+    deadline        per-request time budget in a contextvar: app.py opens one when /ask starts
+                    (REQUEST_DEADLINE_S) and every provider attempt below it is capped by what
+                    is left, so a slow provider can't hold a request past it
+    RetryPolicy     full-jitter exponential backoff on 429/5xx/connection errors (Retry-After
+                    wins), skipped when the wait would not leave time for another attempt
+    hedging         a second, identical request once the first has run for LLM_HEDGE_AFTER_MS
+                    (set it near the p95 TTFT); the first success wins, the other is cancelled
+    CircuitBreaker  after LLM_BREAKER_FAILURES failed calls in a row, calls fail fast with
+                    CircuitOpen for LLM_BREAKER_RESET_S; then one trial call decides whether the
+                    provider is back (half-open). Its `name` labels the client's metrics
+                    (client: main, speculative), so each breaker exports its own state
+
+Every way of not getting an answer surfaces as LLMUnavailable, which rag turns into the
+language-specific fallback line.
+"""
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, Tuple
+
+from src.observability.metrics import LLM_BREAKER_STATE, LLM_CALLS, LLM_HEDGES, LLM_RETRIES
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class LLMUnavailable(RuntimeError):
+    """The provider gave no answer: errors after retries, deadline reached, or circuit open."""
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+@contextmanager
+def deadline(seconds: Optional[float] = None, *, at: Optional[float] = None):
+    """
+    Bound everything inside to `seconds` from now (or to time.monotonic() value `at`);
+    a nested scope can only shorten the enclosing one. None / <= 0 seconds = no new bound.
+    """
+    end = at if at is not None else (time.monotonic() + seconds if seconds and seconds > 0 else None)
+    current = _deadline.get()
+    if end is None or (current is not None and current < end):
+        end = current
+    token = _deadline.set(end)
+    try:
+        yield end
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:  # an async generator closed from another context
+            pass
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline (None = unbounded)."""
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def status_and_retry_after(exc: Exception) -> Tuple[Optional[int], Optional[float]]:
+    """(HTTP status, Retry-After seconds) from SDK/httpx errors when available."""
+    status = getattr(exc, "status_code", None)
+    resp = getattr(exc, "raw_response", None) or getattr(exc, "response", None)
+    if status is None and resp is not None:
+        status = getattr(resp, "status_code", None)
+    retry_after = None
+    headers = getattr(resp, "headers", None)
+    if headers is not None:
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+    return status, retry_after
+
+
+def is_retryable(exc: Exception, status: Optional[int]) -> bool:
+    if status is not None and status > 0:
+        return status in RETRYABLE_STATUS
+    # no status: connection reset / timeout style errors are worth retrying
+    return isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)) or "Timeout" in type(exc).__name__ \
+        or "Connect" in type(exc).__name__
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 2, base: float = 0.25, cap: float = 4.0):
+        self.max_retries, self.base, self.cap = max_retries, base, cap
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """closed -> (failures in a row) -> open -> (reset_after) -> half_open -> trial ok ? closed : open"""
+
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, failures: int = 5, reset_after: float = 30.0, clock: Callable[[], float] = time.monotonic,
+                 name: str = "main"):
+        self.threshold, self.reset_after, self.clock, self.name = failures, reset_after, clock, name
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.counts = {"opened": 0, "rejected": 0}
+
+    def _set(self, state: str):
+        self.state = state
+        LLM_BREAKER_STATE.set(self.STATES[state], client=self.name)
+
+    def allow(self) -> bool:
+        if self.threshold <= 0:
+            return True
+        if self.state == "open" and self.clock() - self.opened_at >= self.reset_after:
+            self._set("half_open")
+            self.trial_running = False
+        if self.state == "closed" or (self.state == "half_open" and not self.trial_running):
+            self.trial_running = self.state == "half_open"
+            return True
+        self.counts["rejected"] += 1
+        return False
+
+    def release(self):
+        """A call ended without a verdict on the provider (cancelled, out of request time): the half-open trial is free again."""
+        self.trial_running = False
+
+    def success(self):
+        self.failures, self.trial_running = 0, False
+        if self.state != "closed":
+            self._set("closed")
+
+    def failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.threshold > 0 and (self.state == "half_open" or self.failures >= self.threshold):
+            if self.state != "open":
+                self.counts["opened"] += 1
+            self.opened_at = self.clock()
+            self._set("open")
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, **self.counts}
+
+
+def _consume(task: asyncio.Task):
+    """Retrieve the outcome of an abandoned attempt (an error raised while it was being cancelled)."""
+    if not task.cancelled():
+        task.exception()
+
+
+async def hedged(attempt: Callable[[], Awaitable], hedge_after: Optional[float],
+                 discard: Optional[Callable[[object], Awaitable]] = None):
+    """
+    Result of `attempt()`; when it takes longer than `hedge_after` seconds a second attempt
+    runs alongside and the first to succeed wins. The loser is cancelled (or, if it also
+    finished, handed to `discard`, e.g. to close a stream).
+    """
+    first = asyncio.ensure_future(attempt())
+    tasks, winner = [first], None
+    try:
+        if not hedge_after or hedge_after <= 0:
+            winner = first
+            return await first
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            tasks.append(asyncio.ensure_future(attempt()))
+            LLM_HEDGES.inc(event="sent")
+        error, pending = None, set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    winner = t
+                    if len(tasks) > 1:
+                        LLM_HEDGES.inc(event="won_by_hedge" if t is tasks[1] else "won_by_primary")
+                    return t.result()
+                error = t.exception()
+        raise error
+    finally:
+        for t in tasks:
+            if t is winner:
+                continue
+            if not t.done():
+                t.cancel()
+                t.add_done_callback(_consume)
+            elif discard is not None and not t.cancelled() and t.exception() is None:
+                await discard(t.result())
+
+
+async def call(attempt: Callable[[Optional[float]], Awaitable], *, retry: RetryPolicy, breaker: CircuitBreaker,
+               timeout: Optional[float] = None, hedge_after: Optional[float] = None,
+               discard: Optional[Callable[[object], Awaitable]] = None):
+    """
+    `attempt(timeout)` under the breaker, the request deadline, retries and hedging.
+    `timeout` caps one attempt (the deadline may cap it further); raises LLMUnavailable.
+    """
+    if not breaker.allow():
+        LLM_CALLS.inc(outcome="circuit_open", client=breaker.name)
+        raise CircuitOpen("LLM circuit open: provider failing, not calling it")
+    try:
+        return await _attempts(attempt, retry, breaker, timeout, hedge_after, discard)
+    except asyncio.CancelledError:  # client gone, hedge lost, shutdown: no verdict on the provider
+        breaker.release()
+        raise
+
+
+async def _attempts(attempt, retry: RetryPolicy, breaker: CircuitBreaker, timeout: Optional[float],
+                    hedge_after: Optional[float], discard):
+    for n in range(retry.max_retries + 1):
+        left = remaining()
+        if left is not None and left <= 0:  # spent before us (retrieval, queueing): not the provider's doing
+            breaker.release()
+            LLM_CALLS.inc(outcome="deadline", client=breaker.name)
+            raise LLMUnavailable("request deadline reached before the LLM answered")
+        caps = [t for t in (timeout, left) if t is not None]
+        cap = min(caps) if caps else None
+
+        async def one():
+            return await asyncio.wait_for(attempt(cap), cap) if cap else await attempt(None)
+
+        try:
+            result = await hedged(one, hedge_after, discard)
+        except Exception as e:
+            status, retry_after = status_and_retry_after(e)
+            reason = str(status) if status and status > 0 else type(e).__name__
+            if not is_retryable(e, status):  # 4xx: our request is wrong, the provider is fine
+                breaker.success()
+                LLM_CALLS.inc(outcome="error", client=breaker.name)
+                raise LLMUnavailable(f"LLM request rejected ({reason}): {e}") from e
+            wait = retry.delay(n, retry_after)
+            left = remaining()
+            if n >= retry.max_retries:
+                breaker.failure()
+                LLM_CALLS.inc(outcome="error", client=breaker.name)
+                raise LLMUnavailable(f"LLM failed after {n + 1} attempt(s) ({reason}): {e}") from e
+            if left is not None and wait >= left:  # retries left, time isn't: no verdict either way
+                breaker.release()
+                LLM_CALLS.inc(outcome="deadline", client=breaker.name)
+                raise LLMUnavailable(f"LLM failed after {n + 1} attempt(s) ({reason}): {e}") from e
+            LLM_RETRIES.inc(reason=reason, client=breaker.name)
+            await asyncio.sleep(wait)
+            continue
+        breaker.success()
+        LLM_CALLS.inc(outcome="ok", client=breaker.name)
+        return result
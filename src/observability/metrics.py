@@ -0,0 +1,207 @@
+"""
+Minimal in-process metrics registry rendered in the Prometheus text format (GET /metrics).
+
+Counters / gauges / histograms are updated inline on the request path (a dict update
+under a lock). Values that already live elsewhere (cache stats, index size, batch
+histograms) are read at scrape time through `collector` callbacks, so there is a single
+source of truth and nothing to keep in sync.
+"""
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]  # (name suffix, labels, value)
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels) -> str:
+    items = labels.items() if isinstance(labels, dict) else labels
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}" if items else ""
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, object] = {}
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [("_total", dict(k), v) for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [("", dict(k), v) for k, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        k = _key(labels)
+        with self._lock:
+            counts, total = self._values.get(k, ([0] * (len(self.buckets) + 1), [0.0]))
+            i = next((j for j, b in enumerate(self.buckets) if value <= b), len(self.buckets))
+            counts[i] += 1
+            total[0] += value
+            self._values[k] = (counts, total)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(_key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = [(dict(k), list(c), t[0]) for k, (c, t) in self._values.items()]
+        out = []
+        for labels, counts, total in items:
+            out.extend(histogram_samples(labels, self.buckets, counts, total))
+        return out
+
+
+def histogram_samples(labels: Dict[str, str], bounds: Sequence[float], counts: Sequence[int], total: float) -> List[Sample]:
+    """Cumulative _bucket / _sum / _count samples from per-bucket counts (last = overflow)."""
+    out, running = [], 0
+    for bound, c in zip(bounds, counts):
+        running += c
+        out.append(("_bucket", {**labels, "le": _fmt_value(bound)}, running))
+    running += counts[len(bounds)] if len(counts) > len(bounds) else 0
+    out.append(("_bucket", {**labels, "le": "+Inf"}, running))
+    out.append(("_sum", labels, total))
+    out.append(("_count", labels, running))
+    return out
+
+
+# a collector yields (name, kind, help, samples) at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Collector] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, **kwargs)
+            return m
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def collector(self, key: str, fn: Collector):
+        """Register (or replace, by key) a scrape-time callback."""
+        with self._lock:
+            self._collectors[key] = fn
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        families = [(m.name, m.kind, m.help, m.samples()) for m in metrics]
+        for fn in collectors:
+            try:
+                families.extend(fn())
+            except Exception as e:  # a broken collector must not take /metrics down
+                families.append(("rag_metrics_collector_errors", "gauge", f"collector failed: {type(e).__name__}", [("", {}, 1)]))
+        lines = []
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_fmt_labels(labels)} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# pipeline-wide series (stage names: see src/observability/tracing.py)
+STAGE_SECONDS = REGISTRY.histogram("rag_stage_duration_seconds", "Latency of each /ask pipeline stage")
+STAGE_ERRORS = REGISTRY.counter("rag_stage_errors", "Exceptions raised inside a pipeline stage")
+REQUESTS = REGISTRY.counter("rag_requests", "HTTP requests to the answer endpoints by outcome")
+ANSWERS = REGISTRY.counter("rag_answers", "Answers by origin: llm, answer_cache, speculative, fallback (no hits), "
+                           "llm_unavailable")
+TENANT_INDEX = REGISTRY.counter("rag_tenant_index_requests", "Tenant index lookups: hit (resident), miss (loaded), error")
+TENANT_LOAD_SECONDS = REGISTRY.histogram("rag_tenant_index_load_seconds", "Time to load a cold tenant's index")
+TENANT_EVICTIONS = REGISTRY.counter("rag_tenant_index_evictions", "Tenant indexes dropped to stay within TENANT_INDEX_BUDGET_MB")
+SHED = REGISTRY.counter("rag_requests_shed", "Answer requests rejected before any work, by reason: rate_limited "
+                        "(429), queue_full / queue_timeout (503)")
+ADMISSION_WAIT = REGISTRY.histogram("rag_admission_wait_seconds", "Time admitted requests waited for a concurrency slot")
+LLM_CALLS = REGISTRY.counter("rag_llm_requests", "Chat completions by outcome: ok, error, deadline, circuit_open, no_client; "
+                             "client: main, speculative")
+LLM_RETRIES = REGISTRY.counter("rag_llm_retries", "LLM attempts retried, by reason (HTTP status or error type) and client")
+LLM_HEDGES = REGISTRY.counter("rag_llm_hedges", "Hedged LLM requests: sent, won_by_hedge, won_by_primary")
+LLM_BREAKER_STATE = REGISTRY.gauge("rag_llm_circuit_state", "LLM circuit breaker per client: 0 closed, 1 half-open, 2 open")
+LLM_MOCK_FALLBACKS = REGISTRY.counter("rag_llm_mock_fallbacks", "Times MistralLLMService answered with the mock response")
+LLM_TOKENS = REGISTRY.counter("rag_llm_tokens", "LLM tokens reported by the API (kind: prompt, completion; client)")
+PROMPT_TOKENS = REGISTRY.histogram("rag_prompt_tokens", "Prompt tokens per LLM call, counted locally (part: system, "
+                                   "context, context_raw = before packing, history, total)", buckets=TOKEN_BUCKETS)
+SPECULATIVE = REGISTRY.counter("rag_speculative", "Suggested follow-ups precomputed: started, then hit (asked), miss "
+                               "(something else asked), stale, wasted (done, never asked), cancelled, error")
+SPECULATIVE_SECONDS = REGISTRY.counter("rag_speculative_seconds", "Time spent precomputing follow-ups, by result: used, wasted")
+SESSION_EVENTS = REGISTRY.counter("rag_session_events", "Conversation sessions: created, resumed, expired, evicted, "
+                                  "condensed_llm / _concat (follow-up rewritten), compacted_llm / _extractive")
+
+
+def cache_family(prefix: str, stats_by_cache: Dict[str, Optional[dict]]):
+    """hits / misses / hit ratio / size families from the caches' stats() dicts."""
+    present = {name: s for name, s in stats_by_cache.items() if s}
+    yield (f"{prefix}_hits", "counter", "Cache hits", [("_total", {"cache": n}, s["hits"]) for n, s in present.items()])
+    yield (f"{prefix}_misses", "counter", "Cache misses", [("_total", {"cache": n}, s["misses"]) for n, s in present.items()])
+    yield (f"{prefix}_hit_ratio", "gauge", "hits / (hits + misses)", [("", {"cache": n}, s["hit_ratio"]) for n, s in present.items()])
+    yield (f"{prefix}_entries", "gauge", "Entries currently cached", [("", {"cache": n}, s["size"]) for n, s in present.items()])
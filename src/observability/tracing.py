@@ -0,0 +1,139 @@
+"""
+Per-request spans for the RAG pipeline.
+
+Every `span(stage)` feeds rag_stage_duration_seconds{stage} (and rag_stage_errors on an
+exception), whatever the trace mode. TRACE_MODE adds OpenTelemetry-style spans on top:
+
+    off   histograms only (default)
+    log   one JSON line per request on the "trace" logger: trace_id + spans with
+          span_id / parent_id / start offset / duration / attributes / status
+    otel  mirror the spans to the opentelemetry API (needs opentelemetry-api + an SDK /
+          exporter configured by the deployment); falls back to "log" when not installed
+
+Stages: request, ensure_index_local, index_load, embed, search, lexical, rerank, build_context, llm.
+"""
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from src.config import Config
+from src.observability.metrics import STAGE_ERRORS, STAGE_SECONDS
+
+logger = logging.getLogger("trace")
+_current: contextvars.ContextVar = contextvars.ContextVar("rag_span", default=None)
+_mode: Optional[str] = None
+_otel_tracer = None
+
+
+def _trace_mode() -> str:
+    global _mode, _otel_tracer
+    if _mode is None:
+        mode = (Config.TRACE_MODE or "off").lower()
+        if mode == "otel":
+            try:
+                from opentelemetry import trace
+
+                _otel_tracer = trace.get_tracer("rag")
+            except ImportError:
+                logger.warning("TRACE_MODE=otel but opentelemetry is not installed; logging spans instead")
+                mode = "log"
+        _mode = mode if mode in {"off", "log", "otel"} else "off"
+    return _mode
+
+
+def set_trace_mode(mode: str):
+    """Switch TRACE_MODE at runtime (tests, debugging a live worker)."""
+    global _mode
+    Config.TRACE_MODE, _mode = mode, None
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attrs", "status", "t0", "duration", "children", "_otel")
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict):
+        self.name, self.parent, self.attrs = name, parent, dict(attrs)
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.status = "ok"
+        self.t0 = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.children: List["Span"] = []
+        self._otel = None
+        if parent is not None:
+            parent.children.append(self)
+        if _trace_mode() == "otel" and _otel_tracer is not None:
+            from opentelemetry import trace
+
+            ctx = trace.set_span_in_context(parent._otel) if parent is not None and parent._otel else None
+            self._otel = _otel_tracer.start_span(name, context=ctx, attributes=_otel_attrs(self.attrs))
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.t0
+        STAGE_SECONDS.observe(self.duration, stage=self.name)
+        if error is not None:
+            self.status = f"error: {type(error).__name__}"
+            STAGE_ERRORS.inc(stage=self.name)
+        if self._otel is not None:
+            self._otel.set_attributes(_otel_attrs(self.attrs))
+            if error is not None:
+                self._otel.record_exception(error)
+            self._otel.end()
+        elif self.parent is None and _trace_mode() == "log":
+            logger.info(json.dumps(self.to_dict(), ensure_ascii=False, default=str))
+
+    def to_dict(self, root_t0: Optional[float] = None) -> Dict:
+        root_t0 = self.t0 if root_t0 is None else root_t0
+        out = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "start_ms": round((self.t0 - root_t0) * 1000, 2),
+            "duration_ms": round((self.duration or 0.0) * 1000, 2),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+        if self.parent is None:
+            out["trace_id"] = self.trace_id
+        if self.children:
+            out["children"] = [c.to_dict(root_t0) for c in self.children]
+        return out
+
+
+def _otel_attrs(attrs: Dict) -> Dict:
+    return {k: v if isinstance(v, (str, bool, int, float)) else str(v) for k, v in attrs.items()}
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, **attrs) -> Span:
+    """A span under the current one that is NOT made current: for work that spans `yield`s."""
+    return Span(name, _current.get(), attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage; nested `span`s in the same task become its children."""
+    s = Span(name, _current.get(), attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.end(error=e)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:  # an async generator finalized from another context
+            pass
+        s.end()
@@ -0,0 +1,213 @@
+"""
+Admission control for the answer endpoints (/ask, /ask/stream).
+
+    RateLimiter         token bucket per client (API key from API_KEYS, else IP): RATE_LIMIT_RPS
+                        refill, RATE_LIMIT_BURST capacity; over it -> 429 + Retry-After
+    ConcurrencyLimiter  at most MAX_CONCURRENT_REQUESTS answers in flight, ADMISSION_QUEUE_SIZE more
+                        waiting (FIFO) up to ADMISSION_QUEUE_TIMEOUT_S; a full queue or an expired
+                        wait -> 503 + Retry-After right away instead of a request that times out
+
+Both reject before any work is done (no thread, no embedding, no LLM call). In-flight and
+queued counts are exported at scrape time, shed requests as rag_requests_shed_total, so an
+autoscaler can key off queue depth.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional
+
+from src.observability.metrics import ADMISSION_WAIT, SHED
+
+
+class Rejected(Exception):
+    """The request is not admitted: HTTP `status` with a Retry-After of `retry_after` seconds."""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(f"{reason}: retry after {retry_after:.1f}s")
+        self.status, self.reason = status, reason
+        self.retry_after = max(1, math.ceil(retry_after))  # Retry-After takes whole seconds
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by client id, `rate` tokens/s up to `burst`; rate <= 0 = off.
+    Only the `max_clients` most recently seen clients are tracked (an evicted one starts full).
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate, self.burst = float(rate), max(1.0, float(burst))
+        self.max_clients = max(1, int(max_clients))
+        self.clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # id -> [tokens, last refill]
+
+    def acquire(self, client: str, rate: Optional[float] = None, burst: Optional[float] = None) -> float:
+        """Take a token for `client`: 0 when allowed, else seconds until one is available."""
+        rate = self.rate if rate is None else rate
+        burst = self.burst if burst is None else max(1.0, burst)
+        if rate <= 0:
+            return 0.0
+        now = self.clock()
+        bucket = self._buckets.pop(client, None) or [burst, now]
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        self._buckets[client] = bucket
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    """
+    `limit` concurrent holders (<= 0 = unlimited) and a FIFO of at most `queue` waiters.
+    A released slot goes straight to the oldest waiter. Retry-After hints come from an
+    average of how long a slot is held.
+    """
+
+    def __init__(self, limit: int, queue: int, timeout: float):
+        self.limit, self.queue, self.timeout = int(limit), max(0, int(queue)), float(timeout)
+        self.active = 0
+        self._waiters: deque = deque()
+        self._held_s = 1.0  # EWMA of slot hold time
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        """Rough time until a newcomer would get a slot: the queue ahead drained by `limit` holders."""
+        return self._held_s * (self.waiting + 1) / max(1, self.limit)
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns seconds spent queued. Raises Rejected when shedding."""
+        if self.limit <= 0 or (self.active < self.limit and not self._waiters):
+            self.active += 1
+            return 0.0
+        if len(self._waiters) >= self.queue:
+            raise Rejected(503, "queue_full", self.retry_after())
+        t0 = time.perf_counter()
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, self.timeout if self.timeout > 0 else None)
+        except asyncio.TimeoutError:
+            raise Rejected(503, "queue_timeout", self.retry_after()) from None
+        except BaseException:
+            if fut.done() and not fut.cancelled():  # handed a slot, then cancelled: pass it on
+                self.release(held=0.0)
+            raise
+        finally:
+            if fut in self._waiters:
+                self._waiters.remove(fut)
+        return time.perf_counter() - t0
+
+    def release(self, held: Optional[float] = None):
+        if held:
+            self._held_s = 0.8 * self._held_s + 0.2 * held
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # the slot moves to the waiter: `active` is unchanged
+                return
+        self.active = max(0, self.active - 1)
+
+
+class Slot:
+    """One admitted request's concurrency slot; `release()` is idempotent (streams release it twice)."""
+
+    def __init__(self, limiter: ConcurrencyLimiter):
+        self.limiter, self.started, self.released = limiter, time.perf_counter(), False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.limiter.release(held=time.perf_counter() - self.started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def parse_api_keys(spec: str) -> Dict[str, Optional[float]]:
+    """API_KEYS "key1,key2:20" -> {"key1": None (default key rate), "key2": 20.0}."""
+    keys = {}
+    for item in (spec or "").split(","):
+        key, _, rate = item.strip().partition(":")
+        if key:
+            keys[key] = float(rate) if rate else None
+    return keys
+
+
+class AdmissionController:
+    """
+    Rate limit, then a concurrency slot: `with await controller.enter(client_ip, api_key, endpoint): ...`.
+    Clients are told apart by API key when it is one of `api_keys` (unknown keys count as
+    their IP, so a made-up key can't buy a fresh bucket), else by IP.
+    """
+
+    def __init__(self, limiter: ConcurrencyLimiter, rates: RateLimiter, api_keys: Dict[str, Optional[float]],
+                 key_rate: float, key_burst: float):
+        self.limiter, self.rates = limiter, rates
+        self.api_keys, self.key_rate, self.key_burst = api_keys, key_rate, key_burst
+        self.counts = {"admitted": 0, "rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def client_id(self, ip: str, api_key: Optional[str]) -> str:
+        return f"key:{api_key}" if api_key and api_key in self.api_keys else f"ip:{ip}"
+
+    def check_rate(self, ip: str, api_key: Optional[str], endpoint: str):
+        client = self.client_id(ip, api_key)
+        if client.startswith("key:"):
+            rate = self.api_keys[api_key]
+            wait = self.rates.acquire(client, self.key_rate if rate is None else rate, self.key_burst)
+        else:
+            wait = self.rates.acquire(client)
+        if wait > 0:
+            self._shed(endpoint, "rate_limited")
+            raise Rejected(429, "rate_limited", wait)
+
+    async def enter(self, ip: str, api_key: Optional[str], endpoint: str) -> "Slot":
+        """Admit one request (rate limit, then a slot); the caller must `release()` the returned slot."""
+        self.check_rate(ip, api_key, endpoint)
+        try:
+            waited = await self.limiter.acquire()
+        except Rejected as e:
+            self._shed(endpoint, e.reason)
+            raise
+        ADMISSION_WAIT.observe(waited, endpoint=endpoint)
+        self.counts["admitted"] += 1
+        return Slot(self.limiter)
+
+    def _shed(self, endpoint: str, reason: str):
+        self.counts[reason] += 1
+        SHED.inc(endpoint=endpoint, reason=reason)
+
+    def stats(self) -> dict:
+        return {"in_flight": self.limiter.active, "queued": self.limiter.waiting, "limit": self.limiter.limit,
+                "queue_size": self.limiter.queue, "clients_tracked": len(self.rates), **self.counts}
+
+    def collect(self):
+        yield ("rag_admission_in_flight", "gauge", "Answer requests holding a concurrency slot",
+               [("", {}, self.limiter.active)])
+        yield ("rag_admission_queue_depth", "gauge", "Answer requests waiting for a concurrency slot",
+               [("", {}, self.limiter.waiting)])
+        yield ("rag_admission_limit", "gauge", "Concurrency slots (MAX_CONCURRENT_REQUESTS, 0 = unlimited)",
+               [("", {}, self.limiter.limit)])
+
+
+def from_config(config) -> AdmissionController:
+    return AdmissionController(
+        ConcurrencyLimiter(config.MAX_CONCURRENT_REQUESTS, config.ADMISSION_QUEUE_SIZE,
+                           config.ADMISSION_QUEUE_TIMEOUT_S),
+        RateLimiter(config.RATE_LIMIT_RPS, config.RATE_LIMIT_BURST, config.RATE_LIMIT_MAX_CLIENTS),
+        parse_api_keys(config.API_KEYS), config.API_KEY_RATE_LIMIT_RPS, config.API_KEY_RATE_LIMIT_BURST,
+    )
@@ -0,0 +1,118 @@
+"""
+Server-side conversation state for /ask sessions (client sends a `session_id`).
+
+A session is a small JSON-serializable dict:
+
+    {"summary": "...",                       # earlier turns, compacted (src/llm/history.py)
+     "turns": [{"n": 3, "q": "...", "query": "...", "a": "..."}, ...],   # recent turns verbatim
+     "next": 4}                              # number of the next turn
+
+Backends (SESSION_STORE), both expiring a session SESSION_TTL_S after its last turn:
+
+    memory  MemorySessionStore: per-process dict, LRU-capped at SESSION_MAX sessions
+    redis   RedisSessionStore: one JSON value per session with an expiry (SETEX), shared by
+            every worker; SESSION_REDIS_URL (needs `redis`), or any client with async
+            get / set(ex=) / delete such as benchmarks/fake_redis.py
+"""
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from src.observability.metrics import SESSION_EVENTS
+
+SESSION_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._:-]{0,127}$")
+
+
+def validate_session_id(session_id: str) -> str:
+    """The client's session id, if it is usable as a store key (a UUID fits)."""
+    if not isinstance(session_id, str) or not SESSION_ID.match(session_id):
+        raise ValueError(f"invalid session id {session_id!r}: use 1-128 of A-Z, a-z, 0-9, '.', ':', '-' and '_'")
+    return session_id
+
+
+def new_session() -> dict:
+    return {"summary": "", "turns": [], "next": 0}
+
+
+def add_turn(state: dict, question: str, query: str, answer: str) -> dict:
+    turn = {"n": state["next"], "q": question, "query": query, "a": answer}
+    state["turns"].append(turn)
+    state["next"] += 1
+    return turn
+
+
+def fold(state: dict, upto: int, summary: str) -> dict:
+    """Replace turns numbered < `upto` by `summary` (turns added meanwhile are kept)."""
+    state["turns"] = [t for t in state["turns"] if t["n"] >= upto]
+    state["summary"] = summary
+    return state
+
+
+class MemorySessionStore:
+    """Sessions in this process: lost on restart and not shared between workers."""
+
+    provider = "memory"
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.ttl, self.max_sessions, self.clock = float(ttl), max(1, int(max_sessions)), clock
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires at, state json)
+
+    async def get(self, key: str) -> Optional[dict]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] <= self.clock():
+            del self._data[key]
+            SESSION_EVENTS.inc(event="expired")
+            return None
+        self._data.move_to_end(key)
+        return json.loads(item[1])  # a copy: callers mutate it and `put` it back
+
+    async def put(self, key: str, state: dict):
+        self._data[key] = (self.clock() + self.ttl, json.dumps(state, ensure_ascii=False))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_sessions:
+            self._data.popitem(last=False)
+            SESSION_EVENTS.inc(event="evicted")
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisSessionStore:
+    """Sessions in Redis under `prefix` + key; the expiry is refreshed on every write."""
+
+    provider = "redis"
+
+    def __init__(self, client, ttl: float = 1800.0, prefix: str = "rag:session:"):
+        self.client, self.ttl, self.prefix = client, max(1, int(ttl)), prefix
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def put(self, key: str, state: dict):
+        await self.client.set(self.prefix + key, json.dumps(state, ensure_ascii=False), ex=self.ttl)
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+
+def make_session_store(kind: str, *, ttl: float, max_sessions: int = 10000, redis_url: str = ""):
+    kind = (kind or "memory").lower()
+    if kind == "memory":
+        return MemorySessionStore(ttl=ttl, max_sessions=max_sessions)
+    if kind == "redis":
+        try:
+            import redis.asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("SESSION_STORE=redis needs the redis package: pip install redis") from e
+        if not redis_url:
+            raise RuntimeError("SESSION_STORE=redis needs SESSION_REDIS_URL (e.g. redis://localhost:6379/0)")
+        return RedisSessionStore(aioredis.from_url(redis_url), ttl=ttl)
+    raise ValueError(f"unknown SESSION_STORE {kind!r}; expected memory or redis")
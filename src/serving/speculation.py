@@ -0,0 +1,156 @@
+"""
+Speculative follow-ups: every answer ends with suggested questions (src/llm/prompts.py), and
+visitors often click or retype one. While they read, the service works on the suggestions
+of the session's last answer in the background, so that turn is answered from the result.
+
+    Speculator.start(scope, questions, work)   after an answer: replaces the scope's previous
+                                               speculation; `work(question)` runs at most
+                                               `concurrency` at a time across all scopes
+    Speculator.take(scope, question, version)  at the next question: the result when it is
+                                               one of them (same words, case and punctuation
+                                               aside, or nearly), else None; the others are
+                                               cancelled or, if already done, wasted
+
+A result older than `ttl` or computed on another index `version` is not used. Outcomes go to
+rag_speculative_total (started, hit, miss, stale, wasted, cancelled, error) and the compute
+time to rag_speculative_seconds_total (result: used, wasted).
+"""
+import asyncio
+import contextvars
+import difflib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.observability.metrics import SPECULATIVE, SPECULATIVE_SECONDS
+
+MODES = ("off", "retrieval", "answer")
+_WORD = re.compile(r"\w+")
+logger = logging.getLogger("speculation")
+
+
+def normalize(question: str) -> str:
+    return " ".join(_WORD.findall(question.lower()))
+
+
+class _Entry:
+    __slots__ = ("question", "created", "began", "seconds", "task")
+
+    def __init__(self, question: str, created: float):
+        self.question, self.created = question, created
+        self.began: Optional[float] = None  # when it got a concurrency slot
+        self.seconds: Optional[float] = None  # compute time, once finished
+        self.task: Optional[asyncio.Task] = None
+
+    def elapsed(self) -> float:
+        if self.seconds is not None:
+            return self.seconds
+        return time.perf_counter() - self.began if self.began is not None else 0.0
+
+
+class Speculator:
+    def __init__(self, concurrency: int = 2, ttl: float = 300.0, max_scopes: int = 1000, similarity: float = 0.9,
+                 clock: Callable[[], float] = time.monotonic):
+        self.concurrency, self.ttl, self.max_scopes = max(1, int(concurrency)), float(ttl), max(1, int(max_scopes))
+        self.similarity, self.clock = similarity, clock
+        self._slots: Optional[asyncio.Semaphore] = None  # made in the serving loop (again if that changes)
+        self._loop = None
+        self._scopes: "OrderedDict[str, Dict[str, _Entry]]" = OrderedDict()
+
+    def start(self, scope: str, questions: List[str], work: Callable[[str], Awaitable[Optional[dict]]]) -> int:
+        """Speculate on `questions` for `scope` (in fresh contexts: no request deadline or span); how many."""
+        self._drop(scope)
+        now = self.clock()
+        while self._scopes:  # scopes are in start order: sweep the ones nobody came back to
+            oldest = next(iter(self._scopes))
+            if len(self._scopes) < self.max_scopes and not self._expired(self._scopes[oldest], now):
+                break
+            self._drop(oldest)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._slots, self._loop = asyncio.Semaphore(self.concurrency), loop
+        entries: Dict[str, _Entry] = {}
+        for question in questions:
+            key = normalize(question)
+            if not key or key in entries:
+                continue
+            entry = entries[key] = _Entry(question, now)
+            entry.task = asyncio.create_task(self._run(entry, work), context=contextvars.Context())
+            SPECULATIVE.inc(outcome="started")
+        if entries:
+            self._scopes[scope] = entries
+        return len(entries)
+
+    async def _run(self, entry: _Entry, work) -> Optional[dict]:
+        async with self._slots:
+            entry.began = time.perf_counter()
+            try:
+                return await work(entry.question)
+            except Exception:
+                SPECULATIVE.inc(outcome="error")
+                logger.exception("speculative follow-up failed")
+                return None
+            finally:
+                entry.seconds = time.perf_counter() - entry.began
+
+    def _match(self, entries: Dict[str, _Entry], question: str) -> Optional[_Entry]:
+        key = normalize(question)
+        if key in entries:
+            return entries[key]
+        ratio, best = max(((difflib.SequenceMatcher(None, key, k).ratio(), k) for k in entries), default=(0.0, None))
+        return entries[best] if best is not None and ratio >= self.similarity else None
+
+    async def take(self, scope: str, question: str, version: Optional[str] = None) -> Optional[dict]:
+        """The precomputed result for `question` (waiting for it if it is still running), else None."""
+        entries = self._scopes.pop(scope, None)
+        if not entries:
+            return None  # nothing was speculated: neither a hit nor a miss
+        entry = self._match(entries, question)
+        for other in entries.values():
+            if other is not entry:
+                self._waste(other)
+        if entry is None or self.clock() - entry.created > self.ttl:
+            SPECULATIVE.inc(outcome="miss")
+            if entry is not None:
+                self._waste(entry)
+            return None
+        result = await entry.task
+        if result is None or (version is not None and result.get("version") != version):
+            SPECULATIVE.inc(outcome="miss" if result is None else "stale")
+            SPECULATIVE_SECONDS.inc(entry.elapsed(), result="wasted")
+            return None
+        SPECULATIVE.inc(outcome="hit")
+        SPECULATIVE_SECONDS.inc(entry.elapsed(), result="used")
+        return result
+
+    def _expired(self, entries: Dict[str, _Entry], now: float) -> bool:
+        return all(now - e.created > self.ttl for e in entries.values())
+
+    def _waste(self, entry: _Entry):
+        if entry.task.done():
+            SPECULATIVE.inc(outcome="wasted")
+        else:
+            entry.task.cancel()
+            SPECULATIVE.inc(outcome="cancelled")
+        SPECULATIVE_SECONDS.inc(entry.elapsed(), result="wasted")
+
+    def _drop(self, scope: str):
+        for entry in (self._scopes.pop(scope, None) or {}).values():
+            self._waste(entry)
+
+    def pending(self) -> List[asyncio.Task]:
+        return [e.task for entries in self._scopes.values() for e in entries.values() if not e.task.done()]
+
+    async def settle(self):
+        """Wait until the running speculation is done (tests, benchmarks)."""
+        await asyncio.gather(*self.pending(), return_exceptions=True)
+
+    def cancel(self):
+        """Stop everything (app shutdown): nobody is going to ask."""
+        for scope in list(self._scopes):
+            self._drop(scope)
+
+    def stats(self) -> dict:
+        return {"scopes": len(self._scopes), "running": len(self.pending()), "concurrency": self.concurrency}
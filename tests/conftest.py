@@ -14,6 +14,27 @@ DEFAULT_TIMEOUT = int(os.getenv("TEST_REQUEST_TIMEOUT", "45"))  # antes: 15
 def api_url():
     return API_URL
 
+@pytest.fixture
+def stub_rag(tmp_path, monkeypatch):
+    """rag wired to a local stub Mistral API and a toy index in tmp_path (offline unit tests)."""
+    import rag
+    from src.config import Config
+    from benchmarks.common import build_toy_index
+    from benchmarks.stub_mistral import StubMistralServer
+
+    build_toy_index(tmp_path, n_chunks=50)
+    stub = StubMistralServer(embed_latency=0.3)
+    stub.start()
+    monkeypatch.setattr(Config, "MISTRAL_SERVER_URL", stub.url)
+    monkeypatch.setattr(Config, "LLM_API_KEY", "stub-key")
+    monkeypatch.setattr(rag, "INDEX_PATH", tmp_path / "faiss.index")
+    monkeypatch.setattr(rag, "META_PATH", tmp_path / "meta.json")
+    for name in ("_client", "_qembed", "_llm", "_spec_llm", "_index", "_meta", "_chunks", "_lexical", "_qcache", "_ebatch", "_sbatch", "_acache", "_reranker", "_index_error", "_tenants", "_sessions", "_speculator"):
+        monkeypatch.setattr(rag, name, None)
+    monkeypatch.setattr(rag, "_index_version", "")
+    yield stub
+    stub.stop()
+
 def looks_like_api_key(text: str) -> bool:
     return bool(re.search(r"\b(sk|rk|pk)_[A-Za-z0-9]{16,}\b", text or ""))
 
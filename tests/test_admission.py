@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from src.observability.metrics import SHED
+from src.serving.admission import (AdmissionController, ConcurrencyLimiter, RateLimiter, Rejected,
+                                   parse_api_keys)
+
+
+def test_token_bucket_refills_and_forgets_old_clients():
+    now = [0.0]
+    rates = RateLimiter(rate=2, burst=2, max_clients=2, clock=lambda: now[0])
+    assert rates.acquire("a") == 0 and rates.acquire("a") == 0
+    assert rates.acquire("a") == pytest.approx(0.5)
+    now[0] = 0.5
+    assert rates.acquire("a") == 0
+    rates.acquire("b"), rates.acquire("c")
+    assert len(rates) == 2 and "a" not in rates._buckets  # least recently seen
+    assert RateLimiter(rate=0, burst=1).acquire("a") == 0  # off
+
+
+def test_queue_hands_slots_over_in_order_and_sheds_when_full():
+    limiter = ConcurrencyLimiter(limit=1, queue=1, timeout=0.2)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        with pytest.raises(Rejected) as full:
+            await limiter.acquire()
+        limiter.release(held=0.1)
+        await waiter
+        assert limiter.active == 1 and limiter.waiting == 0
+        with pytest.raises(Rejected) as late:
+            await limiter.acquire()  # nobody releases within the timeout
+        limiter.release()
+        return full.value, late.value
+
+    full, late = asyncio.run(run())
+    assert (full.status, full.reason, late.reason) == (503, "queue_full", "queue_timeout")
+    assert full.retry_after >= 1 and limiter.active == 0
+
+
+@pytest.fixture
+def client(stub_rag, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(tmp_path))
+
+    def admission(limit=4, queue=0, rps=0.0, keys=""):
+        controller = AdmissionController(ConcurrencyLimiter(limit, queue, 1.0), RateLimiter(rps, 1),
+                                         parse_api_keys(keys), key_rate=rps, key_burst=2)
+        monkeypatch.setattr(app_module, "_admission", controller)
+        return controller
+
+    return TestClient(app_module.app), admission
+
+
+def test_rate_limit_per_ip_and_per_known_key(client):
+    http, admission = client
+    admission(rps=0.01, keys="partner")
+    q = {"question": "What projects has Erika built?"}
+    assert http.post("/ask", json=q).status_code == 200
+    r = http.post("/ask", json=q)
+    assert r.status_code == 429 and int(r.headers["Retry-After"]) >= 1
+    assert http.post("/ask", json=q, headers={"X-API-Key": "made-up"}).status_code == 429  # counts as the IP
+    assert http.post("/ask", json=q, headers={"X-API-Key": "partner"}).status_code == 200
+    assert http.post("/ask", json=q, headers={"X-API-Key": "partner"}).status_code == 200  # key burst 2
+
+
+def test_full_queue_sheds_with_503_and_streams_release_their_slot(client):
+    http, admission = client
+    controller = admission(limit=1, queue=0)
+    before = SHED.value(endpoint="/ask/stream", reason="queue_full")
+    assert http.post("/ask/stream", json={"question": "Hello"}).status_code == 200
+    assert controller.limiter.active == 0
+
+    controller.limiter.active = 1  # a request in flight
+    r = http.post("/ask/stream", json={"question": "Hello"})
+    assert r.status_code == 503 and "Retry-After" in r.headers
+    assert SHED.value(endpoint="/ask/stream", reason="queue_full") == before + 1
+    text = http.get("/metrics").text
+    assert "rag_admission_in_flight 1" in text and "rag_admission_queue_depth 0" in text
@@ -0,0 +1,38 @@
+import faiss
+import numpy as np
+import pytest
+
+from src.index.ann import apply_search_params, build_index
+
+
+def _kind(index: faiss.Index) -> str:
+    if faiss.try_extract_index_ivf(index) is not None:
+        return "ivf_pq" if "PQ" in type(faiss.downcast_index(index)).__name__ else "ivf_flat"
+    return "hnsw" if hasattr(faiss.downcast_index(index), "hnsw") else "flat"
+
+
+@pytest.fixture(scope="module")
+def data():
+    x = np.random.default_rng(0).standard_normal((3000, 32)).astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+@pytest.mark.parametrize("kind", ["flat", "hnsw", "ivf_flat"])
+def test_index_types_find_the_exact_vector(data, kind):
+    index, params = build_index(data, kind)
+    assert params["type"] == kind and _kind(index) == kind
+    apply_search_params(index, ef_search=128, nprobe=64)
+    _, ids = index.search(data[:20], 1)
+    assert (ids[:, 0] == np.arange(20)).mean() >= 0.95
+
+
+def test_search_params_survive_serialization(data):
+    index, _ = build_index(data, "ivf_flat", nlist=16)
+    loaded = faiss.deserialize_index(faiss.serialize_index(index))
+    assert apply_search_params(loaded, nprobe=4) == {"nprobe": 4}
+
+
+def test_small_corpus_falls_back_to_flat(data):
+    index, params = build_index(data[:100], "ivf_pq", pq_m=8)
+    assert params == {"type": "flat"} and index.ntotal == 100
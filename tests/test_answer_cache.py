@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.cache.answer_cache import SemanticAnswerCache
+
+
+def _unit(v):
+    v = np.asarray(v, dtype="float32")
+    return v / np.linalg.norm(v)
+
+
+def test_near_duplicate_hits_within_scope_only():
+    c = SemanticAnswerCache(threshold=0.95)
+    q = _unit([1, 0, 0, 0])
+    c.store(q, "en", "v1", "What projects has Erika built?", "EyeSense, SecureMed", [{"source": "projects"}])
+
+    near = _unit([1, 0.1, 0, 0])                 # cos ~0.995
+    hit = c.lookup(near, "en", "v1")
+    assert hit["answer"] == "EyeSense, SecureMed" and hit["citations"] == [{"source": "projects"}]
+    assert c.lookup(near, "pt", "v1") is None    # other language
+    assert c.lookup(near, "en", "v2") is None    # other index version
+    assert c.lookup(_unit([0, 1, 0, 0]), "en", "v1") is None
+
+
+def test_size_bound_and_invalidation():
+    c = SemanticAnswerCache(threshold=0.99, max_entries=2)
+    vecs = [_unit(np.eye(4)[i]) for i in range(3)]
+    for i, v in enumerate(vecs):
+        c.store(v, "en", "v1", f"q{i}", f"a{i}", [])
+    assert c.lookup(vecs[0], "en", "v1") is None  # evicted (oldest)
+    assert c.lookup(vecs[2], "en", "v1")["answer"] == "a2"
+    for i, v in enumerate(vecs[:2]):
+        c.store(v, "pt", "v1", f"q{i}", f"a{i}", [])
+    assert c.stats()["scopes"] == 1  # every "en" entry was evicted, and its index with them
+    c.invalidate()
+    assert c.lookup(vecs[2], "en", "v1") is None
+    assert c.stats()["size"] == 0
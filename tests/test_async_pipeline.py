@@ -0,0 +1,39 @@
+import asyncio
+
+import rag
+from benchmarks.stub_mistral import STUB_ANSWER
+
+
+def test_answer_uses_async_client_end_to_end(stub_rag):
+    text, cites = asyncio.run(rag.answer("What projects has Erika built?"))
+    assert text == STUB_ANSWER
+    assert cites and cites[0]["source"]
+    assert any(p.endswith("/embeddings") for p in stub_rag.calls)
+    assert any(p.endswith("/chat/completions") for p in stub_rag.calls)
+
+
+def test_embedding_does_not_block_event_loop(stub_rag):
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        await rag.retrieve("Which tools does Erika use?")
+        t.cancel()
+        return ticks
+
+    # embed latency is 0.3s: a blocking call would leave the ticker at ~0
+    assert asyncio.run(scenario()) >= 10
+
+
+def test_repeated_question_is_served_from_answer_cache(stub_rag):
+    asyncio.run(rag.answer("What projects has Erika built?"))
+    asyncio.run(rag.answer("what projects has Erika built"))
+    assert sum(n for p, n in stub_rag.calls.items() if p.endswith("/chat/completions")) == 1
+    rag._set_index_version("new-index")
+    assert rag.answer_cache_stats()["size"] == 0
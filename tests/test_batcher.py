@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import rag
+from src.config import Config
+from src.embedding.batcher import MicroBatcher, SizeHistogram
+
+
+def test_size_histogram_buckets():
+    h = SizeHistogram(bounds=(1, 4, 16))
+    for n in (1, 1, 3, 16, 40):
+        h.observe(n)
+    snap = h.snapshot()
+    assert snap["buckets"] == {"1": 2, "4": 1, "16": 1, "+Inf": 1}
+    assert snap["batches"] == 5 and snap["items"] == 61
+
+
+def test_micro_batcher_coalesces_and_fans_out():
+    calls = []
+
+    async def double(items):
+        calls.append(list(items))
+        await asyncio.sleep(0.01)
+        return [2 * x for x in items]
+
+    async def main():
+        b = MicroBatcher(double, window_s=0.02, max_batch=4)
+        out = await asyncio.gather(*(b.submit(i) for i in range(10)))
+        return b, out
+
+    b, out = asyncio.run(main())
+    assert out == [2 * i for i in range(10)]
+    assert [len(c) for c in calls] == [4, 4, 2]
+    assert b.stats()["buckets"]["4"] == 2 and b.stats()["buckets"]["2"] == 1
+
+
+def test_micro_batcher_propagates_errors_to_every_caller():
+    async def boom(items):
+        raise RuntimeError("upstream 503")
+
+    async def main():
+        b = MicroBatcher(boom, window_s=0.0, max_batch=8)
+        return await asyncio.gather(*(b.submit(i) for i in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(main()))
+
+
+def test_micro_batcher_holds_its_running_batches():
+    release = asyncio.Event()
+
+    async def wait(items):
+        await release.wait()
+        return items
+
+    async def main():
+        b = MicroBatcher(wait, window_s=0.0, max_batch=2)
+        pending = asyncio.gather(*(b.submit(i) for i in range(3)))
+        await asyncio.sleep(0.01)
+        running = len(b._tasks)
+        release.set()
+        out = await pending
+        await asyncio.sleep(0)
+        return running, out, len(b._tasks)
+
+    assert asyncio.run(main()) == (2, [0, 1, 2], 0)
+
+
+def test_concurrent_retrieves_share_one_embedding_call_and_one_search(stub_rag):
+    questions = [f"What did Erika build? #{i}" for i in range(12)] + ["What did Erika build? #0"]
+
+    async def main():
+        await rag.retrieve("warm up")  # index load + client init
+        before = stub_rag.calls.get("/v1/embeddings", 0)
+        hits = await asyncio.gather(*(rag.retrieve(q) for q in questions))
+        return hits, stub_rag.calls.get("/v1/embeddings", 0) - before
+
+    hits, embed_calls = asyncio.run(main())
+    assert embed_calls == 1
+    assert all(len(h) == Config.TOP_K for h in hits) and hits[0] == hits[-1]
+    stats = rag.batching_stats()
+    assert stats["embed"]["buckets"]["16"] == 1   # 13 questions -> one batch
+    assert stats["search"]["items"] == 14 and stats["search"]["batches"] == 2
+
+
+def test_batched_search_matches_single_search(stub_rag):
+    asyncio.run(rag.retrieve("warm up"))
+    vecs = [np.asarray(v, dtype="float32") for v in np.random.default_rng(0).standard_normal((6, 1024))]
+
+    async def main():
+        return await rag._search_many([(rag._index, v, 3 + i % 3) for i, v in enumerate(vecs)])
+
+    for i, (scores, ids) in enumerate(asyncio.run(main())):
+        ref_scores, ref_ids = rag._index.search(vecs[i].reshape(1, -1), 3 + i % 3)
+        assert ids.tolist() == ref_ids[0].tolist()
+        assert scores == pytest.approx(ref_scores[0], rel=1e-5)
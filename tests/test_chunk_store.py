@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+import rag
+from benchmarks.common import build_toy_index
+from src.config import Config
+from src.index.chunk_store import ChunkStore, write_chunk_store
+
+
+def test_round_trip_unicode_and_sources(tmp_path):
+    texts = ["Olá, análise de dados 📊", "", "FAISS + Mistral"]
+    write_chunk_store(tmp_path / "chunks.bin", texts, ["cv.pdf", None, "projects.md"])
+    store = ChunkStore(tmp_path / "chunks.bin")
+    assert len(store) == 3
+    assert [store.text(i) for i in range(3)] == texts
+    assert [store.source(i) for i in range(3)] == ["cv.pdf", None, "projects.md"]
+    store.close()
+
+
+def test_rejects_foreign_file(tmp_path):
+    (tmp_path / "x.bin").write_bytes(b"not a chunk store at all")
+    with pytest.raises(ValueError):
+        ChunkStore(tmp_path / "x.bin")
+
+
+@pytest.mark.parametrize("chunk_store", [True, False])
+def test_rag_retrieves_from_either_layout(stub_rag, tmp_path, chunk_store):
+    build_toy_index(tmp_path, n_chunks=30, chunk_store=chunk_store)
+    hits = asyncio.run(rag.retrieve("What projects has Erika built?"))
+    assert len(hits) == Config.TOP_K
+    assert all(h["text"].startswith("Chunk ") for h in hits)
+    if chunk_store:
+        assert all(h["source"].startswith("docs/toy_") for h in hits)
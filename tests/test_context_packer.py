@@ -0,0 +1,73 @@
+import asyncio
+import importlib.util
+
+import pytest
+
+import rag
+from src.config import Config
+from src.llm.context_packer import merge_hits, pack_context
+from src.llm.tokens import EstimateCounter, make_token_counter
+
+TEXT = " ".join(f"Sentence number {i} describes one more project Erika delivered." for i in range(12))
+count = EstimateCounter().count
+
+
+def _windows(s: str, size: int, overlap: int):
+    """ingest_mistral.chunk_text: fixed character windows, stripped."""
+    return [s[i:i + size].strip() for i in range(0, len(s), size - overlap)]
+
+
+def test_overlapping_neighbours_are_stitched_once():
+    chunks = _windows(TEXT, 200, 60)
+    hits = [{"text": chunks[i], "source": "cv.md", "id": 10 + i} for i in (2, 1, 3)]  # ranked 2, 1, 3
+    [passage] = merge_hits(hits)
+    assert passage["ids"] == [11, 12, 13] and passage["rank"] == 0
+    assert passage["text"] == TEXT[140:620].strip()  # chunks 1-3 are TEXT[140:340], [280:480], [420:620]
+
+
+def test_sentences_repeated_across_sources_are_dropped():
+    a = "Erika built a FAISS retrieval service. It answers portfolio questions."
+    b = "Intro line here. Erika built a FAISS retrieval service. Something new."
+    context, used, stats = pack_context([{"text": a, "source": "cv.md"}, {"text": b, "source": "cv.pdf"}], count)
+    assert context.count("FAISS retrieval service") == 1 and stats["dropped_sentences"] == 1
+    assert [p["source"] for p in used] == ["cv.md", "cv.pdf"]
+
+
+def test_budget_packs_greedily_and_keeps_the_best_hit():
+    long = " ".join(f"Part {i} of a long passage that will not fit in the budget." for i in range(8))
+    hits = [{"text": "Best hit about dbt.", "source": "a.md"}, {"text": long, "source": "b.md"},
+            {"text": "Short hit about FAISS.", "source": "c.md"}]
+    context, used, stats = pack_context(hits, count, budget=40)
+    assert [p["source"] for p in used] == ["a.md", "c.md"] and stats["context_tokens"] <= 40
+    assert stats["context_raw_tokens"] > stats["context_tokens"]
+
+    context, used, stats = pack_context([hits[1]], count, budget=40)
+    assert stats["truncated"] and used[0]["text"].endswith(".") and count(context) <= 40
+
+
+def test_token_counters():
+    assert 10 <= EstimateCounter().count("Which tools and technologies does Erika use at work?") <= 14
+    with pytest.raises(ValueError, match="PROMPT_TOKENIZER"):
+        make_token_counter("gpt2")
+    if importlib.util.find_spec("mistral_common") is None:
+        with pytest.raises(RuntimeError, match="pip install mistral-common"):
+            make_token_counter("mistral")
+        assert make_token_counter("auto").provider == "estimate"
+    else:
+        assert make_token_counter("mistral").count("Hello, world!") == 4
+
+
+def test_stream_reports_prompt_tokens(stub_rag, monkeypatch):
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "PROMPT_TOKENIZER", "estimate")
+    monkeypatch.setattr(Config, "CONTEXT_TOKEN_BUDGET", 60)
+    monkeypatch.setattr(rag, "_tokens", None)
+
+    async def run():
+        return [e async for e in rag.answer_stream("What projects has Erika built?")]
+
+    done = asyncio.run(run())[-1][1]
+    usage = done["prompt_tokens"]
+    assert usage["tokenizer"] == "estimate" and 0 < usage["context"] <= 60 < usage["context_raw"]
+    assert usage["total"] > usage["system"] + usage["context"]
+    assert rag.PROMPT_TOKENS.count(part="total") >= 1
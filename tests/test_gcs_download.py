@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+import app as app_module
+from benchmarks.common import build_toy_index
+from benchmarks.fake_gcs import FakeGcsServer, LocalBucket, PreconditionFailed
+from src.index.download import DownloadIntegrityError, download_blob, resolve_artifact
+
+
+@pytest.fixture
+def published(tmp_path):
+    root = tmp_path / "bucket"
+    root.mkdir()
+    (root / "blob.bin").write_bytes(os.urandom(300_000))
+    return root
+
+
+def _leftovers(dest):
+    return [p for p in dest.parent.iterdir() if p.name.startswith(dest.name + ".part-")]
+
+
+def test_ranged_parallel_download_is_verified_and_atomic(published, tmp_path):
+    bucket = LocalBucket(published)
+    dest = tmp_path / "out.bin"
+    out = download_blob(bucket.get_blob("blob.bin"), dest, part_size=64 << 10, workers=3)
+    assert dest.read_bytes() == (published / "blob.bin").read_bytes()
+    assert out["parts"] == bucket.range_reads == 5 and out["verified"] == ["crc32c"]
+    assert not _leftovers(dest)
+
+
+def test_corrupt_bytes_never_reach_dest(published, tmp_path):
+    bucket = LocalBucket(published)
+    data = bytearray((published / "blob.bin").read_bytes())
+    data[1234] ^= 0xFF
+    bucket.corrupt["blob.bin"] = bytes(data)
+    dest = tmp_path / "out.bin"
+    with pytest.raises(DownloadIntegrityError, match="crc32c mismatch"):
+        download_blob(bucket.get_blob("blob.bin"), dest, part_size=64 << 10)
+    assert not dest.exists() and not _leftovers(dest)
+
+
+def test_publish_during_download_fails_instead_of_mixing_versions(published, tmp_path):
+    bucket = LocalBucket(published)
+    blob = bucket.get_blob("blob.bin")
+    bucket.generation += 1
+    dest = tmp_path / "out.bin"
+    with pytest.raises(PreconditionFailed):
+        download_blob(blob, dest, part_size=64 << 10)
+    assert not dest.exists() and not _leftovers(dest)
+
+
+def test_zstd_artifact_is_preferred_and_decompressed_while_streaming(published, tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    raw = b"chunk text " * 50_000
+    (published / "chunks.bin").write_bytes(b"stale uncompressed copy")
+    (published / "chunks.bin.zst").write_bytes(zstandard.ZstdCompressor(level=3).compress(raw))
+    bucket = LocalBucket(published)
+    blob = resolve_artifact(bucket, "chunks.bin")
+    assert blob.name == "chunks.bin.zst"
+    out = download_blob(blob, tmp_path / "chunks.bin", part_size=4096, workers=4)
+    assert (tmp_path / "chunks.bin").read_bytes() == raw
+    assert out["written"] == len(raw) and out["bytes"] < len(raw)
+
+
+def test_real_client_against_fake_server(published, tmp_path):
+    pytest.importorskip("google.cloud.storage")
+    server = FakeGcsServer(published)
+    server.start()
+    try:
+        blob = server.client().bucket(server.bucket).get_blob("blob.bin")
+        assert blob.generation == 1 and blob.size == 300_000
+        download_blob(blob, tmp_path / "out.bin", part_size=100_000, workers=3)
+        assert (tmp_path / "out.bin").read_bytes() == (published / "blob.bin").read_bytes()
+        assert sorted(r[1:] for r in server.media_requests) == [(0, 99_999), (100_000, 199_999), (200_000, 299_999)]
+    finally:
+        server.stop()
+
+
+def test_index_download_fetches_meta_last(tmp_path, monkeypatch):
+    published = tmp_path / "bucket"
+    build_toy_index(published, n_chunks=30)
+    bucket = LocalBucket(published)
+    monkeypatch.setattr(app_module, "_gcs_bucket", lambda: (bucket, ""))
+    dest = tmp_path / "local"
+    assert app_module._download_index_to(str(dest)) == 1
+    assert bucket.downloads[-1] == "meta.json"
+    assert set(bucket.downloads) == {p.name for p in published.iterdir()}
+    assert json.loads((dest / "meta.json").read_text()) == json.loads((published / "meta.json").read_text())
+    assert not [p for p in dest.iterdir() if ".part-" in p.name]
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+
+import app as app_module
+import rag
+from benchmarks.fake_gcs import LocalBucket
+from benchmarks.stub_mistral import StubMistralServer, fake_embedding
+from src.index.delta import apply_delta, read_delta, to_id_mapped
+from src.ingest.incremental import diff_files
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_diff_files_by_content_hash():
+    prev = [{"path": "a.md", "sha1": "1"}, {"path": "b.md", "sha1": "2"}, {"path": "c.md", "sha1": "3"}]
+    d = diff_files(prev, {"a.md": "1", "b.md": "9", "d.md": "4"})
+    assert d == {"added": ["d.md"], "changed": ["b.md"], "removed": ["c.md"], "unchanged": ["a.md"]}
+
+
+def test_apply_delta_keeps_base_and_maps_ids():
+    vecs = np.array([fake_embedding(f"t{i}", 16) for i in range(6)], dtype="float32")
+    base = faiss.IndexFlatIP(16)
+    base.add(vecs[:4])
+    new_vec = np.array([fake_embedding("new", 16)], dtype="float32")
+    out = apply_delta(base, {"remove_ids": np.array([1, 2]), "add_ids": np.array([4]), "add_vecs": new_vec})
+    assert base.ntotal == 4 and out.ntotal == 3  # copy=True leaves the serving index alone
+    assert out.search(new_vec, 1)[1][0][0] == 4
+    assert out.search(vecs[1:2], 3)[1][0].tolist().count(1) == 0
+    with pytest.raises(ValueError):
+        to_id_mapped(faiss.IndexHNSWFlat(16, 8, faiss.METRIC_INNER_PRODUCT))
+
+
+def _ingest(work: Path, url: str, *args) -> str:
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "MISTRAL_API_KEY": "stub", "INGEST_WORKERS": "1",
+           "MISTRAL_SERVER_URL": url}
+    return subprocess.run([sys.executable, str(ROOT / "ingest_mistral.py"), *args], cwd=work, env=env,
+                          capture_output=True, text=True, check=True).stdout
+
+
+@pytest.fixture
+def ingested(tmp_path):
+    """A full ingest (copied to base/) followed by an incremental one after editing the sources."""
+    work = tmp_path / "work"
+    src = work / "data" / "source" / "docs"
+    src.mkdir(parents=True)
+    docs = sorted((ROOT / "data" / "source" / "docs").glob("*.md"))[:4]
+    for p in docs:
+        shutil.copy(p, src / p.name)
+    with StubMistralServer() as url:
+        _ingest(work, url)
+        base = tmp_path / "base"
+        shutil.copytree(work / "data" / "index", base)
+        (src / docs[0].name).write_text("Erika recently learned Rust and built a vector database in it.")
+        (src / docs[1].name).unlink()
+        (src / "new_project.md").write_text("Garnet the cat reviews every pull request.")
+        out = _ingest(work, url, "--incremental")
+    return base, work / "data" / "index", out, docs
+
+
+def test_incremental_ingest_embeds_only_changes(ingested):
+    base, index_dir, out, docs = ingested
+    old = json.loads((base / "meta.json").read_text())
+    new = json.loads((index_dir / "meta.json").read_text())
+
+    assert "Files: +1 ~1 -1 =2" in out
+    assert "embedded=2" in out  # one chunk each for the edited and the added file
+    assert new["delta"]["base_version"] == old["content_hash"]
+    assert sorted(f["path"] for f in new["files"]) == sorted(
+        ["docs/new_project.md", f"docs/{docs[0].name}", f"docs/{docs[2].name}", f"docs/{docs[3].name}"])
+    removed = [f for f in old["files"] if f["path"] in (f"docs/{docs[0].name}", f"docs/{docs[1].name}")]
+    assert new["index"]["ntotal"] == old["index"]["ntotal"] - sum(e - s for s, e in (f["chunks"] for f in removed)) + 2
+    assert new["chunk_store"]["count"] == old["chunk_store"]["count"] + 2  # tombstones kept, ids never reused
+
+    state = rag.load_index_state(index_dir / "faiss.index", index_dir / "meta.json")  # validates the manifest
+    qv = np.array([fake_embedding("Garnet the cat reviews every pull request.", 1024)], dtype="float32")
+    top = int(state["index"].search(qv, 1)[1][0][0])
+    assert state["chunks"].source(top) == "docs/new_project.md"
+
+    # the delta alone turns the base index into the new one
+    delta = read_delta(index_dir / "delta.npz")
+    rebuilt = apply_delta(faiss.read_index(str(base / "faiss.index")), delta)
+    assert rebuilt.ntotal == state["index"].ntotal
+    assert int(rebuilt.search(qv, 1)[1][0][0]) == top
+
+    # nothing changed since: no work, no new version
+    with StubMistralServer() as url:
+        again = _ingest(index_dir.parents[1], url, "--incremental")
+    assert "Index is up to date" in again
+
+
+def test_incremental_refuses_files_left_by_an_interrupted_update(ingested):
+    base, index_dir, _, _ = ingested
+    assert not list(index_dir.glob("*.new"))  # staged files were all renamed into place
+    # interrupted after chunks.bin was renamed, before meta.json: the next run must not extend it again
+    shutil.copy(base / "meta.json", index_dir / "meta.json")
+    with StubMistralServer() as url, pytest.raises(subprocess.CalledProcessError) as err:
+        _ingest(index_dir.parents[1], url, "--incremental")
+    assert "don't match meta.json" in err.value.stderr
+
+
+def test_hot_reload_applies_delta_without_full_download(ingested, stub_rag, tmp_path, monkeypatch):
+    base, published, _, _ = ingested
+    served = tmp_path / "served"
+    shutil.copytree(base, served)
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(served))
+    monkeypatch.setattr(rag, "INDEX_PATH", served / "faiss.index")
+    monkeypatch.setattr(rag, "META_PATH", served / "meta.json")
+    monkeypatch.setattr(app_module, "_reload_state", {**app_module._reload_state, "generation": 1, "reloads": 0})
+    bucket = LocalBucket(published, generation=2)
+    monkeypatch.setattr(app_module, "INDEX_GCS_URI", "gs://fake-bucket")
+    monkeypatch.setattr(app_module, "_gcs_bucket", lambda: (bucket, ""))
+
+    asyncio.run(rag.retrieve("What projects has Erika built?"))  # serve the base version
+    out = asyncio.run(app_module.reload_index())
+
+    new = json.loads((published / "meta.json").read_text())
+    assert out["reloaded"] and out["index_version"] == new["content_hash"][:12]
+    assert bucket.downloads == ["meta.json", "delta.npz", "lexical.bin"]  # never faiss.index or chunks.bin
+    assert app_module._reload_state["last_reload_mode"] == "delta"
+    assert rag._index.ntotal == new["index"]["ntotal"]
+    # promoted files are a consistent index for the next cold start
+    state = rag.load_index_state(served / "faiss.index", served / "meta.json")
+    assert state["version"] == new["content_hash"][:12]
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+import app as app_module
+import rag
+from benchmarks.common import build_toy_index
+from benchmarks.fake_gcs import LocalBucket
+from src.index.delta import write_delta
+from src.index.location import IndexLocation, is_mmapped
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_app_and_rag_resolve_the_same_index_dir(tmp_path):
+    code = "import app, rag; print(app._index_location().index_path); print(rag.INDEX_PATH)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+                         env={**os.environ, "INDEX_DIR": str(tmp_path / "idx")}).stdout.split()
+    assert out == [str(tmp_path / "idx" / "faiss.index")] * 2
+
+
+def _slow_download(src: str, log: str):
+    def download(dest: str) -> int:
+        with open(log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.3)  # siblings arrive while the download is running
+        for name in ("faiss.index", "meta.json"):  # meta.json last, like the real download
+            Path(dest, name).write_bytes(Path(src, name).read_bytes())
+        return 7
+    return download
+
+
+def _worker(root: str, src: str, log: str, results):
+    location = IndexLocation(root)
+    downloaded = location.ensure(_slow_download(src, log))
+    results.put((downloaded, location.generation(), location.is_complete()))
+
+
+def test_one_worker_downloads_the_others_reuse(tmp_path):
+    src = build_toy_index(tmp_path / "published", n_chunks=20)
+    root, log = tmp_path / "shared", tmp_path / "downloads.log"
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(str(root), str(src), str(log), results)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(20)
+    out = sorted(results.get(timeout=1) for _ in procs)
+    assert len(log.read_text().split()) == 1
+    assert out == [(False, 7, True)] * 3 + [(True, 7, True)]
+
+
+def test_ivf_index_is_mapped_and_deltas_still_apply(stub_rag, tmp_path, monkeypatch):
+    index_dir = build_toy_index(tmp_path / "ivf", n_chunks=400, dim=64, index_type="ivf_flat", nlist=4)
+    monkeypatch.setattr(rag, "INDEX_PATH", index_dir / "faiss.index")
+    monkeypatch.setattr(rag, "META_PATH", index_dir / "meta.json")
+    monkeypatch.setattr(rag, "query_embedder", lambda: type("E", (), {"model": "mistral-embed", "dim": 64})())
+    state = rag.load_index_state(rag.INDEX_PATH, rag.META_PATH)
+    assert state["meta"]["index"]["type"] == "ivf_flat" and is_mmapped(state["index"])
+    rag.activate_index(state)
+
+    out = tmp_path / "next"
+    out.mkdir()
+    vec = np.ones((1, 64), dtype="float32") / 8
+    write_delta(out / "delta.npz", base_version=json.loads((index_dir / "meta.json").read_text())["content_hash"],
+                version="v2", remove_ids=[0, 1], add_ids=[400], add_vecs=vec, texts=["new chunk"], sources=["new.md"])
+    assert rag.materialize_delta(out / "delta.npz", out)
+    assert faiss.read_index(str(out / "faiss.index")).ntotal == 399
+    assert rag._index.ntotal == 400  # the active (mapped) index is untouched
+
+
+def test_reload_reuses_generation_fetched_by_sibling(stub_rag, tmp_path, monkeypatch):
+    published = build_toy_index(tmp_path / "bucket", n_chunks=30)
+    served = tmp_path / "served"
+    bucket = LocalBucket(published, generation=3)
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(served))
+    monkeypatch.setattr(app_module, "INDEX_GCS_URI", "gs://fake-bucket")
+    monkeypatch.setattr(app_module, "_gcs_bucket", lambda: (bucket, ""))
+    monkeypatch.setattr(app_module, "_reload_state", {**app_module._reload_state, "generation": None, "reloads": 0})
+
+    # a sibling worker already downloaded generation 3 into the shared directory
+    app_module._download_index_to(str(served))
+    IndexLocation(served).set_generation(3)
+    bucket.downloads.clear()
+
+    app_module.ensure_index_local()
+    assert app_module._reload_state["generation"] == 3 and bucket.downloads == []
+    bucket.generation = 4
+    out = asyncio.run(app_module.reload_index())
+    assert out["generation"] == 4 and "meta.json" in bucket.downloads
+    assert IndexLocation(served).generation() == 4
+
+    # the next worker to check finds generation 4 already in place and downloads nothing
+    bucket.downloads.clear()
+    app_module._reload_state["generation"] = 3
+    asyncio.run(app_module.reload_index())
+    assert bucket.downloads == [] and app_module._reload_state["last_reload_mode"] == "shared"
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import rag
+from benchmarks.common import build_toy_index
+from benchmarks.fake_gcs import LocalBucket
+
+
+@pytest.fixture
+def served(stub_rag, tmp_path, monkeypatch):
+    index_dir = tmp_path / "served"
+    build_toy_index(index_dir, n_chunks=40)
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(index_dir))
+    monkeypatch.setattr(rag, "INDEX_PATH", index_dir / "faiss.index")
+    monkeypatch.setattr(rag, "META_PATH", index_dir / "meta.json")
+    monkeypatch.setattr(app_module, "_reload_state", {**app_module._reload_state, "generation": None, "reloads": 0})
+    return index_dir
+
+
+def test_local_reload_swaps_version_and_keeps_inflight_index(served):
+    client = TestClient(app_module.app)
+    assert client.post("/ask", json={"question": "What projects has Erika built?"}).status_code == 200
+    old_index, old_chunks = asyncio.run(rag.aget_index_and_chunks())
+    v1 = rag.active_index_version()
+
+    build_toy_index(served, n_chunks=60)
+    r = client.post("/admin/reload-index")
+    assert r.status_code == 200 and r.json()["reloaded"] is True
+    assert rag.active_index_version() != v1
+    assert rag.answer_cache_stats()["size"] == 0
+    assert old_index.ntotal == 40 and old_chunks.text(0)  # a request holding the old one still works
+
+    status = client.get("/_debug_status").json()
+    assert status["index_version"] == rag.active_index_version()
+    assert status["index_reload"]["reloads"] == 1 and status["index_reload"]["last_reload_s"] is not None
+
+
+def test_invalid_new_index_is_rejected_and_old_one_stays(served):
+    asyncio.run(rag.retrieve("hello"))
+    v1 = rag.active_index_version()
+    meta = json.loads((served / "meta.json").read_text())
+    meta["embedder"]["dim"] = 768
+    (served / "meta.json").write_text(json.dumps(meta))
+    r = TestClient(app_module.app).post("/admin/reload-index")
+    assert r.status_code == 500
+    assert rag.active_index_version() == v1
+    assert "dim" in app_module._reload_state["last_reload_error"]
+
+
+def test_gcs_reload_downloads_new_generation_to_side_dir(served, tmp_path, monkeypatch):
+    published = tmp_path / "bucket"
+    build_toy_index(published, n_chunks=50)
+    bucket = LocalBucket(published)
+    monkeypatch.setattr(app_module, "INDEX_GCS_URI", "gs://fake-bucket")
+    monkeypatch.setattr(app_module, "_gcs_bucket", lambda: (bucket, ""))
+
+    out = asyncio.run(app_module.reload_index())
+    assert out["reloaded"] and out["generation"] == 1
+    assert rag._index.ntotal == 50
+    assert not list(served.glob(".staging-*"))
+    assert json.loads((served / "meta.json").read_text()) == json.loads((published / "meta.json").read_text())
+
+    assert asyncio.run(app_module.reload_index())["reloaded"] is False  # same generation: no download
+
+
+def test_reload_records_the_generation_it_downloaded(served, tmp_path, monkeypatch):
+    published = tmp_path / "bucket"
+    build_toy_index(published, n_chunks=50)
+    bucket = LocalBucket(published, generation=2)  # published again after the poller looked
+    monkeypatch.setattr(app_module, "INDEX_GCS_URI", "gs://fake-bucket")
+    monkeypatch.setattr(app_module, "_gcs_bucket", lambda: (bucket, ""))
+    monkeypatch.setattr(app_module, "_remote_generation", lambda: 1)
+
+    out = asyncio.run(app_module.reload_index())
+    assert out["reloaded"] and out["generation"] == 2
+    assert app_module._index_location().generation() == 2 and app_module._reload_state["generation"] == 2
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.ingest.embed_cache import EmbeddingCache
+from src.ingest.pipeline import StageStats, embed_texts_async
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+    class raw_response:
+        headers = {"retry-after": "0"}
+
+
+def _fake_embedder(fail_first=0, fail_after_calls=None):
+    calls = {"n": 0, "texts": 0}
+
+    async def embed(batch):
+        calls["n"] += 1
+        if calls["n"] <= fail_first:
+            raise _RateLimited("429")
+        if fail_after_calls is not None and calls["n"] > fail_after_calls:
+            raise RuntimeError("process killed")
+        calls["texts"] += len(batch)
+        return [[float(len(t)), 1.0] for t in batch]
+
+    return embed, calls
+
+
+def test_backoff_on_429_then_cache_hits(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite"), "m")
+    embed, calls = _fake_embedder(fail_first=2)
+    texts = [f"chunk {i}" for i in range(10)] + ["chunk 0"]  # duplicate embedded once
+    vecs = asyncio.run(embed_texts_async(texts, embed, cache=cache, batch_size=4, concurrency=2))
+    assert vecs.shape == (11, 2) and np.array_equal(vecs[0], vecs[10])
+    assert calls["texts"] == 10
+
+    embed2, calls2 = _fake_embedder()
+    stats = StageStats()
+    asyncio.run(embed_texts_async(texts, embed2, cache=cache, stats=stats))
+    assert calls2["n"] == 0 and stats.stages["embed"]["cached"] == 11
+
+
+def test_interrupted_run_resumes(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite"), "m")
+    texts = [f"chunk {i}" for i in range(12)]
+    embed, _ = _fake_embedder(fail_after_calls=2)
+    with pytest.raises(RuntimeError):
+        asyncio.run(embed_texts_async(texts, embed, cache=cache, batch_size=4, concurrency=1))
+    assert cache.count() == 8
+
+    embed2, calls2 = _fake_embedder()
+    asyncio.run(embed_texts_async(texts, embed2, cache=cache, batch_size=4, concurrency=1))
+    assert calls2["texts"] == 4
+
+
+def test_ingest_mistral_end_to_end_against_stub(tmp_path):
+    from benchmarks.stub_mistral import StubMistralServer
+
+    src = tmp_path / "data" / "source" / "docs"
+    src.mkdir(parents=True)
+    for p in sorted((ROOT / "data" / "source" / "docs").glob("*.md"))[:4]:
+        shutil.copy(p, src / p.name)
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "MISTRAL_API_KEY": "stub", "INGEST_WORKERS": "2"}
+    with StubMistralServer() as url:
+        env["MISTRAL_SERVER_URL"] = url
+        run = lambda: subprocess.run([sys.executable, str(ROOT / "ingest_mistral.py")], cwd=tmp_path, env=env,
+                                     capture_output=True, text=True, check=True).stdout
+        first, second = run(), run()
+    assert "embedded=" in first and "embedded=0" not in first
+    assert "embedded=0" in second  # unchanged corpus: nothing re-embedded
+    manifest = json.loads((tmp_path / "data" / "index" / "meta.json").read_text())
+    assert manifest["chunk_store"]["count"] > 0 and len(manifest["files"]) == 4
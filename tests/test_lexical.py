@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+import rag
+from src.config import Config
+from src.index.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize, write_lexical_index
+from src.index.manifest import IndexManifestError
+
+
+def test_tokenize_folds_accents_and_drops_en_pt_nl_stopwords():
+    assert tokenize("Você usa FAISS e dbt?") == ["usa", "faiss", "dbt"]
+    assert tokenize("Heeft Erika ervaring met Docker?") == ["erika", "ervaring", "docker"]
+    assert tokenize("CI-CD with Node.js and C++") == ["ci-cd", "ci", "cd", "node.js", "node", "js", "c++"]
+    assert tokenize("Análise") == tokenize("analise")
+
+
+def test_bm25_ranks_exact_terms_and_skips_tombstones(tmp_path):
+    docs = [(0, "Erika uses FAISS and dbt"), (1, "dbt dbt dbt models for finance"), (3, "Mistral LLM")]
+    write_lexical_index(tmp_path / "lexical.bin", docs, n_docs=4)  # id 2 is a tombstone
+    lex = LexicalIndex(tmp_path / "lexical.bin")
+    ids, scores = lex.search("dbt", 5)
+    assert ids.tolist() == [1, 0] and scores[0] > scores[1] > 0
+    assert lex.search("faiss dbt", 1)[0].tolist() == [0]
+    assert lex.search("kubernetes", 5)[0].size == 0
+    assert len(lex) == 4
+    lex.close()
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    assert reciprocal_rank_fusion([[3, 0, 2], [0, 2]], limit=3) == [0, 2, 3]
+    assert reciprocal_rank_fusion([[5, -1], []], limit=5) == [5]
+
+
+def test_hybrid_retrieve_finds_exact_term_dense_misses(stub_rag, monkeypatch):
+    # stub embeddings are random, so only the lexical side can find "part 17"
+    monkeypatch.setattr(Config, "HYBRID_SEARCH", False)
+    dense = asyncio.run(rag.retrieve("part 17"))
+    monkeypatch.setattr(Config, "HYBRID_SEARCH", True)
+    hybrid = asyncio.run(rag.retrieve("part 17"))
+    assert len(hybrid) == len(dense) == Config.TOP_K
+    assert any("(part 17)" in h["text"] for h in hybrid)
+
+
+def test_lexical_index_must_match_manifest(stub_rag, tmp_path):
+    write_lexical_index(tmp_path / "lexical.bin", [(0, "something else")], n_docs=50)
+    with pytest.raises(IndexManifestError, match="lexical"):
+        asyncio.run(rag.retrieve("hello"))
@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+import pytest
+
+import rag
+from benchmarks.stub_mistral import STUB_ANSWER, StubMistralServer
+from src.config import Config
+from src.llm.mistral_service import MistralLLMService, make_client
+from src.llm.resilience import CircuitBreaker, CircuitOpen, LLMUnavailable, RetryPolicy, deadline
+from src.observability.metrics import LLM_BREAKER_STATE, LLM_HEDGES, LLM_RETRIES
+
+
+@pytest.fixture
+def stub():
+    server = StubMistralServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+def _service(stub, **kwargs) -> MistralLLMService:
+    kwargs.setdefault("retry", RetryPolicy(max_retries=2, base=0.01))
+    return MistralLLMService(api_key="k", client=make_client("k", stub.url), **kwargs)
+
+
+def _chat_calls(stub) -> int:
+    return stub.calls.get("/v1/chat/completions", 0)
+
+
+def test_retries_5xx_and_429_then_answers(stub):
+    stub.chat_faults.extend([503, 429])
+    before = LLM_RETRIES.value(reason="503", client="main") + LLM_RETRIES.value(reason="429", client="main")
+    assert asyncio.run(_service(stub).generate_response("hi")) == STUB_ANSWER
+    assert _chat_calls(stub) == 3
+    assert LLM_RETRIES.value(reason="503", client="main") + LLM_RETRIES.value(reason="429", client="main") == before + 2
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.chat_faults.append(400)
+    with pytest.raises(LLMUnavailable, match="400"):
+        asyncio.run(_service(stub).generate_response("hi"))
+    assert _chat_calls(stub) == 1
+
+
+def test_breaker_fails_fast_then_recovers(stub):
+    now = [0.0]
+    breaker = CircuitBreaker(failures=2, reset_after=10, clock=lambda: now[0])
+    svc = _service(stub, retry=RetryPolicy(max_retries=0), breaker=breaker)
+    stub.chat_faults.extend([500, 500])
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(LLMUnavailable):
+                await svc.generate_response("hi")
+        with pytest.raises(CircuitOpen):
+            await svc.generate_response("hi")
+        assert _chat_calls(stub) == 2 and breaker.state == "open"
+        now[0] = 11  # provider is healthy again: the half-open trial closes the circuit
+        return await svc.generate_response("hi")
+
+    assert asyncio.run(run()) == STUB_ANSWER and breaker.state == "closed"
+
+
+def test_exhausted_request_deadline_is_not_held_against_the_provider(stub):
+    breaker = CircuitBreaker(failures=1, reset_after=10)
+    svc = _service(stub, breaker=breaker)
+    stub.retry_after = 30  # a 503 asking for a wait the request has no time for
+
+    async def run():
+        with deadline(at=time.monotonic() - 1):  # used up by retrieval / queueing already
+            with pytest.raises(LLMUnavailable, match="deadline"):
+                await svc.generate_response("hi")
+        stub.chat_faults.append(503)
+        with deadline(5):
+            with pytest.raises(LLMUnavailable, match="503"):
+                await svc.generate_response("hi")
+
+    asyncio.run(run())
+    assert _chat_calls(stub) == 1 and breaker.state == "closed" and breaker.failures == 0
+
+
+def test_each_breaker_exports_its_own_state():
+    main, spec = CircuitBreaker(failures=1), CircuitBreaker(failures=1, name="speculative")
+    states = lambda: {labels["client"]: v for _, labels, v in LLM_BREAKER_STATE.samples()}
+    main.failure()
+    spec.failure()
+    spec.success()  # a speculative call going through says nothing about real traffic's breaker
+    assert states()["main"] == 2 and states()["speculative"] == 0
+    main.success()
+    assert states()["main"] == 0
+
+
+def test_cancelled_half_open_trial_frees_the_breaker(stub):
+    now = [0.0]
+    breaker = CircuitBreaker(failures=1, reset_after=10, clock=lambda: now[0])
+    svc = _service(stub, retry=RetryPolicy(max_retries=0), breaker=breaker)
+
+    async def run():
+        stub.error_rate = 1.0
+        with pytest.raises(LLMUnavailable):
+            await svc.generate_response("hi")
+        assert breaker.state == "open"
+        stub.error_rate, stub.chat_latency, now[0] = 0.0, 1.0, 11.0
+        trial = asyncio.ensure_future(svc.generate_response("hi"))  # the half-open trial call...
+        await asyncio.sleep(0.1)
+        trial.cancel()  # ...abandoned (client disconnected)
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert breaker.state == "half_open" and not breaker.trial_running
+        stub.chat_latency = 0.0
+        return await svc.generate_response("hi")
+
+    assert asyncio.run(run()) == STUB_ANSWER and breaker.state == "closed"
+
+
+def test_hedge_beats_a_slow_first_attempt(stub):
+    stub.chat_faults.append(2.0)  # first request stalls for 2 s
+    svc = _service(stub, hedge_after_ms=100)
+    before = LLM_HEDGES.value(event="won_by_hedge")
+
+    async def run():
+        t0 = time.perf_counter()
+        pieces = [p async for p in svc.generate_response_stream("hi")]
+        return "".join(pieces), time.perf_counter() - t0
+
+    text, took = asyncio.run(run())
+    assert text == STUB_ANSWER and took < 1.0
+    assert LLM_HEDGES.value(event="won_by_hedge") == before + 1
+
+
+def test_request_deadline_caps_slow_provider(stub):
+    stub.chat_latency = 1.0
+
+    async def run():
+        with deadline(0.3):
+            await _service(stub).generate_response("hi")
+
+    t0 = time.perf_counter()
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(run())
+    assert time.perf_counter() - t0 < 0.8
+
+
+def test_rag_answers_with_language_fallback_when_provider_is_down(stub_rag, monkeypatch):
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "LLM_MAX_RETRIES", 0)
+    stub_rag.error_rate = 1.0
+    question = "Quais projetos a Erika já construiu?"
+
+    async def run():
+        text, cites = await rag.answer(question, session_id="s")
+        events = [e async for e in rag.answer_stream(question, session_id="s")]
+        return text, cites, events, await rag.sessions().get("/s")
+
+    text, cites, events, session = asyncio.run(run())
+    assert text == rag.FALLBACK_BY_LANG["pt"] and cites == []
+    assert [d["text"] for e, d in events if e == "delta"] == [rag.FALLBACK_BY_LANG["pt"]]
+    assert events[-1][1]["fallback"] == "llm_unavailable" and events[-1][1]["session"]["turn"] == 1
+    # fallback turns are kept: a follow-up refers to the last question asked
+    assert [t["a"] for t in session["turns"]] == [rag.FALLBACK_BY_LANG["pt"]] * 2
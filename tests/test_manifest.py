@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import faiss
+import numpy as np
+import pytest
+
+import rag
+from src.index.manifest import IndexManifestError, load_manifest, validate_manifest
+
+
+def test_toy_index_manifest_is_valid(stub_rag, tmp_path):
+    m = load_manifest(tmp_path / "meta.json")
+    assert m["format_version"] == 1
+    assert m["embedder"] == {"provider": "mistral", "model": "mistral-embed", "dim": 1024, "normalized": True}
+    assert sum(e - s for s, e in (f["chunks"] for f in m["files"])) == m["chunk_store"]["count"]
+    hits = asyncio.run(rag.retrieve("What projects has Erika built?"))
+    assert hits and rag.active_index_version() == m["content_hash"][:12]
+
+
+def test_legacy_list_layout_keeps_sources(tmp_path):
+    (tmp_path / "meta.json").write_text(json.dumps([{"source": "cv.pdf", "text": "hello"}]))
+    m = load_manifest(tmp_path / "meta.json")
+    assert m["format_version"] == 0 and m["texts"] == ["hello"] and m["sources"] == ["cv.pdf"]
+
+
+def test_validate_rejects_dim_count_and_model_mismatch():
+    index = faiss.IndexFlatIP(8)
+    index.add(np.eye(8, dtype="float32")[:3])
+    m = {"embedder": {"model": "mistral-embed", "dim": 8}, "metric": "cosine"}
+    validate_manifest(m, index, 3, None, query_model="mistral-embed")
+    with pytest.raises(IndexManifestError):
+        validate_manifest({**m, "embedder": {"model": "mistral-embed", "dim": 16}}, index, 3, None)
+    with pytest.raises(IndexManifestError):
+        validate_manifest(m, index, 4, None)
+    with pytest.raises(IndexManifestError):
+        validate_manifest(m, index, 3, None, query_model="paraphrase-multilingual-mpnet-base-v2")
+
+
+def test_mismatched_index_fails_fast_at_load(stub_rag, tmp_path):
+    meta = json.loads((tmp_path / "meta.json").read_text())
+    meta["embedder"]["model"] = "paraphrase-multilingual-mpnet-base-v2"
+    (tmp_path / "meta.json").write_text(json.dumps(meta))
+    with pytest.raises(IndexManifestError):
+        asyncio.run(rag.retrieve("Hello"))
+    assert "mpnet" in rag.index_error()
+    assert not stub_rag.calls  # never reached the embedding API
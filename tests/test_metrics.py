@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import rag
+from src.config import Config
+from src.llm.mistral_service import MistralLLMService
+from src.observability.metrics import LLM_MOCK_FALLBACKS, Registry
+from src.observability.tracing import set_trace_mode, span
+
+
+def _sample(text: str, name: str, **labels) -> float:
+    """Value of one series in Prometheus text output (labels must match exactly)."""
+    for line in text.splitlines():
+        m = re.match(r"^([a-zA-Z_:][\w:]*)(\{.*\})? (\S+)$", line)
+        if not m or m.group(1) != name:
+            continue
+        got = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', m.group(2) or ""))
+        if got == {k: str(v) for k, v in labels.items()}:
+            return float(m.group(3))
+    raise KeyError(f"{name}{labels} not in output")
+
+
+@pytest.fixture
+def client(stub_rag, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(tmp_path))
+    return TestClient(app_module.app)
+
+
+def test_registry_renders_prometheus_text():
+    reg = Registry()
+    reg.counter("jobs", "Jobs done").inc(2, kind="a")
+    h = reg.histogram("lat_seconds", "Latency", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 3.0):
+        h.observe(v, stage="x")
+    reg.collector("c", lambda: [("temp", "gauge", "Temperature", [("", {"room": 'a"b'}, 21.5)])])
+    text = reg.render()
+    assert "# TYPE jobs counter" in text and _sample(text, "jobs_total", kind="a") == 2
+    assert _sample(text, "lat_seconds_bucket", stage="x", le="0.1") == 1
+    assert _sample(text, "lat_seconds_bucket", stage="x", le="1") == 2
+    assert _sample(text, "lat_seconds_bucket", stage="x", le="+Inf") == 3
+    assert _sample(text, "lat_seconds_count", stage="x") == 3
+    assert 'temp{room="a\\"b"} 21.5' in text
+
+
+def test_metrics_cover_stages_caches_index_and_llm(client):
+    before = client.get("/metrics").text
+    for _ in range(2):  # second call is an answer-cache hit
+        assert client.post("/ask", json={"question": "What projects has Erika built?"}).status_code == 200
+    r = client.get("/metrics")
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    for stage in ("request", "ensure_index_local", "index_load", "embed", "search", "lexical", "build_context"):
+        assert _sample(text, "rag_stage_duration_seconds_count", stage=stage) >= 1
+    llm_before = _sample(before, "rag_stage_duration_seconds_count", stage="llm") if 'stage="llm"' in before else 0
+    assert _sample(text, "rag_stage_duration_seconds_count", stage="llm") - llm_before == 1
+    assert _sample(text, "rag_answers_total", origin="answer_cache") >= 1
+    assert _sample(text, "rag_cache_hit_ratio", cache="answer") == 0.5
+    assert "# TYPE rag_cache_hits counter" in text and _sample(text, "rag_cache_hits_total", cache="answer") >= 1
+    assert _sample(text, "rag_index_vectors") == 50
+    assert _sample(text, "rag_index_info", version=rag.active_index_version(), type="flat") == 1
+    assert _sample(text, "rag_llm_requests_total", outcome="ok", client="main") >= 1
+    assert _sample(text, "rag_llm_tokens_total", kind="completion", client="main") > 0
+    assert _sample(text, "rag_batch_size_count", batcher="embed") >= 1
+    assert _sample(text, "rag_requests_total", endpoint="/ask", outcome="ok") >= 2
+
+
+def test_mock_fallback_is_counted(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_API_KEY", None)
+    monkeypatch.delenv("MISTRAL_API_KEY", raising=False)
+    before = LLM_MOCK_FALLBACKS.value()
+    svc = MistralLLMService()
+    assert svc.is_mock_response(asyncio.run(svc.generate_response("hi")))
+    assert LLM_MOCK_FALLBACKS.value() == before + 1
+
+
+def test_log_trace_mode_emits_span_tree(caplog):
+    set_trace_mode("log")
+    try:
+        with caplog.at_level(logging.INFO, logger="trace"):
+            with span("request", endpoint="/ask"):
+                with span("embed", cache_hit=False):
+                    pass
+                with pytest.raises(ValueError), span("search"):
+                    raise ValueError("boom")
+    finally:
+        set_trace_mode("off")
+    tree = json.loads(caplog.records[-1].getMessage())
+    assert tree["name"] == "request" and len(tree["trace_id"]) == 32
+    embed, search = tree["children"]
+    assert embed["parent_id"] == tree["span_id"] and embed["attrs"] == {"cache_hit": False}
+    assert search["status"] == "error: ValueError"
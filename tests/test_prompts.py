@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+import rag
+from src.config import Config
+from src.llm.mistral_service import MistralLLMService
+from src.llm.prompts import BASE_SYSTEM_PROMPT, FALLBACK_BY_LANG, prompt_for
+
+
+def test_compact_prompts_carry_their_language_and_fallback():
+    for code, fallback in FALLBACK_BY_LANG.items():
+        p = prompt_for("compact", code)
+        assert fallback in p.system and p.instructions == "" and len(p.system) < len(BASE_SYSTEM_PROMPT) / 2
+    assert prompt_for("compact", "de") is prompt_for("compact", "en")
+    with pytest.raises(ValueError, match="PROMPT_STYLE"):
+        prompt_for("tiny", "en")
+
+
+def test_prefix_cache_layout_keeps_system_message_identical():
+    pt, nl = prompt_for("full", "pt"), prompt_for("full", "nl")
+    cached = MistralLLMService(api_key="k", prefix_cache=True)
+    a, b = cached.messages("Q1", pt.system, pt.instructions), cached.messages("Q2", nl.system, nl.instructions)
+    assert a[0] == b[0] == {"role": "system", "content": BASE_SYSTEM_PROMPT}
+    assert a[1]["content"] == "Q1\n\nIMPORTANT: Always respond in Portuguese."
+
+    legacy = MistralLLMService(api_key="k", prefix_cache=False).messages("Q1", pt.system, pt.instructions)
+    assert legacy == [{"role": "system", "content": BASE_SYSTEM_PROMPT + "\n\nIMPORTANT: Always respond in Portuguese."},
+                      {"role": "user", "content": "Q1"}]
+
+
+def test_stub_reuses_the_static_prefix(stub_rag, monkeypatch):
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", False)
+
+    async def ask(q):
+        return [e async for e in rag.answer_stream(q)][-1][1]["prompt_tokens"]
+
+    full = asyncio.run(ask("What projects has Erika built?"))
+    asyncio.run(ask("Which tools does Erika use?"))
+    (n1, c1), (n2, c2) = stub_rag.prompts
+    assert c1 == 0 and c2 > len(BASE_SYSTEM_PROMPT.split())  # the whole system prompt came from the cache
+
+    monkeypatch.setattr(Config, "PROMPT_STYLE", "compact")
+    compact = asyncio.run(ask("Quais projetos a Erika já construiu?"))
+    assert compact["style"] == "compact" and compact["system"] < full["system"] / 2
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from src.cache.query_cache import QueryEmbeddingCache, normalize_question
+
+
+def test_normalized_questions_share_a_key():
+    assert normalize_question("  What projects has Erika BUILT?? ") == normalize_question("what projects has erika built")
+    assert normalize_question("Onde a Erika estudou?") == "onde a erika estudou"
+
+
+def test_lru_eviction_and_model_scoping():
+    c = QueryEmbeddingCache(max_entries=2, ttl=0)
+    c.put("m", "a", np.ones(4))
+    c.put("m", "b", np.ones(4))
+    assert c.get("m", "A!") is not None        # touch "a" so "b" is the LRU entry
+    c.put("m", "c", np.ones(4))
+    assert c.get("m", "b") is None
+    assert c.get("other-model", "a") is None
+    s = c.stats()
+    assert s["evictions"] == 1 and s["hits"] == 1 and s["misses"] == 2
+
+
+def test_ttl_expiry(monkeypatch):
+    import src.cache.query_cache as qc
+    now = [1000.0]
+    monkeypatch.setattr(qc.time, "time", lambda: now[0])
+    c = QueryEmbeddingCache(ttl=10)
+    c.put("m", "q", np.ones(4))
+    now[0] += 11
+    assert c.get("m", "q") is None
+    assert c.stats()["expirations"] == 1
+
+
+def test_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "qcache.npz")
+    c = QueryEmbeddingCache(path=path)
+    c.put("mistral-embed", "Hello?", np.arange(4, dtype="float32"))
+    c.save()
+    warm = QueryEmbeddingCache(path=path)
+    np.testing.assert_array_equal(warm.get("mistral-embed", "hello"), np.arange(4, dtype="float32"))
+
+
+def test_periodic_save_on_an_event_loop_runs_off_the_loop(tmp_path):
+    path = str(tmp_path / "qcache.npz")
+    c = QueryEmbeddingCache(path=path, persist_every=2)
+    writers, write = [], c._write
+    c._write = lambda items: (writers.append(threading.get_ident()), write(items))
+
+    async def main():
+        for i in range(2):
+            c.put("m", f"q{i}", np.ones(4, dtype="float32"))
+        while c._saving:
+            await asyncio.sleep(0.01)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert writers and loop_thread not in writers
+    assert len(QueryEmbeddingCache(path=path)._data) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["qcache.npz"]  # no temp files left behind
@@ -0,0 +1,50 @@
+import asyncio
+import importlib.util
+
+import numpy as np
+import pytest
+
+import rag
+from src.config import Config
+from src.embedding.query_embedder import MistralQueryEmbedder, make_query_embedder
+from src.index.manifest import IndexManifestError
+
+
+class _FakeEmbedder:
+    provider, model, dim = "onnx", "paraphrase-multilingual-mpnet-base-v2", 768
+
+    async def embed(self, texts):
+        return np.ones((len(texts), self.dim), dtype="float32") / np.sqrt(self.dim)
+
+
+def test_mistral_backend_returns_unit_rows(stub_rag):
+    embedder = make_query_embedder("mistral", client=rag._client_mistral())
+    assert isinstance(embedder, MistralQueryEmbedder)
+    mat = asyncio.run(embedder.embed(["a", "b", "c"]))
+    assert mat.shape == (3, 1024) and mat.dtype == np.float32
+    assert np.allclose(np.linalg.norm(mat, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(embedder.embed_sync(["b"])[0], mat[1], atol=1e-6)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="QUERY_EMBEDDER"):
+        make_query_embedder("word2vec")
+
+
+@pytest.mark.skipif(importlib.util.find_spec("onnxruntime") is not None, reason="onnxruntime installed")
+def test_onnx_backend_explains_missing_runtime(tmp_path):
+    with pytest.raises(RuntimeError, match="pip install onnxruntime"):
+        make_query_embedder("onnx", onnx_dir=str(tmp_path))
+
+
+def test_query_embedder_must_match_index_model(stub_rag, monkeypatch):
+    # toy index is mistral-embed (1024-d); a local model must not be searched against it
+    monkeypatch.setattr(rag, "_qembed", _FakeEmbedder())
+    with pytest.raises(IndexManifestError, match="dim|embedded with"):
+        asyncio.run(rag.retrieve("hello"))
+
+
+def test_retrieve_uses_configured_backend(stub_rag):
+    assert Config.QUERY_EMBEDDER == "mistral"
+    assert len(asyncio.run(rag.retrieve("What projects has Erika built?"))) == Config.TOP_K
+    assert rag.query_embedder_info() == {"provider": "mistral", "model": "mistral-embed", "dim": 1024}
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import faiss
+import numpy as np
+import pytest
+
+import rag
+from benchmarks.stub_mistral import fake_embedding
+from src.config import Config
+from src.index.chunk_store import ListChunkStore
+from src.index.rerank import Reranker, make_cross_encoder, mmr, text_similarity
+
+
+class _KeywordCrossEncoder:
+    """Scores 0.9 when the chunk contains the keyword, else 0.1; counts calls."""
+
+    provider, model = "fake", "keyword"
+
+    def __init__(self, keyword: str, delay: float = 0.0):
+        self.keyword, self.delay, self.calls = keyword, delay, 0
+
+    async def score(self, question, texts):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return np.array([0.9 if self.keyword in t else 0.1 for t in texts], dtype="float32")
+
+
+def test_mmr_skips_near_duplicates():
+    relevance = np.array([1.0, 0.99, 0.8, 0.7])
+    sim = np.eye(4)
+    sim[0, 1] = sim[1, 0] = 0.98  # 1 is a near-copy of 0
+    assert mmr(relevance, sim, 3, lam=0.5) == [0, 2, 3]
+    assert mmr(relevance, sim, 3, lam=1.0) == [0, 1, 2]
+
+
+def test_text_similarity_flags_overlapping_windows():
+    words = [f"w{i}" for i in range(100)]
+    a, b, c = " ".join(words[:60]), " ".join(words[40:100]), " ".join(words[5:55])
+    sim = text_similarity([a, b, c])
+    assert sim[0, 2] > 0.8 and sim[0, 1] < 0.3 and np.allclose(np.diag(sim), 1)
+
+
+def test_cross_encoder_reorders_and_threshold_cuts():
+    texts = ["about dbt", "about FAISS", "more FAISS notes", "unrelated"]
+    rr = Reranker(_KeywordCrossEncoder("FAISS"), mmr_lambda=1.0, min_cross=0.5)
+    keep = asyncio.run(rr.rerank("FAISS?", texts, np.array([4, 3, 2, 1.0]), k=3))
+    assert keep == [1, 2] and rr.counts["cross_encoder"] == 1 and rr.counts["thresholded"] == 1
+
+
+def test_budget_skips_cross_encoder_when_time_is_short():
+    ce = _KeywordCrossEncoder("FAISS", delay=0.05)
+    rr = Reranker(ce, mmr_lambda=1.0, budget_ms=100)
+    texts, prior = ["about dbt", "about FAISS"], np.array([2.0, 1.0])
+    assert asyncio.run(rr.rerank("q", texts, prior, k=2, started=time.perf_counter())) == [1, 0]
+    assert rr.cost_s >= 0.05
+    # 80 ms already spent + ~50 ms of reranking > 100 ms budget: keep the first-stage order
+    late = time.perf_counter() - 0.08
+    assert asyncio.run(rr.rerank("q", texts, prior, k=2, started=late)) == [0, 1]
+    assert ce.calls == 1 and rr.counts["skipped_budget"] == 1
+
+
+def test_unknown_cross_encoder_is_rejected():
+    assert make_cross_encoder("off") is None
+    with pytest.raises(ValueError, match="RERANKER"):
+        make_cross_encoder("colbert")
+
+
+def test_search_overfetches_and_diversifies(stub_rag, monkeypatch):
+    question = "What did Erika build with FAISS?"
+    texts = [question] * 3 + [f"Chunk {i} about something else" for i in range(37)]
+    mat = np.array([fake_embedding(t, 1024) for t in texts], dtype="float32")
+    index = faiss.IndexFlatIP(1024)
+    index.add(mat)
+    chunks = ListChunkStore(texts, [f"doc{i}.md" for i in range(len(texts))])
+    qv = np.asarray(fake_embedding(question, 1024), dtype="float32")
+    monkeypatch.setattr(Config, "TOP_K", 4)
+
+    monkeypatch.setattr(Config, "MMR_LAMBDA", 1.0)
+    plain = asyncio.run(rag._search(index, chunks, qv))
+    assert {h["source"] for h in plain[:3]} == {"doc0.md", "doc1.md", "doc2.md"}
+
+    monkeypatch.setattr(rag, "_reranker", None)
+    monkeypatch.setattr(Config, "MMR_LAMBDA", 0.3)
+    diverse = asyncio.run(rag._search(index, chunks, qv))
+    assert len(diverse) == 4 and [h["text"] for h in diverse].count(question) == 1
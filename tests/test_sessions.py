@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import rag
+from benchmarks.fake_redis import FakeRedis
+from src.config import Config
+from src.llm.history import _brief, condense, history_block
+from src.observability.metrics import SESSION_EVENTS
+from src.serving.sessions import MemorySessionStore, RedisSessionStore, add_turn, make_session_store, new_session
+
+LONG_ANSWER = ("Erika built a retrieval assistant for her portfolio, a forecasting pipeline for retail demand "
+               "and several dashboards that track model quality over time. " * 3
+               + "\n\n- What tools did she use?\n- Where did she work?")
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_stores_expire_idle_sessions_and_cap_memory():
+    clock = Clock()
+    memory = MemorySessionStore(ttl=60, max_sessions=2, clock=clock)
+    redis = RedisSessionStore(FakeRedis(clock=clock), ttl=60)
+
+    async def run():
+        for store in (memory, redis):
+            state = new_session()
+            add_turn(state, "Who is Erika?", "Who is Erika?", "A data scientist.")
+            await store.put("s1", state)
+            clock.t += 59
+            got = await store.get("s1")
+            assert got == state and got is not state
+            await store.put("s1", got)  # a turn refreshes the expiry
+            clock.t += 59
+            assert (await store.get("s1"))["next"] == 1
+            clock.t += 61
+            assert await store.get("s1") is None
+        for key in ("a", "b", "c"):
+            await memory.put(key, new_session())
+        assert await memory.get("a") is None and len(memory) == 2
+
+    evicted = SESSION_EVENTS.value(event="evicted")
+    asyncio.run(run())
+    assert SESSION_EVENTS.value(event="evicted") == evicted + 1
+    with pytest.raises(ValueError):
+        make_session_store("sqlite", ttl=60)
+
+
+def test_history_block_fits_the_budget_and_drops_suggestions():
+    count = lambda text: len(text.split())  # noqa: E731
+    state = new_session()
+    for i in range(6):
+        add_turn(state, f"Question {i}?", f"Question {i}?", LONG_ANSWER)
+    assert "Where did she work?" not in _brief(LONG_ANSWER)
+    block = history_block(state, count, 150)
+    assert count(block) <= 150 and "Question 5?" in block and "Question 0?" not in block
+    assert history_block(new_session(), count, 150) == ""
+
+    query, how = asyncio.run(condense(None, "And the tools?", state, mode="concat"))
+    assert (query, how) == ("Question 5? And the tools?", "concat")
+    assert asyncio.run(condense(None, "What is Erika's education background?", state, mode="concat"))[1] == "none"
+
+
+@pytest.fixture
+def sessions_stub(stub_rag, monkeypatch):
+    stub_rag.embed_latency = 0.0
+    prompts = []
+
+    def reply(messages):
+        system, user = messages[0]["content"], messages[-1]["content"]
+        if "standalone question" in system:
+            return "Which tools did Erika use in her portfolio projects?"
+        if "running summary" in system:
+            return "The visitor asked about Erika's projects and the tools she used."
+        prompts.append(user)
+        return LONG_ANSWER
+
+    stub_rag.reply = reply
+    monkeypatch.setattr(Config, "SESSION_HISTORY_TOKENS", 250)
+    monkeypatch.setattr(Config, "SESSION_KEEP_TURNS", 2)
+    return stub_rag, prompts
+
+
+def test_follow_ups_are_condensed_and_history_stays_flat(sessions_stub):
+    stub, prompts = sessions_stub
+    compacted = SESSION_EVENTS.value(event="compacted_llm")
+
+    async def run():
+        done = []
+        for question in ["What projects has Erika built?"] + ["What about the tools there?"] * 7:
+            async for event, data in rag.answer_stream(question, session_id="abc"):
+                if event == "done":
+                    done.append(data)
+            await rag.drain_session_tasks()
+        return done, await rag.sessions().get("/abc")
+
+    done, state = asyncio.run(run())
+    assert [d["session"]["turn"] for d in done] == list(range(8))
+    assert done[0]["session"]["condensed"] == "none"
+    assert done[1]["session"] == {"id": "abc", "turn": 1, "query": "Which tools did Erika use in her portfolio projects?",
+                                  "condensed": "llm"}
+    assert "Conversation so far:" not in prompts[0] and "User: What projects has Erika built?" in prompts[1]
+    history = [d["prompt_tokens"]["history"] for d in done]
+    assert history[0] == 0 and max(history) <= Config.SESSION_HISTORY_TOKENS
+    # turns past the budget went into the summary: stored and sent history stop growing
+    assert SESSION_EVENTS.value(event="compacted_llm") > compacted
+    assert state["summary"].startswith("The visitor asked") and len(state["turns"]) <= 3
+    assert "Summary of the earlier conversation" in prompts[-1]
+    assert max(history[3:]) - min(history[3:]) < 60
+
+
+def test_ask_echoes_the_session_and_scopes_it_per_tenant(sessions_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(tmp_path))
+    http = TestClient(app_module.app)
+    r = http.post("/ask", json={"question": "What projects has Erika built?", "session_id": "u-1"})
+    assert r.status_code == 200 and r.json()["session_id"] == "u-1"
+    assert http.post("/ask", json={"question": "Hi", "session_id": "no spaces"}).status_code == 400
+    assert http.post("/ask", json={"question": "What projects has Erika built?"}).json()["session_id"] is None
+
+    async def stored():
+        return await rag.sessions().get("/u-1"), await rag.sessions().get("ana/u-1")
+
+    mine, other = asyncio.run(stored())
+    assert mine["next"] == 1 and other is None
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+import rag
+from benchmarks.stub_mistral import STUB_ANSWER
+from src.config import Config
+from src.llm.history import suggestions
+from src.observability.metrics import LLM_CALLS, SPECULATIVE
+from src.serving.speculation import Speculator
+
+
+def _outcomes():
+    return {k: SPECULATIVE.value(outcome=k) for k in ("started", "hit", "miss", "stale", "wasted", "cancelled")}
+
+
+def _delta(before):
+    return {k: v - before[k] for k, v in _outcomes().items() if v != before[k]}
+
+
+def test_speculator_bounds_work_and_only_the_asked_question_is_used():
+    running, peak, release = set(), [0], asyncio.Event()
+    questions = ["What projects has Erika built?", "Which tools does Erika use?", "What is Erika's education?"]
+
+    async def work(question):
+        running.add(question)
+        peak[0] = max(peak[0], len(running))
+        await release.wait()
+        running.discard(question)
+        return {"answer": question.upper(), "version": "v1"}
+
+    async def run():
+        spec = Speculator(concurrency=2, ttl=60)
+        before = _outcomes()
+        assert spec.start("s", questions + ["which tools does erika use"], work) == 3
+        await asyncio.sleep(0.01)
+        assert len(running) == 2
+        release.set()
+        got = await spec.take("s", "which tools does Erika use")  # retyped: case and punctuation aside
+        assert got["answer"] == "WHICH TOOLS DOES ERIKA USE?" and peak[0] == 2
+        assert await spec.take("s", questions[0]) is None  # taken: the rest was dropped with it
+        first = _delta(before)
+
+        before = _outcomes()
+        spec.start("s", questions, work)
+        assert await spec.take("s", "Where does Erika live?") is None
+        spec.start("s", questions, work)
+        await spec.settle()
+        assert await spec.take("s", questions[0], version="v2") is None  # index reloaded meanwhile
+        return first, _delta(before), spec.stats()
+
+    first, second, stats = asyncio.run(run())
+    assert first == {"started": 3, "hit": 1, "cancelled": 2}  # one still running, one still queued
+    assert second == {"started": 6, "miss": 1, "stale": 1, "cancelled": 3, "wasted": 2}
+    assert stats == {"scopes": 0, "running": 0, "concurrency": 2}
+    assert suggestions(STUB_ANSWER, limit=2) == questions[:2]
+
+
+@pytest.fixture
+def chat(stub_rag, monkeypatch):
+    stub_rag.embed_latency = 0.0
+    monkeypatch.setattr(Config, "SESSION_CONDENSE", "concat")
+    return lambda: stub_rag.calls.get("/v1/chat/completions", 0)
+
+
+async def _ask(question, session_id="visitor"):
+    async for event, data in rag.answer_stream(question, session_id=session_id):
+        if event == "done":
+            return data
+
+
+def test_suggested_follow_up_is_answered_from_the_precomputed_answer(chat, monkeypatch):
+    monkeypatch.setattr(Config, "SPECULATE", "answer")
+
+    async def run():
+        first = await _ask("Tell me about Erika")
+        await rag.speculator().settle()
+        calls = chat()
+        follow = await _ask("what is erikas education")  # near enough to "What is Erika's education?"
+        return first, calls, follow, chat()
+
+    before, ok = _outcomes(), {c: LLM_CALLS.value(outcome="ok", client=c) for c in ("main", "speculative")}
+    first, calls, follow, after = asyncio.run(run())
+    assert "speculative" not in first and calls == 1 + 3  # the answer, then one per suggestion
+    assert follow["speculative"] == "answer" and after == calls and follow["timing"]["ttft_ms"] < 100
+    assert follow["session"]["turn"] == 1 and follow["session"]["query"] == "What is Erika's education?"
+    assert _delta(before)["hit"] == 1
+    assert rag._spec_llm.breaker is not rag._llm.breaker and rag._llm.breaker.stats()["consecutive_failures"] == 0
+    assert {c: LLM_CALLS.value(outcome="ok", client=c) - n for c, n in ok.items()} == {"main": 1, "speculative": 3}
+
+
+def test_no_speculative_llm_calls_while_the_breaker_is_not_closed(chat, monkeypatch):
+    monkeypatch.setattr(Config, "SPECULATE", "answer")
+
+    async def run():
+        await _ask("Tell me about Erika")
+        rag._ensure_llm().breaker.state = "half_open"  # before the speculation gets to run
+        await rag.speculator().settle()
+        calls = chat()
+        rag._ensure_llm().breaker.state = "closed"
+        follow = await _ask("Which tools does Erika use?")
+        return calls, follow
+
+    calls, follow = asyncio.run(run())
+    assert calls == 1 and follow["speculative"] == "retrieval" and rag._spec_llm is None
+
+
+def test_retrieval_only_speculation_and_cancellation_on_another_question(chat, monkeypatch):
+    monkeypatch.setattr(Config, "SPECULATE", "retrieval")
+
+    async def run():
+        await _ask("Tell me about Erika")
+        await rag.speculator().settle()
+        calls = chat()
+        hit = await _ask("Which tools does Erika use?")
+        miss = await _ask("Where does Erika live?")
+        return calls, hit, miss, chat()
+
+    before = _outcomes()
+    calls, hit, miss, after = asyncio.run(run())
+    assert calls == 1 and hit["speculative"] == "retrieval" and "speculative" not in miss
+    assert after == 3  # retrieval is precomputed, the answers are not
+    delta = _delta(before)
+    assert delta["started"] == 9 and delta["hit"] == 1 and delta["miss"] == 1
+    # the first answer's two other suggestions, then all three of the second's (done or not)
+    assert delta.get("wasted", 0) + delta.get("cancelled", 0) == 5
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import rag
+from benchmarks.stub_mistral import STUB_ANSWER
+
+
+def _events(body: str):
+    out = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+@pytest.fixture
+def client(stub_rag, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(tmp_path))
+    return TestClient(app_module.app)
+
+
+def test_ask_stream_emits_sources_then_deltas_then_done(client):
+    r = client.post("/ask/stream", json={"question": "What projects has Erika built?"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    assert events[0][0] == "sources" and events[0][1]["sources"]
+    deltas = [d["text"] for e, d in events if e == "delta"]
+    assert len(deltas) > 1 and "".join(deltas) == STUB_ANSWER
+    assert events[-1][0] == "done" and events[-1][1]["timing"]["ttft_ms"] is not None
+
+
+def test_ask_negotiates_sse_via_accept_header(client):
+    r = client.post("/ask", json={"question": "Hello"}, headers={"Accept": "text/event-stream"})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert _events(r.text)[-1][0] == "done"
+
+
+def test_mock_llm_streams_offline(client, monkeypatch):
+    from src.llm.mistral_service import MOCK_RESPONSE, MistralLLMService
+
+    offline = MistralLLMService()
+    offline.client = None  # what the service does without an API key
+    monkeypatch.setattr(rag, "_llm", offline)
+    events = _events(client.post("/ask/stream", json={"question": "Which tools does Erika use?"}).text)
+    deltas = [d["text"] for e, d in events if e == "delta"]
+    assert len(deltas) > 1 and "".join(deltas) == MOCK_RESPONSE
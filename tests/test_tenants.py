@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import rag
+from benchmarks.common import build_toy_index
+from benchmarks.fake_gcs import LocalBucket
+from src.index.location import IndexLocation
+from src.index.tenants import TenantIndexCache, UnknownTenant, validate_tenant
+from src.llm.prompts import BASE_SYSTEM_PROMPT, DEFAULT_PERSONA, load_persona, prompt_for
+
+
+def test_lru_evicts_by_bytes_and_loads_each_cold_tenant_once():
+    loads, gate = [], threading.Event()
+
+    def load(tenant):
+        gate.wait(2)
+        loads.append(tenant)
+        if tenant == "missing":
+            raise UnknownTenant(tenant)
+        return {"bytes": {"a": 40, "b": 40, "c": 30, "huge": 500}[tenant]}
+
+    cache = TenantIndexCache(budget_bytes=100, load=load)
+
+    async def run():
+        pending = [asyncio.ensure_future(cache.get("a")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        gate.set()
+        await asyncio.gather(*pending)
+        await cache.get("b")
+        await cache.get("a")  # a is now the most recently used
+        await cache.get("c")  # 110 bytes: b goes
+        assert list(cache.resident()) == ["a", "c"] and cache.resident_bytes == 70
+        await cache.get("huge")  # over budget on its own: kept, everything else goes
+        assert list(cache.resident()) == ["huge"]
+        for _ in range(2):
+            with pytest.raises(UnknownTenant):
+                await cache.get("missing")
+
+    asyncio.run(run())
+    assert loads == ["a", "b", "c", "huge", "missing", "missing"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["peak_bytes"]) == (1, 6, 3, 500)
+
+
+def test_persona_renders_into_every_prompt(tmp_path):
+    assert load_persona(tmp_path) is None
+    (tmp_path / "persona.json").write_text(json.dumps({"owner": "Ana Souza", "assistant": "Opal"}))
+    ana = load_persona(tmp_path)
+    assert ana.first_name == "Ana" and "What projects has Ana built?" in ana.examples
+    full, compact = prompt_for("full", "nl", ana), prompt_for("compact", "pt", ana)
+    for p in (full, compact):
+        assert "Ana" in p.system and "Opal" in p.system and "Erika" not in p.system
+    assert prompt_for("full", "en", DEFAULT_PERSONA).system == BASE_SYSTEM_PROMPT
+    with pytest.raises(ValueError):
+        validate_tenant("../etc")
+
+
+@pytest.fixture
+def client(stub_rag, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(tmp_path))
+    for tenant in ("ana", "bob"):
+        build_toy_index(tmp_path / "tenants" / tenant, n_chunks=30)
+    (tmp_path / "tenants" / "ana" / "persona.json").write_text(json.dumps({"owner": "Ana Souza"}))
+    personas = []
+    real = rag.prompt_for
+    monkeypatch.setattr(rag, "prompt_for", lambda style, code, persona=None: (personas.append(persona),
+                                                                              real(style, code, persona))[1])
+    return TestClient(app_module.app), personas
+
+
+def test_ask_routes_to_the_tenants_index_and_persona(client):
+    http, personas = client
+    q = "What projects has Erika built?"
+    for tenant in ("ana", "bob", "ana", None):
+        r = http.post("/ask", json={"question": q, "tenant": tenant})
+        assert r.status_code == 200 and r.json()["sources"]
+    assert [p.owner if p else None for p in personas] == ["Ana Souza", None, None]  # 3rd: answer cache
+    assert rag.tenant_stats()["tenants"] == 2 and rag.tenant_stats()["misses"] == 2
+
+    assert http.post("/ask", json={"question": q, "tenant": "nobody"}).status_code == 404
+    assert http.post("/ask", json={"question": q, "tenant": "Bad/Id"}).status_code == 400
+    assert "rag_tenant_indexes_resident 2" in http.get("/metrics").text
+
+
+def test_republished_tenant_index_is_refreshed_by_the_poller(stub_rag, tmp_path, monkeypatch):
+    served, published = tmp_path / "served", tmp_path / "bucket"
+    build_toy_index(published / "tenants" / "ana", n_chunks=30)
+    bucket = LocalBucket(published, generation=1)
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(served))
+    monkeypatch.setattr(rag, "INDEX_PATH", served / "faiss.index")
+    monkeypatch.setattr(app_module, "INDEX_GCS_URI", "gs://fake-bucket")
+    monkeypatch.setattr(app_module, "_gcs_bucket", lambda: (bucket, ""))
+
+    async def ntotal():
+        await asyncio.to_thread(app_module.ensure_tenant_local, "ana")
+        return (await rag.tenant_indexes().get("ana"))["index"].ntotal
+
+    async def run():
+        first = await ntotal()
+        unchanged = await app_module.refresh_tenant_indexes()
+        build_toy_index(published / "tenants" / "ana", n_chunks=45)
+        bucket.generation = 2
+        return first, unchanged, await app_module.refresh_tenant_indexes(), await ntotal()
+
+    assert asyncio.run(run()) == (30, [], ["ana"], 45)
+    assert IndexLocation(served / "tenants" / "ana").generation() == 2
+    assert not list((served / "tenants" / "ana").glob(".staging-*"))
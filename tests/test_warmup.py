@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import rag
+
+
+@pytest.fixture
+def fresh_app(stub_rag, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(app_module, "_warmup_task", None)
+    monkeypatch.setattr(app_module, "_warmup_state", {**app_module._warmup_state, "state": "idle", "stages": {},
+                                                      "error": None, "warmup_s": None})
+    return monkeypatch
+
+
+def test_blocking_warmup_loads_everything_before_traffic(fresh_app):
+    fresh_app.setattr(app_module, "WARMUP_MODE", "blocking")
+    with TestClient(app_module.app) as client:
+        assert rag._index is not None and rag._llm is not None and rag._qembed is not None
+        r = client.get("/ready")
+        assert r.status_code == 200 and r.json()["state"] == "ready"
+        assert {"import_s", "download_s", "clients_s", "index_load_s"} <= set(r.json()["stages"])
+        assert "rag_ready 1" in client.get("/metrics").text
+
+
+def test_background_warmup_keeps_health_instant(fresh_app):
+    gate = threading.Event()
+    real = rag.warmup
+    fresh_app.setattr(rag, "warmup", lambda: (gate.wait(5), real())[1])
+    fresh_app.setattr(app_module, "WARMUP_MODE", "background")
+    with TestClient(app_module.app) as client:
+        t0 = time.perf_counter()
+        assert client.get("/health").status_code == 200
+        assert time.perf_counter() - t0 < 0.5
+        r = client.get("/ready")
+        assert r.status_code == 503 and r.json()["state"] == "warming"
+        gate.set()
+        # a request during warmup waits for it rather than loading the index a second time
+        assert client.post("/ask", json={"question": "What projects has Erika built?"}).status_code == 200
+        assert client.get("/ready").status_code == 200
+
+
+def test_failed_warmup_is_reported_and_requests_still_work(fresh_app):
+    def broken():
+        raise RuntimeError("GCS unreachable")
+
+    fresh_app.setattr(app_module, "ensure_index_local", broken)
+    fresh_app.setattr(app_module, "WARMUP_MODE", "blocking")
+    with TestClient(app_module.app) as client:
+        r = client.get("/ready")
+        assert r.status_code == 503 and r.json()["state"] == "failed"
+        assert "GCS unreachable" in r.json()["error"]
+        assert client.get("/health").status_code == 200